@@ -0,0 +1,334 @@
+# In api/async_views.py
+"""
+Async read paths for the hottest GET endpoints.
+
+Under Daphne every sync DRF view costs a sync_to_async thread hop for the
+whole request (authentication, every query, serialization). These views run
+on the event loop instead: JWT validation is pure CPU, queries go through the
+async ORM (aget, acount, async for) with everything the serializer needs
+loaded up front, and serialization reuses the existing DRF serializers, so the
+JSON is identical to the sync views.
+
+`with_async_reads` sends GET/HEAD to the async view and every other method
+to the existing DRF view. Set ASYNC_READ_VIEWS = False to serve everything
+from the sync views (the benchmark uses this to compare both paths).
+
+Stripe onboarding (AsyncStripeOnboardingView) is async for every request:
+it is two Stripe calls and one UPDATE, so it awaits the gateway's pooled
+async client instead of holding a thread while Stripe answers.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from stripe import StripeError
+
+from .models import User, Project, ChatRoom, Message
+from .serializers import ProjectSerializer, PublicUserProfileSerializer, ChatRoomSerializer, MessageSerializer
+from .caching import acached_response
+from .renderers import ORJSONRenderer
+from .conditional import avalidators, not_modified, add_validators
+from .fieldsets import sparse_queryset
+from .fastpath import row_format
+from .payments import get_gateway
+from .views import ProjectListCreateView, ProjectDetailView, PublicUserProfileView, MessageListView, annotate_profile_counts, profile_prefetches
+
+_jwt_authentication = JWTAuthentication()
+
+
+async def authenticate(request):
+    """
+    Async version of JWTAuthentication.authenticate: token checks stay sync
+    (no I/O), only the user lookup touches the database.
+    """
+    header = _jwt_authentication.get_header(request)
+    if header is None:
+        return AnonymousUser()
+    raw_token = _jwt_authentication.get_raw_token(header)
+    if raw_token is None:
+        return AnonymousUser()
+    validated_token = _jwt_authentication.get_validated_token(raw_token)
+
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise exceptions.AuthenticationFailed("Token contained no recognizable user identification", code="token_not_valid")
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise exceptions.AuthenticationFailed("User not found", code="user_not_found")
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed("User is inactive", code="user_inactive")
+    return user
+
+
+async def attach_last_messages(rooms):
+    """
+    Loads the newest message of every room in one query (rooms must be
+    annotated with `last_message_id`), for ChatRoomSerializer.last_message.
+    """
+    ids = [room.last_message_id for room in rooms if room.last_message_id]
+    messages = {msg.pk: msg async for msg in Message.objects.filter(pk__in=ids).select_related('sender')}
+    for room in rooms:
+        room.latest_message = messages.get(room.last_message_id)
+    return rooms
+
+
+class AsyncReadView(View):
+    """
+    Minimal async counterpart of a read-only DRF view: JWT authentication,
+    DRF-style error bodies and JSON rendering.
+    """
+    authentication_required = False
+    cache_policy = None # See api/caching.py
+    validator_query = None # See api/conditional.py
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            # A batch sub-request (api/batch.py) arrives with its user already authenticated
+            request.user = getattr(request, '_force_auth_user', None) or await authenticate(request)
+            if self.authentication_required and not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+
+            etag = await avalidators(self, request, kwargs)
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+
+            handler = getattr(self, 'get' if request.method in ('GET', 'HEAD') else request.method.lower(), None)
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+
+            async def respond():
+                return self.render(await handler(request, *args, **kwargs))
+            if self.cache_policy is not None:
+                response = await acached_response(self.cache_policy, request, kwargs, respond)
+            else:
+                response = await respond()
+            return add_validators(response, etag)
+        except exceptions.APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = self.render(data, status=exc.status_code)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response.status_code = 401 # DRF answers 401 when an authenticator offers a header
+                response['WWW-Authenticate'] = _jwt_authentication.authenticate_header(request)
+            return response
+
+    def render(self, data, status=200):
+        return HttpResponse(ORJSONRenderer().render(data), status=status, content_type='application/json')
+
+    def serializer_context(self, request):
+        return {'request': request, 'format': None, 'view': self}
+
+    async def paginate(self, request, queryset):
+        """
+        Same page numbers, links and errors as rest_framework.pagination.PageNumberPagination.
+        """
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        count = await queryset.acount()
+        num_pages = max(1, math.ceil(count / page_size))
+
+        page_number = request.GET.get('page', 1)
+        if page_number == 'last':
+            page_number = num_pages
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            raise exceptions.NotFound("Invalid page.")
+        if page_number < 1 or page_number > num_pages:
+            raise exceptions.NotFound("Invalid page.")
+
+        offset = (page_number - 1) * page_size
+        items = [obj async for obj in queryset[offset:offset + page_size]]
+
+        url = request.build_absolute_uri()
+        next_link = replace_query_param(url, 'page', page_number + 1) if page_number < num_pages else None
+        if page_number == 1:
+            previous_link = None
+        elif page_number == 2:
+            previous_link = remove_query_param(url, 'page')
+        else:
+            previous_link = replace_query_param(url, 'page', page_number - 1)
+        return count, next_link, previous_link, items
+
+    @staticmethod
+    def paginated(count, next_link, previous_link, results):
+        return {'count': count, 'next': next_link, 'previous': previous_link, 'results': results}
+
+
+class AsyncProjectListView(AsyncReadView):
+    """
+    Async GET for /api/projects/ (see ProjectListCreateView).
+    """
+    query_budget = 3 # auth, count, page
+
+    async def get(self, request):
+        # Reuse the sync view's filter backends so ?category=, ?search=, ?ordering= and ?fields= behave the same.
+        # Building the filtered queryset does no I/O.
+        drf_request = Request(request, authenticators=())
+        drf_request.user = request.user
+        sync_view = ProjectListCreateView(request=drf_request, args=(), kwargs={}, format_kwarg=None)
+        queryset = sync_view.filter_queryset(sync_view.get_queryset())
+
+        count, next_link, previous_link, projects = await self.paginate(request, queryset)
+        data = ProjectSerializer(projects, many=True, context=self.serializer_context(request)).data
+        return self.paginated(count, next_link, previous_link, data)
+
+
+class AsyncProjectDetailView(AsyncReadView):
+    """
+    Async GET for /api/projects/<pk>/ (see ProjectDetailView).
+    """
+    query_budget = 3 # auth, validators, project
+    validator_query = ProjectDetailView.validator_query
+
+    async def get(self, request, pk):
+        context = self.serializer_context(request)
+        queryset = sparse_queryset(Project.objects.select_related('client'), ProjectSerializer(context=context))
+        try:
+            project = await queryset.aget(pk=pk)
+        except Project.DoesNotExist:
+            raise exceptions.NotFound("No Project matches the given query.")
+        return ProjectSerializer(project, context=context).data
+
+
+class AsyncPublicUserProfileView(AsyncReadView):
+    """
+    Async GET for /api/profiles/<username>/ (see PublicUserProfileView).
+    """
+    query_budget = 5 # auth, profile, 3 prefetches
+    cache_policy = PublicUserProfileView.cache_policy # Same entries as the sync view
+
+    async def get(self, request, username):
+        context = self.serializer_context(request)
+        serializer = PublicUserProfileSerializer(context=context)
+        queryset = annotate_profile_counts(
+            User.objects.prefetch_related(*profile_prefetches()),
+            request.user,
+            set(serializer.fields),
+        )
+        try:
+            user = await sparse_queryset(queryset, serializer).aget(username=username)
+        except User.DoesNotExist:
+            raise exceptions.NotFound("No User matches the given query.")
+        return PublicUserProfileSerializer(user, context=context).data
+
+
+class AsyncChatRoomListView(AsyncReadView):
+    """
+    Async GET for /api/chats/ (see ChatRoomListView).
+    """
+    query_budget = 5 # auth, count, page, participants, last messages
+    authentication_required = True
+
+    async def get(self, request):
+        context = self.serializer_context(request)
+        serializer = ChatRoomSerializer(context=context)
+        with_last_message = 'last_message' in serializer.fields
+        queryset = ChatRoom.objects.filter(participants=request.user).order_by('-updated_at').prefetch_related('participants')
+        if with_last_message:
+            last_message_id = Message.objects.filter(room=OuterRef('pk')).order_by('-timestamp').values('pk')[:1]
+            queryset = queryset.annotate(last_message_id=Subquery(last_message_id))
+        count, next_link, previous_link, rooms = await self.paginate(request, sparse_queryset(queryset, serializer))
+        if with_last_message:
+            await attach_last_messages(rooms)
+        data = ChatRoomSerializer(rooms, many=True, context=context).data
+        return self.paginated(count, next_link, previous_link, data)
+
+
+class AsyncMessageListView(AsyncReadView):
+    """
+    Async GET for /api/chats/<room_id>/messages/ (see MessageListView, not paginated).
+    """
+    query_budget = 4 # auth, validators, membership check, messages
+    authentication_required = True
+    validator_query = MessageListView.validator_query
+
+    async def get(self, request, room_id):
+        if not await ChatRoom.objects.filter(id=room_id, participants=request.user).aexists():
+            return [] # Same as the sync view: non-participants just see nothing
+        context = self.serializer_context(request)
+        serializer = MessageSerializer(context=context)
+        queryset = sparse_queryset(Message.objects.filter(room_id=room_id).order_by('timestamp').select_related('sender'), serializer)
+        fmt = row_format(serializer, request)
+        if fmt is not None: # See api/fastpath.py
+            return fmt.rows([row async for row in fmt.values(queryset)])
+        messages = [msg async for msg in queryset]
+        return MessageSerializer(messages, many=True, context=context).data
+
+
+
+class OnboardingFailed(exceptions.APIException):
+    status_code = 500
+    default_detail = {"error": "Could not initiate onboarding."}
+
+
+class AsyncStripeOnboardingView(AsyncReadView):
+    """
+    Creates a Stripe Account (once) and an Account Link for user onboarding.
+    Accessible via POST /api/stripe/onboard/
+    Returns an onboarding URL for the frontend to redirect the user to.
+    """
+    query_budget = 2 # auth, storing the new account id
+    authentication_required = True
+
+    async def post(self, request):
+        user = request.user
+        return_url_base = "http://localhost:3000" # Your frontend URL
+        gateway = get_gateway()
+        try:
+            if not user.stripe_account_id:
+                print(f"Creating Stripe account for user {user.username}...")
+                account = await gateway.acreate_account(
+                    type='express',
+                    email=user.email,
+                    idempotency_key=f"onboard-account-{user.pk}", # A retried request reuses the same account
+                )
+                user.stripe_account_id = account.id
+                await user.asave(update_fields=['stripe_account_id'])
+                print(f"Stripe account created: {account.id}")
+            else:
+                print(f"User {user.username} already has Stripe account: {user.stripe_account_id}")
+
+            account_link = await gateway.acreate_account_link(
+                account=user.stripe_account_id,
+                refresh_url=f"{return_url_base}/stripe/reauth",
+                return_url=f"{return_url_base}/stripe/return?account_id={user.stripe_account_id}",
+                type='account_onboarding',
+            )
+        except StripeError as e:
+            print(f"Stripe Error creating onboarding link: {e}")
+            error_message = getattr(e, 'user_message', str(e))
+            raise OnboardingFailed({"error": f"Stripe Error: {error_message or 'Could not initiate onboarding.'}"})
+        print(f"Account Link created: {account_link.url}")
+        return {'onboarding_url': account_link.url}
+
+
+def with_async_reads(async_view, sync_view):
+    """
+    Serves GET/HEAD from `async_view` and every other method from the DRF `sync_view`.
+    """
+    sync_call = sync_to_async(sync_view)
+
+    def view_for(request):
+        if request.method in ('GET', 'HEAD') and settings.ASYNC_READ_VIEWS:
+            return async_view
+        return sync_view
+
+    async def view(request, *args, **kwargs):
+        if view_for(request) is async_view:
+            return await async_view(request, *args, **kwargs)
+        return await sync_call(request, *args, **kwargs)
+
+    view.csrf_exempt = True # DRF views are csrf-exempt; keep it that way for writes
+    view.view_for = view_for # Lets instrumentation find the view class that handles a request
+    return view
@@ -0,0 +1,193 @@
+# In api/batch.py
+"""
+POST /api/batch/: several API calls in one HTTP request.
+
+    {"requests": [
+        {"id": "project", "method": "GET", "path": "/api/projects/7/"},
+        {"id": "bids", "method": "GET", "path": "/api/projects/7/bids/?page=2"},
+        {"method": "POST", "path": "/api/projects/7/bid/", "body": {"amount": "90.00", "proposal": "..."}}
+    ], "concurrent": true}
+
+    -> {"responses": [{"id": "project", "status": 200, "headers": {...}, "body": {...}}, ...]}
+
+Sub-requests go straight to the views of api/urls.py, in process: the
+middleware stack runs once for the batch, and the JWT is checked (and the
+user loaded) once. The views still run their own permission checks and
+validation, so every sub-request gets exactly the status and body it would
+get on its own. Each one is also measured and checked against
+its view's query_budget separately (see api/metrics.py).
+
+Sub-requests run in order, so a GET sees the writes listed before it. With
+"concurrent": true, consecutive GET/HEAD requests run together: async read
+views interleave on the event loop, sync views still take turns on the
+sync thread (like any sync view under ASGI).
+"""
+import asyncio
+import io
+import time
+from urllib.parse import urlsplit
+
+import orjson
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from rest_framework import exceptions
+
+from .async_views import AsyncReadView
+from .metrics import MetricsMiddleware, start_collecting, stop_collecting
+
+READ_METHODS = ('GET', 'HEAD')
+METHODS = READ_METHODS + ('POST', 'PUT', 'PATCH', 'DELETE')
+# Response headers passed through to the batch response
+FORWARDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Location', 'Cache-Control', 'Retry-After')
+# Request headers that belong to the batch request itself, not to its sub-requests
+_BATCH_ONLY_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_MATCH', 'HTTP_IF_UNMODIFIED_SINCE', 'HTTP_CONTENT_LENGTH', 'HTTP_CONTENT_TYPE')
+
+
+def _api_views():
+    from .urls import urlpatterns # Not at import time: api/urls.py imports this module
+    return {pattern.callback for pattern in urlpatterns}
+
+
+class SubRequest:
+    def __init__(self, index, spec):
+        if not isinstance(spec, dict):
+            raise exceptions.ValidationError({'requests': [f"Item {index}: must be an object."]})
+        self.id = spec.get('id', index)
+        self.method = str(spec.get('method', 'GET')).upper()
+        if self.method not in METHODS:
+            raise exceptions.ValidationError({'requests': [f"Item {index}: unsupported method {self.method}."]})
+        path = spec.get('path')
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise exceptions.ValidationError({'requests': [f"Item {index}: 'path' must be an absolute path such as /api/projects/."]})
+        self.path, self.query = urlsplit(path)[2:4]
+        self.body = orjson.dumps(spec['body']) if spec.get('body') is not None else b''
+        headers = spec.get('headers') or {}
+        if not isinstance(headers, dict):
+            raise exceptions.ValidationError({'requests': [f"Item {index}: 'headers' must be an object."]})
+        self.headers = {'HTTP_' + name.upper().replace('-', '_'): str(value) for name, value in headers.items()}
+
+    @property
+    def is_read(self):
+        return self.method in READ_METHODS
+
+    def build(self, batch_request):
+        """
+        The Django request for this sub-request: the batch request's headers and user, its own method, path and body.
+        """
+        environ = {
+            key: value for key, value in batch_request.META.items()
+            if isinstance(value, str) and key not in _BATCH_ONLY_HEADERS
+            and (key.startswith('HTTP_') or key in ('SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL', 'REMOTE_ADDR'))
+        }
+        environ.update(self.headers)
+        environ.update({
+            'REQUEST_METHOD': self.method, 'PATH_INFO': self.path, 'SCRIPT_NAME': '', 'QUERY_STRING': self.query,
+            'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(self.body)),
+            'wsgi.input': io.BytesIO(self.body), 'wsgi.url_scheme': batch_request.scheme,
+        })
+        request = WSGIRequest(environ)
+        request.user = batch_request.user
+        if batch_request.user.is_authenticated:
+            # DRF views take this user instead of authenticating again (like APIClient.force_authenticate)
+            request._force_auth_user = batch_request.user
+            request._force_auth_token = getattr(batch_request, 'auth', None)
+        return request
+
+
+def _error(status, detail):
+    return status, {'Content-Type': 'application/json'}, orjson.dumps({'detail': detail})
+
+
+async def run(sub, batch_request):
+    """
+    (status, headers, body bytes) of one sub-request.
+    """
+    try:
+        match = resolve(sub.path)
+    except Resolver404:
+        return _error(404, "Not found.")
+    if match.func not in _api_views() or match.url_name == 'batch':
+        return _error(400, "Only API endpoints can be batched.")
+
+    request = sub.build(batch_request)
+    request.resolver_match = match
+
+    def respond():
+        try:
+            return match.func(request, *match.args, **match.kwargs)
+        except Exception as exc: # The 500 (logged) that the handler would have sent for this request alone
+            return response_for_exception(request, exc)
+
+    collector, token = start_collecting()
+    started = time.perf_counter()
+    try:
+        if iscoroutinefunction(match.func):
+            try:
+                response = await match.func(request, *match.args, **match.kwargs)
+            except Exception as exc:
+                response = await sync_to_async(response_for_exception)(request, exc)
+        else:
+            response = await sync_to_async(respond)()
+        if hasattr(response, 'render') and not response.is_rendered: # DRF responses are rendered by the handler, which we skip
+            response = await sync_to_async(response.render)()
+    finally:
+        stop_collecting(token)
+    MetricsMiddleware.record(request, response, time.perf_counter() - started, collector)
+
+    if response.streaming:
+        return _error(400, "Streaming responses cannot be batched.")
+    headers = {name: response[name] for name in FORWARDED_HEADERS if response.has_header(name)}
+    return response.status_code, headers, response.content
+
+
+def encode(sub, status, headers, content):
+    """
+    One entry of the batch response. JSON bodies are embedded as they are, without decoding them.
+    """
+    envelope = orjson.dumps({'id': sub.id, 'status': status, 'headers': headers})
+    if not content:
+        body = b'null'
+    elif headers.get('Content-Type', '').startswith('application/json'):
+        body = content
+    else:
+        body = orjson.dumps(content.decode('utf-8', 'replace'))
+    return envelope[:-1] + b',"body":' + body + b'}'
+
+
+class BatchView(AsyncReadView):
+    """
+    Accessible via POST /api/batch/ (see the module docstring).
+    """
+    query_budget = {'POST': 1} # auth; sub-requests are checked against their own views' budgets
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            payload = orjson.loads(request.body)
+        except orjson.JSONDecodeError:
+            raise exceptions.ParseError()
+        specs = payload.get('requests') if isinstance(payload, dict) else None
+        if not isinstance(specs, list) or not specs:
+            raise exceptions.ValidationError({'requests': ["A non-empty list of sub-requests is required."]})
+        if len(specs) > settings.BATCH_MAX_REQUESTS:
+            raise exceptions.ValidationError({'requests': [f"At most {settings.BATCH_MAX_REQUESTS} sub-requests per batch."]})
+        subs = [SubRequest(index, spec) for index, spec in enumerate(specs)]
+
+        results = []
+        i = 0
+        while i < len(subs):
+            group = [subs[i]]
+            if payload.get('concurrent'):
+                while group[-1].is_read and i + len(group) < len(subs) and subs[i + len(group)].is_read:
+                    group.append(subs[i + len(group)])
+            results += await asyncio.gather(*(run(sub, request) for sub in group))
+            i += len(group)
+        return b'{"responses":[' + b','.join(encode(sub, *result) for sub, result in zip(subs, results)) + b']}'
+
+    def render(self, data, status=200):
+        if isinstance(data, bytes): # Already encoded by post()
+            return HttpResponse(data, status=status, content_type='application/json')
+        return super().render(data, status)
@@ -0,0 +1,179 @@
+# In api/benchmarks.py
+"""
+Shared helpers for the `bench_*` management commands.
+
+Benchmarks run against a throwaway test database (created the same way
+`manage.py test` does), so they never touch real data.
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Count
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from .datagen import generate_dataset
+from .models import User
+
+BENCHMARK_SIZES = {
+    'clients': 25, 'freelancers': 75, 'projects': 300, 'bids_per_project': 3,
+    'follows_per_user': 3, 'rooms': 40, 'messages': 1_000,
+}
+
+# Changes smaller than this never count as a regression, however large the ratio (timer and allocator noise)
+REGRESSION_MIN_DELTA = {'p50_ms': 1.0, 'queries': 0, 'alloc_kib': 16}
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    logging.getLogger('django.request').setLevel(logging.ERROR) # No per-request 4xx warnings in the output
+    setup_test_environment()
+    old_config = setup_databases(verbosity=verbosity, interactive=False, aliases={'default'})
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+        teardown_test_environment()
+
+
+@contextmanager
+def extra_database(alias, name, **overrides):
+    """
+    Registers a migrated, file-backed database under `alias` for the duration
+    of the block, e.g. to compare connection settings side by side.
+    """
+    config = {**connections.settings['default'], 'NAME': str(name), 'TEST': {}, **overrides}
+    connections.settings[alias] = connections.configure_settings({'default': config})['default']
+    try:
+        call_command('migrate', database=alias, verbosity=0, interactive=False)
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of an unsorted list.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies, elapsed):
+    """
+    latencies in seconds -> requests/sec and millisecond percentiles.
+    """
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def format_table(rows, columns):
+    """
+    Renders a list of dicts as a fixed-width text table.
+    """
+    def cell(value):
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    widths = {c: max(len(c), *(len(cell(r.get(c, ''))) for r in rows)) for c in columns}
+    lines = ['  '.join(c.ljust(widths[c]) for c in columns)]
+    lines.append('  '.join('-' * widths[c] for c in columns))
+    for row in rows:
+        lines.append('  '.join(cell(row.get(c, '')).ljust(widths[c]) for c in columns))
+    return '\n'.join(lines)
+
+
+async def run_concurrent(request, total, concurrency):
+    """
+    Calls the coroutine function `request()` `total` times with at most
+    `concurrency` in flight. Returns (latencies, elapsed, failures).
+    """
+    latencies = []
+    failures = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal failures
+        for _ in remaining:
+            started = time.perf_counter()
+            ok = await request()
+            latencies.append(time.perf_counter() - started)
+            failures += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started, failures
+
+
+def seed_small_dataset(**sizes):
+    """
+    Small, fast dataset for benchmarks that only need realistic shapes (see api/datagen.py).
+    Returns the client user the benchmarks authenticate as: the one in the most chat rooms.
+    """
+    generate_dataset(**{**BENCHMARK_SIZES, **sizes})
+    return (
+        User.objects.filter(role=User.Role.CLIENT, projects_as_client__isnull=False)
+        .annotate(rooms=Count('chat_rooms', distinct=True)).order_by('-rooms', 'pk').first()
+    )
+
+
+def load_baseline(path):
+    """
+    {row name: {metric: value}} from a file written by save_baseline, or None if there is none yet.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)['routes']
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, rows, metrics, rerecord=False):
+    """
+    Adds the rows that have no entry yet to the baseline at `path`. Existing entries
+    are only overwritten with `rerecord` (do that in its own commit, saying why).
+    Returns the names written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    routes = load_baseline(path) or {}
+    written = [row['name'] for row in rows if rerecord or row['name'] not in routes]
+    for row in rows:
+        if row['name'] in written:
+            routes[row['name']] = {metric: round(row[metric], 2) for metric in metrics}
+    with open(path, 'w') as f:
+        json.dump({'routes': routes}, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return written
+
+
+def compare_to_baseline(rows, baseline, thresholds):
+    """
+    Regressions of `rows` against a stored baseline. `thresholds` maps a metric
+    to the allowed ratio, e.g. {'p50_ms': 1.5, 'queries': 1.0}.
+    Rows without a baseline entry are skipped. Returns a list of messages.
+    """
+    regressions = []
+    for row in rows:
+        before = baseline.get(row['name'])
+        if before is None:
+            continue
+        for metric, ratio in thresholds.items():
+            if metric not in before:
+                continue
+            old, new = before[metric], row[metric]
+            if new > old * ratio and new - old > REGRESSION_MIN_DELTA.get(metric, 0):
+                regressions.append(f"{row['name']}: {metric} {round(old, 2):g} -> {round(new, 2):g} (allowed x{ratio:g})")
+    return regressions
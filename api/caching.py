@@ -0,0 +1,210 @@
+# In api/caching.py
+"""
+Response caching for read endpoints.
+
+A view opts in declaratively with a `cache_policy` class attribute:
+
+    cache_policy = CachePolicy(timeout=60, vary_on=('user',), depends_on=('profile:{username}',))
+
+- vary_on: 'user' gives every logged-in user their own copy (anonymous
+  visitors share one), 'role' one copy per role. Empty = one copy for everyone.
+- depends_on: namespaces the response is built from. URL kwargs are filled in,
+  so 'profile:{username}' is the namespace of one profile.
+
+Invalidation is generational: every namespace has a generation number in the
+cache and the generations are part of the response key. The model signals at
+the bottom bump them, and entries built from older data are never read
+again; they simply expire. This works the same on every backend (locmem,
+file, Redis), none of which can delete by key pattern.
+
+Queryset update()/bulk_update() send no signals; call invalidate() (or
+invalidate_profiles()) next to them.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.http import HttpResponse
+
+from .models import User, Skill, Project, Follow
+
+
+class CachePolicy:
+    def __init__(self, timeout, vary_on=(), depends_on=()):
+        self.timeout = timeout
+        self.vary_on = tuple(vary_on)
+        self.depends_on = tuple(depends_on)
+
+    def namespaces(self, view_kwargs):
+        return [namespace.format(**view_kwargs) for namespace in self.depends_on]
+
+    def vary_key(self, request):
+        user = request.user
+        parts = []
+        for name in self.vary_on:
+            if not user.is_authenticated:
+                parts.append('anon')
+            elif name == 'user':
+                parts.append(f'user={user.pk}')
+            elif name == 'role':
+                parts.append(f'role={user.role}')
+        return ','.join(parts)
+
+
+def _generation_key(namespace):
+    return f"cache-gen:{namespace}"
+
+
+def _response_key(policy, request, generations):
+    renderer = getattr(request, 'accepted_renderer', None) # DRF content negotiation (JSON vs browsable API)
+    fmt = getattr(renderer, 'format', 'json')
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"response:{fmt}:{policy.vary_key(request)}:{'.'.join(map(str, generations))}:{path}"
+
+
+def _generations(namespaces):
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Start from a fresh number, so entries from before an eviction cannot match again
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+async def _agenerations(namespaces):
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            found[key] = await cache.aget(key)
+    return [found[key] for key in keys]
+
+
+def policy_version(policy, request, view_kwargs):
+    """
+    Everything a response under `policy` is built from (see api/conditional.py).
+    """
+    return (policy.vary_key(request), *_generations(policy.namespaces(view_kwargs)))
+
+
+async def apolicy_version(policy, request, view_kwargs):
+    return (policy.vary_key(request), *(await _agenerations(policy.namespaces(view_kwargs))))
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        key = _generation_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError: # Not in the cache (yet, or any more)
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*namespaces):
+    """
+    Bumps the namespaces now and again on commit: a request that read the
+    old rows while the transaction was open cannot leave them cached.
+    """
+    _bump(namespaces)
+    transaction.on_commit(lambda: _bump(namespaces))
+
+
+def invalidate_profiles(user_ids):
+    usernames = User.objects.filter(pk__in=[pk for pk in user_ids if pk]).values_list('username', flat=True)
+    invalidate(*(f'profile:{username}' for username in usernames))
+
+
+def _entry(response):
+    return response.content, response['Content-Type']
+
+
+def _cached(entry):
+    content, content_type = entry
+    return HttpResponse(content, content_type=content_type)
+
+
+class CachedResponseMixin:
+    """
+    Serves GET from the cache for DRF views that declare a `cache_policy`.
+    Authentication and permission checks still run on every request.
+    """
+    cache_policy = None
+
+    def get(self, request, *args, **kwargs):
+        policy = self.cache_policy
+        key = _response_key(policy, request, _generations(policy.namespaces(kwargs)))
+        entry = cache.get(key)
+        if entry is not None:
+            return _cached(entry)
+        response = super().get(request, *args, **kwargs)
+
+        def store(rendered):
+            if rendered.status_code == 200:
+                cache.set(key, _entry(rendered), policy.timeout)
+        response.add_post_render_callback(store) # DRF responses only have content once rendered
+        return response
+
+
+async def acached_response(policy, request, view_kwargs, respond):
+    """
+    Async counterpart of CachedResponseMixin (see AsyncReadView.dispatch):
+    `respond()` builds the response on a miss.
+    """
+    key = _response_key(policy, request, await _agenerations(policy.namespaces(view_kwargs)))
+    entry = await cache.aget(key)
+    if entry is not None:
+        return _cached(entry)
+    response = await respond()
+    if response.status_code == 200:
+        await cache.aset(key, _entry(response), policy.timeout)
+    return response
+
+
+# --- Invalidation (connected in ApiConfig.ready) ---
+
+def skill_changed(sender, **kwargs):
+    invalidate('skills')
+
+
+def user_loaded(sender, instance, **kwargs):
+    # Profiles are cached by username, so a rename has to invalidate the old one too
+    instance._stored_username = instance.__dict__.get('username') # No query when it is deferred
+
+
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return # Every token login saves last_login, which no cached response shows
+    usernames = {instance.username, getattr(instance, '_stored_username', None) or instance.username}
+    invalidate(*(f'profile:{username}' for username in usernames))
+    instance._stored_username = instance.username
+
+
+def user_skills_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, User):
+        invalidate(f'profile:{instance.username}')
+    elif pk_set:
+        invalidate_profiles(pk_set) # skill.users.add(...)
+
+
+def project_changed(sender, instance, **kwargs):
+    invalidate_profiles([instance.client_id, instance.freelancer_id]) # Profiles embed their projects
+
+
+def follow_changed(sender, instance, **kwargs):
+    invalidate_profiles([instance.follower_id, instance.following_id]) # Follower counts
+
+
+def connect_signals():
+    receivers = [(skill_changed, Skill), (user_changed, User), (project_changed, Project), (follow_changed, Follow)]
+    for receiver, model in receivers:
+        post_save.connect(receiver, sender=model, dispatch_uid=f'api.caching.{receiver.__name__}.save')
+        post_delete.connect(receiver, sender=model, dispatch_uid=f'api.caching.{receiver.__name__}.delete')
+    post_init.connect(user_loaded, sender=User, dispatch_uid='api.caching.user_loaded')
+    m2m_changed.connect(user_skills_changed, sender=User.skills.through, dispatch_uid='api.caching.user_skills_changed')
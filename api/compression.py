@@ -0,0 +1,144 @@
+# In api/compression.py
+"""
+Negotiated response compression: brotli or gzip.
+
+Works like django.middleware.gzip.GZipMiddleware, with three differences:
+- brotli is preferred when the client accepts it and the optional `brotli`
+  package is installed (smaller than gzip on JSON at similar CPU cost);
+- Accept-Encoding q-values are honoured ("br;q=0" turns brotli off);
+- bodies under COMPRESSION_MIN_SIZE bytes are sent as they are. Compressing
+  a small error body or 304 costs more CPU than it saves bytes.
+
+Only API-style content types are compressed: images and uploads already
+are, and HTML pages (the admin) carry CSRF tokens, which compression would
+expose to BREACH. Streaming responses are compressed chunk by chunk.
+"""
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError: # brotli is optional; without it everything is gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(r'^(text/(plain|csv|css|javascript)|application/(json|javascript|xml|x-ndjson|[\w.+-]+\+json))\b')
+
+
+def parse_accept_encoding(header):
+    """
+    'gzip, br;q=0.5' -> {'gzip': 1.0, 'br': 0.5}.
+    """
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """
+    The encoding to use for a request's Accept-Encoding header, or None.
+    """
+    accepted = parse_accept_encoding(header)
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best = max(available, key=lambda name: accepted.get(name, accepted.get('*', 0.0)))
+    return best if accepted.get(best, accepted.get('*', 0.0)) > 0 else None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(content)
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush() # Flush so every chunk reaches the client now
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _agzip_sequence(sequence):
+    async for chunk in sequence:
+        yield compress_string(chunk) # One gzip member per chunk, as GZipMiddleware does for async streams
+
+
+def compress_response(request, response):
+    """
+    Compresses `response` in place when the request and the content allow it.
+    """
+    if response.has_header('Content-Encoding') or not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+        return response
+    if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        if response.is_async:
+            sequence = _abrotli_sequence if encoding == 'br' else _agzip_sequence
+        else:
+            sequence = _brotli_sequence if encoding == 'br' else compress_sequence
+        response.streaming_content = sequence(response.streaming_content)
+        del response.headers['Content-Length'] # Unknown until the last chunk
+    else:
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+    # The compressed body is a different representation: weaken a strong ETag (as GZipMiddleware does)
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class CompressionMiddleware:
+    """
+    Goes right after MetricsMiddleware, so response sizes are recorded as sent.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
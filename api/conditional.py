@@ -0,0 +1,105 @@
+# In api/conditional.py
+"""
+Conditional GET (ETag) for read endpoints.
+
+A view opts in with a `validator_query(request, **kwargs)` method that
+returns a values_list() queryset for one small row, typically the object's
+updated_at plus whatever related values the body shows. The ETag is built
+from that row alone, so If-None-Match is answered with a 304 before the
+object is loaded or serialized. No row (not found, not the owner) means no validators: the view
+answers exactly as it would without them.
+
+Views with a `cache_policy` (api/caching.py) and no validator_query use the
+cache generations instead, which costs no query at all.
+
+The validator row has to change whenever the body does. Queryset update()s
+of these models therefore set updated_at explicitly, and
+save(update_fields=...) lists it. There is no Last-Modified: it has
+one-second precision, so a client sending only If-Modified-Since would get
+a 304 after a second change within the same second, or after a change to a
+related row.
+"""
+import hashlib
+
+from django.db.models import Aggregate, CharField
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .caching import policy_version, apolicy_version
+
+
+class GroupConcat(Aggregate):
+    """
+    SQLite's GROUP_CONCAT, for folding the related values a list shows (e.g.
+    every sender's username) into its validator row. Unlike Max(), it changes
+    when any of them does.
+    """
+    function = 'GROUP_CONCAT'
+    allow_distinct = True
+    output_field = CharField()
+
+
+def _etag(request, parts):
+    renderer = getattr(request, 'accepted_renderer', None) # JSON and the browsable API differ
+    fmt = getattr(renderer, 'format', 'json')
+    raw = '|'.join(map(str, (request.get_full_path(), fmt, *parts)))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def _from_row(request, row):
+    """
+    The ETag for a validator row, or None without a row.
+    """
+    if row is None:
+        return None
+    return _etag(request, row if isinstance(row, tuple) else (row,))
+
+
+def validators(view, request, view_kwargs):
+    query = getattr(view, 'validator_query', None)
+    if query is not None:
+        return _from_row(request, query(request, **view_kwargs).first())
+    if getattr(view, 'cache_policy', None) is not None:
+        return _etag(request, policy_version(view.cache_policy, request, view_kwargs))
+    return None
+
+
+async def avalidators(view, request, view_kwargs):
+    query = getattr(view, 'validator_query', None)
+    if query is not None:
+        return _from_row(request, await query(request, **view_kwargs).afirst())
+    if getattr(view, 'cache_policy', None) is not None:
+        return _etag(request, await apolicy_version(view.cache_policy, request, view_kwargs))
+    return None
+
+
+def not_modified(request, etag):
+    """
+    The 304 (or 412) answer to the request's preconditions, or None when the full response is needed.
+    """
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
+def add_validators(response, etag):
+    if etag is not None and response.status_code == 200:
+        response['ETag'] = etag
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET with 304 when the client's copy is current. Goes first in
+    the bases, so authentication and permissions have run but nothing else.
+    """
+
+    def get(self, request, *args, **kwargs):
+        etag = validators(self, request, kwargs)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        return add_validators(super().get(request, *args, **kwargs), etag)
@@ -2,10 +2,16 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from .db_router import pin_to_primary, user_client_key
+from .metrics import MetricsConsumerMixin
 from .models import Message, ChatRoom, User
 from .serializers import MessageSerializer
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
+    query_budget = {'websocket.connect': 2, 'websocket.receive': 3} # See api/nplusone.py
+
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'chat_{self.room_id}'
@@ -73,8 +79,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
         Check if a user is a participant in the given room.
         """
         try:
-            # Check if a room exists with this ID
-            room = ChatRoom.objects.get(id=room_id)
+            # Check if a room exists with this ID (on the primary, a room created a moment ago may not be on the replicas yet)
+            room = ChatRoom.objects.using(DEFAULT_DB_ALIAS).get(id=room_id)
             # Check if the user is in the participants list
             if user in room.participants.all():
                 print(f"Auth check: User {user.username} IS a participant.")
@@ -94,11 +100,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
 Save a new message to the database.
         """
-        room = ChatRoom.objects.get(id=self.room_id)
+        # The primary, like the participant check: a websocket has no request routing
+        room = ChatRoom.objects.using(DEFAULT_DB_ALIAS).get(id=self.room_id)
         message = Message.objects.create(
             room=room,
             sender=self.user,
             content=content
         )
-        room.save() # Update the room's 'updated_at' timestamp
+        ChatRoom.objects.filter(pk=room.pk).update(updated_at=timezone.now()) # Update the room's 'updated_at' timestamp
+        # The sender's next HTTP requests (e.g. the message list) read from the primary too
+        pin_to_primary(user_client_key(self.user.pk))
         return message
\ No newline at end of file
@@ -0,0 +1,335 @@
+# In api/datagen.py
+"""
+Seeded synthetic data for load tests and benchmarks.
+
+`generate_dataset` builds clients, freelancers (with skills, rates and bios),
+projects, bids, follows, chat rooms and messages. The same seed always gives
+the same data. Profiles, project descriptions and skills are drawn from the
+same category vocabularies, so search and the TF-IDF matcher behave like they
+do on real data.
+
+Rows are written with batched bulk_create inside one transaction per table.
+Every user shares one pre-hashed password, and only primary keys are kept in
+memory. Timestamps are spread over the last year and stay consistent (a
+message is never older than its room, a room's updated_at is its last message).
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import User, Skill, Project, Bid, ChatRoom, Message, Follow
+
+CATEGORY_SKILLS = {
+    'webdev': [
+        'Python', 'Django', 'React', 'JavaScript', 'TypeScript', 'Node.js', 'PostgreSQL', 'REST APIs',
+        'Vue.js', 'HTML', 'CSS', 'Tailwind CSS', 'GraphQL', 'Docker', 'AWS', 'Next.js', 'Flask', 'Redis',
+    ],
+    'design': [
+        'Figma', 'Photoshop', 'Illustrator', 'UI Design', 'UX Research', 'Logo Design', 'Branding',
+        'Typography', 'InDesign', 'Motion Graphics', 'Wireframing', 'Prototyping',
+    ],
+    'writing': [
+        'Copywriting', 'Technical Writing', 'Blog Writing', 'Proofreading', 'Translation', 'SEO Writing',
+        'Editing', 'Ghostwriting', 'Product Descriptions', 'Scriptwriting',
+    ],
+    'marketing': [
+        'SEO', 'Google Ads', 'Social Media', 'Email Marketing', 'Content Strategy', 'Facebook Ads',
+        'Google Analytics', 'Market Research', 'Influencer Marketing', 'Conversion Optimization',
+    ],
+    'other': ['Data Entry', 'Excel', 'Virtual Assistant', 'Customer Support', 'Video Editing', 'Bookkeeping'],
+}
+
+FIRST_NAMES = [
+    'Maria', 'James', 'Aisha', 'Wei', 'Carlos', 'Priya', 'Liam', 'Sofia', 'Noah', 'Fatima', 'Lucas', 'Yuki',
+    'Emma', 'Omar', 'Olivia', 'Mateo', 'Chloe', 'Arjun', 'Hannah', 'Diego', 'Zara', 'Ethan', 'Amara', 'Felix',
+]
+LAST_NAMES = [
+    'Garcia', 'Smith', 'Khan', 'Chen', 'Silva', 'Patel', 'Schmidt', 'Rossi', 'Kim', 'Okafor', 'Nguyen', 'Cohen',
+    'Johansson', 'Dubois', 'Novak', 'Tanaka', 'Lopez', 'Ivanova', 'Brown', 'Haddad', 'Costa', 'Walsh',
+]
+COMPANY_WORDS = ['Bright', 'North', 'Blue', 'Pixel', 'Summit', 'Green', 'Atlas', 'Nova', 'Harbor', 'Peak', 'Orbit']
+COMPANY_SUFFIXES = ['Labs', 'Studio', 'Digital', 'Ventures', 'Solutions', 'Works', 'Media', 'Co']
+
+ROLE_NOUNS = {
+    'webdev': 'full-stack developer', 'design': 'product designer', 'writing': 'content writer',
+    'marketing': 'growth marketer', 'other': 'virtual assistant',
+}
+DELIVERABLES = {
+    'webdev': ['web app', 'REST API', 'customer dashboard', 'booking system', 'e-commerce site', 'admin panel'],
+    'design': ['logo', 'brand identity', 'mobile app UI', 'landing page design', 'pitch deck', 'style guide'],
+    'writing': ['blog series', 'product descriptions', 'technical documentation', 'newsletter', 'website copy'],
+    'marketing': ['SEO audit', 'ad campaign', 'social media strategy', 'email funnel', 'launch plan'],
+    'other': ['data cleanup', 'spreadsheet model', 'support inbox setup', 'video edit', 'bookkeeping catch-up'],
+}
+BUSINESSES = [
+    'a coffee roaster', 'a dental clinic', 'a fintech startup', 'a yoga studio', 'an online bookstore',
+    'a logistics company', 'a nonprofit', 'a SaaS product', 'a real estate agency', 'a local bakery',
+]
+CHAT_LINES = [
+    "Hi! I saw your proposal, do you have time for a quick call?",
+    "Sure, I'm available tomorrow afternoon.",
+    "Can you share a few examples of similar work?",
+    "Here's the latest draft, let me know what you think.",
+    "Looks great, just a couple of small changes.",
+    "What's your estimate for the first milestone?",
+    "I pushed the fixes, please take another look.",
+    "Thanks, that's exactly what we needed!",
+    "Could we move the deadline by two days?",
+    "Invoice sent, thanks for the smooth collaboration.",
+]
+
+SCALES = {
+    # Roughly 5 s, 1 min and 10 min on SQLite
+    'small': {'clients': 200, 'freelancers': 800, 'projects': 2_000, 'bids_per_project': 5, 'follows_per_user': 5, 'rooms': 500, 'messages': 20_000},
+    'medium': {'clients': 2_000, 'freelancers': 10_000, 'projects': 20_000, 'bids_per_project': 8, 'follows_per_user': 10, 'rooms': 5_000, 'messages': 200_000},
+    'large': {'clients': 20_000, 'freelancers': 100_000, 'projects': 200_000, 'bids_per_project': 10, 'follows_per_user': 20, 'rooms': 50_000, 'messages': 1_000_000},
+}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Lets bulk_create keep the timestamps we generate instead of auto_now/auto_now_add overwriting them.
+    """
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _insert(model, rows, batch_size, using, keep=lambda obj: obj.pk):
+    """
+    bulk_creates an iterable of unsaved instances in batches. Returns
+    `keep(obj)` for every row (the primary key by default), so the instances
+    themselves can be garbage collected.
+    """
+    kept = []
+    rows = iter(rows)
+    with transaction.atomic(using=using):
+        while batch := list(islice(rows, batch_size)):
+            model.objects.using(using).bulk_create(batch, batch_size=batch_size)
+            kept.extend(map(keep, batch))
+    return kept
+
+
+class DatasetGenerator:
+    def __init__(self, seed=42, batch_size=5_000, password='loadtest-pass', using=DEFAULT_DB_ALIAS, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.password = make_password(password) # Hashed once, shared by every generated user
+        self.using = using
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+
+    def moment(self, days_ago_max=365, after=None):
+        start = after or self.now - timedelta(days=days_ago_max)
+        span = max(1, int((self.now - start).total_seconds()))
+        return start + timedelta(seconds=self.rng.randrange(span))
+
+    # --- Text ---
+    def person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def bio(self, category, skills):
+        years = self.rng.randint(1, 15)
+        listed = ', '.join(skills[:-1]) + f" and {skills[-1]}" if len(skills) > 1 else skills[0]
+        return (
+            f"{self.rng.choice(['Experienced', 'Detail-oriented', 'Senior', 'Friendly', 'Reliable'])} {ROLE_NOUNS[category]} "
+            f"with {years} years of experience in {listed}. "
+            f"I have delivered {self.rng.choice(DELIVERABLES[category])} projects for {self.rng.choice(BUSINESSES)} "
+            f"and {self.rng.choice(BUSINESSES)}. {self.rng.choice(['Fast turnaround', 'Clear communication', 'Clean, tested work'])} guaranteed."
+        )
+
+    def project_text(self, category, skills):
+        deliverable = self.rng.choice(DELIVERABLES[category])
+        business = self.rng.choice(BUSINESSES)
+        title = f"{self.rng.choice(['Build', 'Create', 'Redesign', 'Improve', 'Launch'])} a {deliverable} for {business}"
+        description = (
+            f"We are {business} looking for help with a {deliverable}. "
+            f"The ideal freelancer is comfortable with {', '.join(skills)}. "
+            f"{self.rng.choice(['Timeline is about two weeks.', 'This is an ongoing engagement.', 'We need the first version within a month.'])} "
+            f"Please include relevant examples in your proposal."
+        )
+        return title[:255], description
+
+    # --- Tables ---
+    def skills(self):
+        names = [name for names in CATEGORY_SKILLS.values() for name in names]
+        Skill.objects.using(self.using).bulk_create([Skill(name=name) for name in names], ignore_conflicts=True)
+        return dict(Skill.objects.using(self.using).filter(name__in=names).values_list('name', 'pk'))
+
+    def users(self, clients, freelancers, skill_ids):
+        rng = self.rng
+        self.freelancer_categories = [rng.choice(list(CATEGORY_SKILLS)) for _ in range(freelancers)]
+        self.freelancer_skills = [
+            rng.sample(CATEGORY_SKILLS[category], rng.randint(3, min(7, len(CATEGORY_SKILLS[category]))))
+            for category in self.freelancer_categories
+        ]
+
+        def build():
+            for i in range(clients + freelancers):
+                first, last = self.person()
+                user = User(
+                    username=f"{first}.{last}{i}".lower(), name=f"{first} {last}", email=f"{first}.{last}{i}@example.com".lower(),
+                    password=self.password, date_joined=self.moment(),
+                )
+                if i < clients:
+                    company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+                    user.role, user.availability = User.Role.CLIENT, None
+                    user.company_name = company
+                    user.company_website = f"https://{company.lower().replace(' ', '')}.example.com"
+                else:
+                    n = i - clients
+                    user.role = User.Role.FREELANCER
+                    user.availability = rng.choices(
+                        [User.Availability.AVAILABLE, User.Availability.BUSY, User.Availability.NOT_AVAILABLE], [60, 25, 15],
+                    )[0]
+                    user.hourly_rate = Decimal(rng.randrange(15, 151))
+                    user.bio = self.bio(self.freelancer_categories[n], self.freelancer_skills[n])
+                yield user
+
+        pks = _insert(User, build(), self.batch_size, self.using)
+        self.clients, self.freelancers = pks[:clients], pks[clients:]
+
+        through = User.skills.through
+        _insert(through, (
+            through(user_id=pk, skill_id=skill_ids[name])
+            for pk, names in zip(self.freelancers, self.freelancer_skills) for name in names
+        ), self.batch_size, self.using)
+
+    def projects(self, count):
+        rng = self.rng
+        statuses = [Project.Status.OPEN, Project.Status.IN_PROGRESS, Project.Status.PENDING_APPROVAL, Project.Status.COMPLETED]
+
+        def build():
+            for _ in range(count):
+                category = rng.choices(list(CATEGORY_SKILLS), [40, 20, 15, 15, 10])[0]
+                skills = rng.sample(CATEGORY_SKILLS[category], rng.randint(2, 4))
+                title, description = self.project_text(category, skills)
+                status = rng.choices(statuses, [70, 15, 5, 10])[0]
+                created_at = self.moment()
+                yield Project(
+                    title=title, description=description, category=category, skills_required=','.join(skills),
+                    budget=Decimal(rng.randrange(50, 10_000, 25)), status=status, client_id=rng.choice(self.clients),
+                    freelancer_id=None if status == Project.Status.OPEN else rng.choice(self.freelancers),
+                    created_at=created_at, updated_at=self.moment(after=created_at),
+                )
+
+        # What bids() needs to know about every project
+        self.project_rows = _insert(
+            Project, build(), self.batch_size, self.using,
+            keep=lambda p: (p.pk, p.status, p.freelancer_id, p.created_at),
+        )
+
+    def bids(self, per_project):
+        rng = self.rng
+
+        def build():
+            for pk, status, assigned, created_at in self.project_rows:
+                bidders = rng.sample(self.freelancers, min(per_project, len(self.freelancers)))
+                if assigned and assigned not in bidders:
+                    bidders[0] = assigned
+                for freelancer in bidders:
+                    if status == Project.Status.OPEN:
+                        bid_status = Bid.Status.PENDING
+                    else:
+                        bid_status = Bid.Status.ACCEPTED if freelancer == assigned else Bid.Status.REJECTED
+                    bid = Bid(
+                        project_id=pk, freelancer_id=freelancer, status=bid_status,
+                        amount=Decimal(rng.randrange(50, 10_000, 25)), created_at=self.moment(after=created_at),
+                        proposal=rng.choice([
+                            "I have built very similar projects and can start right away.",
+                            "Happy to help! I can share a detailed plan and timeline on a call.",
+                            "This matches my experience closely, see my profile for examples.",
+                        ]),
+                    )
+                    bid.updated_at = bid.created_at
+                    yield bid
+
+        _insert(Bid, build(), self.batch_size, self.using)
+
+    def follows(self, per_user):
+        rng = self.rng
+        users = self.clients + self.freelancers
+
+        def build():
+            for pk in users:
+                targets = {rng.choice(users) for _ in range(per_user)} - {pk}
+                for target in targets:
+                    yield Follow(follower_id=pk, following_id=target, created_at=self.moment())
+
+        _insert(Follow, build(), self.batch_size, self.using)
+
+    def chats(self, rooms, messages):
+        rng = self.rng
+        # A few busy rooms and a long tail of quiet ones
+        weights = [rng.paretovariate(1.2) for _ in range(rooms)]
+        scale = messages / sum(weights)
+        counts = [max(1, int(w * scale)) for w in weights]
+        counts[0] += messages - sum(counts) # Exact total (may shrink the first room)
+        counts[0] = max(1, counts[0])
+
+        plan = [] # (client, freelancer, created_at, gap, count)
+        for count in counts:
+            created_at = self.moment()
+            gap = (self.now - created_at) / (count + 1)
+            plan.append((rng.choice(self.clients), rng.choice(self.freelancers), created_at, gap, count))
+
+        room_ids = _insert(ChatRoom, (
+            ChatRoom(created_at=created_at, updated_at=created_at + gap * count)
+            for _, _, created_at, gap, count in plan
+        ), self.batch_size, self.using)
+
+        through = ChatRoom.participants.through
+        _insert(through, (
+            through(chatroom_id=room_id, user_id=user_id)
+            for room_id, (client, freelancer, *_) in zip(room_ids, plan) for user_id in (client, freelancer)
+        ), self.batch_size, self.using)
+
+        def build():
+            for room_id, (client, freelancer, created_at, gap, count) in zip(room_ids, plan):
+                for k in range(count):
+                    yield Message(
+                        room_id=room_id, sender_id=client if k % 2 == 0 else freelancer,
+                        content=CHAT_LINES[(k + room_id) % len(CHAT_LINES)],
+                        timestamp=created_at + gap * (k + 1), is_read=k < count - 2,
+                    )
+
+        _insert(Message, build(), self.batch_size, self.using)
+
+
+def generate_dataset(clients, freelancers, projects, bids_per_project, follows_per_user, rooms, messages,
+                     seed=42, batch_size=5_000, password='loadtest-pass', using=DEFAULT_DB_ALIAS, log=None):
+    """
+    Generates a full dataset (see SCALES for typical sizes). Returns the generator,
+    whose `clients` and `freelancers` hold the new user ids.
+    """
+    generator = DatasetGenerator(seed=seed, batch_size=batch_size, password=password, using=using, log=log)
+    steps = [
+        ('users', lambda: generator.users(clients, freelancers, generator.skills())),
+        ('projects', lambda: generator.projects(projects)),
+        ('bids', lambda: generator.bids(bids_per_project)),
+        ('follows', lambda: generator.follows(follows_per_user)),
+        ('chats', lambda: generator.chats(rooms, messages)),
+    ]
+    with explicit_timestamps(Project, Bid, Follow, ChatRoom, Message):
+        for name, step in steps:
+            started = time.perf_counter()
+            step()
+            generator.log(f"{name}: {time.perf_counter() - started:.1f}s")
+    return generator
@@ -0,0 +1,175 @@
+# In api/db_router.py
+"""
+Primary/replica database routing.
+
+Reads go to one of settings.DATABASE_REPLICAS, while writes, and reads inside an
+atomic block, go to the primary ('default'). With no replicas configured
+the router does nothing.
+
+Read-your-writes: ReplicaPinningMiddleware keeps every request that writes
+(and every unsafe request) on the primary. After a write it pins the client
+(JWT user, or session cookie) to the primary for DATABASE_REPLICA_PIN_SECONDS,
+which should cover the replication interval. Writes made outside a request
+(websocket consumers) pin with pin_to_primary(). The pin lives in the default
+cache, so it is only shared across processes if the cache is.
+
+Locally the replicas are plain SQLite files kept in sync by
+`python manage.py replicate_db`.
+"""
+import random
+import sqlite3
+from contextlib import closing
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+_routing = ContextVar('db_routing', default=None)
+_jwt_authentication = JWTAuthentication()
+
+
+class RequestRouting:
+    """
+    Routing state of the current request.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned # Read from the primary for the whole request
+        self.wrote = False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS # Reads that feed a write must see the primary
+        state = _routing.get()
+        if state is not None and (state.pinned or state.wrote):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db # Related lookups stay on the copy the object came from
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # Every alias holds the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS # Replicas get the schema from replicate_db
+
+
+def client_key(request):
+    """
+    Identifies who made the request without touching the database:
+    the user id in a valid JWT, else the session cookie.
+    """
+    header = _jwt_authentication.get_header(request)
+    raw_token = _jwt_authentication.get_raw_token(header) if header else None
+    if raw_token:
+        try:
+            token = _jwt_authentication.get_validated_token(raw_token)
+            return user_client_key(token[jwt_settings.USER_ID_CLAIM])
+        except (InvalidToken, TokenError, KeyError):
+            return None
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f"session:{session_key}" if session_key else None
+
+
+def user_client_key(user_id):
+    return f"user:{user_id}"
+
+
+def _pin_cache_key(client):
+    return f"db-primary-pin:{client}"
+
+
+def pin_to_primary(client):
+    """
+    Sends the client's reads to the primary for DATABASE_REPLICA_PIN_SECONDS,
+    e.g. after a write made outside an HTTP request (websocket consumers).
+    """
+    if settings.DATABASE_REPLICAS and client:
+        cache.set(_pin_cache_key(client), True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Sets up RequestRouting for every request (sync and async) and pins
+    clients that just wrote to the primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        client, state = self.start(request)
+        token = _routing.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _routing.reset(token)
+            self.finish(client, state)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        client, state = self.start(request)
+        token = _routing.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _routing.reset(token)
+            self.finish(client, state)
+
+    def start(self, request):
+        client = client_key(request)
+        pinned = request.method not in SAFE_METHODS
+        if not pinned and client:
+            pinned = cache.get(_pin_cache_key(client)) is not None
+        return client, RequestRouting(pinned=pinned)
+
+    def finish(self, client, state):
+        if state.wrote:
+            pin_to_primary(client)
+
+
+def replicate(source, target):
+    """
+    Copies the SQLite database at `source` into `target` with SQLite's online
+    backup API: a consistent snapshot even while the primary is being written,
+    and readers of the replica see either the old or the new copy.
+    """
+    with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target, timeout=30)) as dst:
+        src.backup(dst)
+
+
+def replicate_all():
+    """
+    Refreshes every configured replica from the primary. Returns the aliases copied.
+    """
+    source = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+    for alias in settings.DATABASE_REPLICAS:
+        replicate(source, connections[alias].settings_dict['NAME'])
+    return list(settings.DATABASE_REPLICAS)
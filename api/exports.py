@@ -0,0 +1,118 @@
+# In api/exports.py
+"""
+Streaming exports (NDJSON or CSV) of the history behind a list view.
+
+    /api/dashboard/my-projects/export.csv
+    /api/projects/<project_pk>/bids/export.ndjson
+    /api/chats/<room_id>/messages/export.ndjson
+
+ExportMixin goes on a subclass of the list view, so the export sees exactly
+the rows (and permissions) the list would, just not paginated; ?fields= picks
+columns. Rows are read with values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+and encoded one chunk at a time (see api/fastpath.py), so memory stays flat
+however long the history is. Each NDJSON line is the object the list
+endpoint would return.
+
+Under ASGI the body is an async generator that fetches each chunk in the
+sync thread: Django would otherwise read a sync iterator to the end before
+sending anything.
+"""
+import csv
+import re
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import exceptions
+
+from .fastpath import RowFormat
+from .renderers import dumps
+
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+_NUMBER = re.compile(r'-?\d+(\.\d+)?')
+
+
+class _Echo:
+    """ csv.writer target that hands each line back instead of buffering it. """
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    value = str(value)
+    # A leading =, +, - or @ makes spreadsheets evaluate the cell (CSV injection)
+    if value.startswith(_FORMULA_PREFIXES) and not _NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+
+class Encoder:
+    def __init__(self, fmt, file_format):
+        self.fmt, self.file_format = fmt, file_format
+        self.writer = csv.writer(_Echo())
+
+    def header(self):
+        return [self.writer.writerow(self.fmt.names).encode()] if self.file_format == 'csv' else []
+
+    def encode(self, chunk):
+        rows = self.fmt.rows(chunk)
+        if self.file_format == 'csv':
+            return ''.join(self.writer.writerow([_csv_cell(value) for value in row.values()]) for row in rows).encode()
+        return b''.join(dumps(row) + b'\n' for row in rows)
+
+
+def stream(encoder, queryset, chunk_size):
+    yield from encoder.header()
+    rows = queryset.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield encoder.encode(chunk)
+
+
+async def astream(encoder, queryset, chunk_size):
+    for line in encoder.header():
+        yield line
+    # Like QuerySet.aiterator(), which would run a values_list() query on the event loop
+    rows = queryset.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while chunk := await next_chunk():
+        yield encoder.encode(chunk)
+
+
+class ExportMixin:
+    """
+    List view mixin: GET streams every row of filter_queryset(get_queryset()) as
+    NDJSON or CSV (the `fmt` URL kwarg). The serializer must be flat (RowFormat),
+    so ?expand= is refused. `export_name` names the downloaded file.
+    """
+    export_name = 'export'
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        serializer_class = getattr(cls, 'serializer_class', None)
+        if serializer_class is not None and RowFormat.compile(serializer_class()) is None:
+            raise ImproperlyConfigured(f"{cls.__name__}: {serializer_class.__name__} is not flat enough to export (see api/fastpath.py).")
+
+    def get(self, request, *args, fmt=None, **kwargs):
+        if fmt not in CONTENT_TYPES:
+            raise exceptions.NotFound(f"Unknown export format '{fmt}'; use ndjson or csv.")
+        if request.query_params.get('expand'):
+            raise exceptions.ValidationError({'expand': ["Exports have flat rows; ?expand= is not supported."]})
+        row_format = RowFormat.compile(self.sparse_serializer())
+        queryset = row_format.values(self.filter_queryset(self.get_queryset()))
+        encoder, chunk_size = Encoder(row_format, fmt), settings.EXPORT_CHUNK_SIZE
+
+        if isinstance(request._request, ASGIRequest):
+            content = astream(encoder, queryset, chunk_size)
+        else:
+            content = stream(encoder, queryset, chunk_size)
+        response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+        filename = f"{self.export_name}-{timezone.localdate():%Y-%m-%d}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
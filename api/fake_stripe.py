@@ -0,0 +1,237 @@
+# In api/fake_stripe.py
+"""
+A small in-process stand-in for the Stripe API.
+
+It implements just the endpoints the platform uses (accounts, account links
+and payment intents), honours Idempotency-Key headers the way Stripe does and
+can inject latency or server errors. Point STRIPE_API_BASE at it for tests and
+load tests: `python manage.py runfakestripe --port 12111`.
+"""
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+def _new_id(prefix):
+    return f"{prefix}_{secrets.token_hex(12)}"
+
+
+def _unflatten(pairs):
+    """
+    Turns Stripe's form encoding (`metadata[project_id]=1`) back into nested dicts.
+    """
+    data = {}
+    for key, value in pairs:
+        parts = key.replace(']', '').split('[')
+        target = data
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return data
+
+
+class FakeStripeState:
+    """
+    In-memory objects plus the knobs used to misbehave on purpose.
+    """
+
+    def __init__(self, latency=0.0):
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.payment_intents = {}
+        self.idempotent_responses = {}
+        self.latency = latency
+        self.failures_remaining = 0
+        self.request_count = 0
+
+    def fail_next_requests(self, count):
+        """Answer the next `count` requests with a 500 so clients have to retry."""
+        with self.lock:
+            self.failures_remaining = count
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeStripe/1.0'
+    protocol_version = 'HTTP/1.1' # Keep-alive, so clients can actually pool connections
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass # Keep test and load-test output quiet
+
+    def _send(self, status_code, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Request-Id', _new_id('req'))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status_code, message, code=None, error_type='invalid_request_error'):
+        return status_code, {'error': {'type': error_type, 'code': code, 'message': message}}
+
+    def _read_params(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode('utf-8') if length else ''
+        return _unflatten(parse_qsl(raw, keep_blank_values=True))
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        params = self._read_params() if method == 'POST' else {}
+        state = self.state
+        if state.latency:
+            time.sleep(state.latency)
+
+        with state.lock:
+            state.request_count += 1
+            if state.failures_remaining > 0:
+                state.failures_remaining -= 1
+                self._send(*self._error(500, 'Injected failure.', error_type='api_error'))
+                return
+
+        key = self.headers.get('Idempotency-Key')
+        if method == 'POST' and key:
+            with state.lock:
+                replay = state.idempotent_responses.get((self.path, key))
+            if replay:
+                self._send(*replay, headers={'Idempotent-Replayed': 'true'})
+                return
+
+        status_code, payload = self._route(method, self.path.split('?')[0].rstrip('/'), params)
+        if method == 'POST' and key and status_code < 500:
+            with state.lock:
+                state.idempotent_responses[(self.path, key)] = (status_code, payload)
+        self._send(status_code, payload)
+
+    def _route(self, method, path, params):
+        parts = path.strip('/').split('/')
+        if parts[:1] != ['v1']:
+            return self._error(404, f"Unrecognized request URL ({method}: {path}).")
+        resource = parts[1:]
+
+        if method == 'POST' and resource == ['accounts']:
+            return self._create_account(params)
+        if method == 'POST' and resource == ['account_links']:
+            return self._create_account_link(params)
+        if method == 'POST' and resource == ['payment_intents']:
+            return self._create_payment_intent(params)
+        if len(resource) >= 2 and resource[0] == 'payment_intents':
+            intent = self.state.payment_intents.get(resource[1])
+            if intent is None:
+                return self._error(404, f"No such payment_intent: '{resource[1]}'", code='resource_missing')
+            if method == 'GET' and len(resource) == 2:
+                return 200, intent
+            if method == 'POST' and resource[2:] == ['confirm']:
+                return self._confirm_payment_intent(intent)
+            if method == 'POST' and resource[2:] == ['capture']:
+                return self._capture_payment_intent(intent)
+        return self._error(404, f"Unrecognized request URL ({method}: {path}).")
+
+    def _create_account(self, params):
+        account = {
+            'id': _new_id('acct'),
+            'object': 'account',
+            'type': params.get('type', 'express'),
+            'email': params.get('email'),
+            'charges_enabled': False,
+            'payouts_enabled': False,
+        }
+        with self.state.lock:
+            self.state.accounts[account['id']] = account
+        return 200, account
+
+    def _create_account_link(self, params):
+        account_id = params.get('account')
+        if account_id not in self.state.accounts:
+            return self._error(400, f"No such account: '{account_id}'", code='resource_missing')
+        return 200, {
+            'object': 'account_link',
+            'created': int(time.time()),
+            'expires_at': int(time.time()) + 300,
+            'url': f"https://connect.stripe.test/setup/e/{account_id}/{secrets.token_urlsafe(8)}",
+        }
+
+    def _create_payment_intent(self, params):
+        try:
+            amount = int(params['amount'])
+        except (KeyError, ValueError):
+            return self._error(400, 'Missing required param: amount.', code='parameter_missing')
+        intent_id = _new_id('pi')
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': amount,
+            'currency': params.get('currency', 'usd'),
+            'capture_method': params.get('capture_method', 'automatic'),
+            'status': 'requires_payment_method',
+            'client_secret': f"{intent_id}_secret_{secrets.token_hex(8)}",
+            'application_fee_amount': int(params['application_fee_amount']) if 'application_fee_amount' in params else None,
+            'transfer_data': params.get('transfer_data'),
+            'metadata': params.get('metadata', {}),
+            'created': int(time.time()),
+        }
+        with self.state.lock:
+            self.state.payment_intents[intent_id] = intent
+        return 200, intent
+
+    def _confirm_payment_intent(self, intent):
+        # The real API needs a payment method; here confirming always "pays"
+        with self.state.lock:
+            intent['status'] = 'requires_capture' if intent['capture_method'] == 'manual' else 'succeeded'
+        return 200, intent
+
+    def _capture_payment_intent(self, intent):
+        with self.state.lock:
+            if intent['status'] != 'requires_capture':
+                return self._error(
+                    400,
+                    f"This PaymentIntent could not be captured because it has a status of {intent['status']}.",
+                    code='payment_intent_unexpected_state',
+                )
+            intent['status'] = 'succeeded'
+        return 200, intent
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    """
+    Threaded fake Stripe server. Use port 0 to pick a free port, then read `api_base`.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), FakeStripeHandler)
+        self.state = FakeStripeState(latency=latency)
+        self._thread = None
+
+    @property
+    def api_base(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset(self):
+        """Forget every object and idempotency key, e.g. between tests."""
+        self.state = FakeStripeState(latency=self.state.latency)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-stripe', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
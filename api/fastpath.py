@@ -0,0 +1,112 @@
+# In api/fastpath.py
+"""
+Values-based read path for large read-only lists.
+
+A ModelSerializer builds a model instance per row and walks its field
+objects per row. For flat serializers that is pure overhead: every field
+maps to one database column (or one column across a forward FK). RowFormat
+reads such a serializer once per request and turns it into `values_list()`
+lookups plus one transform per column. Each row then becomes a dict without
+any model instance.
+
+The transforms are the serializer's own bound fields' to_representation,
+skipped where it would return the database value unchanged (ints, strings,
+FK ids, ReadOnlyField). The JSON is therefore byte-identical to the
+serializer's (see the equivalence tests).
+
+Serializers that are not flat (method fields, nested or many-related fields,
+files, properties) have no RowFormat, and the view serializes as before.
+So do requests with ?expand=. Set VALUES_LIST_VIEWS = False to always use
+the serializers.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+# DRF fields whose to_representation returns what the database driver already gives us
+_UNCHANGED = (serializers.IntegerField, serializers.CharField, serializers.BooleanField, serializers.ReadOnlyField, PrimaryKeyRelatedField)
+
+
+def _lookup(model, source_attrs):
+    """
+    The values() lookup for a field's source: a column, possibly across forward FKs. None otherwise.
+    """
+    if not source_attrs:
+        return None
+    for i, attr in enumerate(source_attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist: # A property or method
+            return None
+        if not field.concrete or field.many_to_many or isinstance(field, models.FileField):
+            return None
+        if i < len(source_attrs) - 1:
+            if not field.is_relation or field.null: # DRF leaves the key out when a nullable FK is empty
+                return None
+            model = field.related_model
+    return '__'.join(source_attrs)
+
+
+class RowFormat:
+    def __init__(self, names, lookups, transforms):
+        self.names, self.lookups, self.transforms = names, lookups, transforms
+
+    @classmethod
+    def compile(cls, serializer):
+        """
+        RowFormat for a (possibly ?fields=-trimmed) serializer instance, or None if it is not flat.
+        """
+        model = serializer.Meta.model
+        names, lookups, transforms = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField, serializers.SerializerMethodField, serializers.FileField)):
+                return None
+            lookup = _lookup(model, field.source_attrs)
+            if lookup is None:
+                return None
+            names.append(name)
+            lookups.append(lookup)
+            transforms.append(None if isinstance(field, _UNCHANGED) else field.to_representation)
+        return cls(names, lookups, transforms)
+
+    def values(self, queryset):
+        return queryset.select_related(None).prefetch_related(None).values_list(*self.lookups)
+
+    def row(self, values):
+        # Same None handling as Serializer.to_representation
+        return {
+            name: value if value is None or transform is None else transform(value)
+            for name, transform, value in zip(self.names, self.transforms, values)
+        }
+
+    def rows(self, rows):
+        return [self.row(values) for values in rows]
+
+
+def row_format(serializer, request):
+    if not settings.VALUES_LIST_VIEWS or (request is not None and request.GET.get('expand')):
+        return None
+    return RowFormat.compile(serializer)
+
+
+class ValuesListMixin:
+    """
+    ListAPIView mixin: serves GET lists through RowFormat when the serializer is flat.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.sparse_serializer() if hasattr(self, 'sparse_serializer') else self.get_serializer()
+        fmt = row_format(serializer, request)
+        if fmt is None:
+            return super().list(request, *args, **kwargs)
+        queryset = fmt.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fmt.rows(page))
+        return Response(fmt.rows(queryset))
+
@@ -0,0 +1,159 @@
+# In api/fieldsets.py
+"""
+Sparse fieldsets (?fields=) and expandable relations (?expand=).
+
+    /api/projects/?fields=id,title,status       only these fields are serialized
+    /api/projects/?expand=client                 relations in Meta.expandable are embedded
+                                                 instead of returned as an id
+
+Both apply to GET/HEAD and to the top-level serializer only (nested
+serializers are built without the request). Unknown names are ignored.
+
+The view then loads only what the remaining fields need (sparse_queryset):
+select_related and prefetch_related are cut down to the relations that are
+still serialized, and only() restricts the columns. What a field needs is
+read from its `source`. Fields whose source is not a model field (method
+fields, get_FOO_display) declare it in Meta.field_sources, e.g.
+{'availability_display': ['availability']}; [] means the view provides it.
+Without such an entry the whole row is loaded, as before.
+
+Without ?fields= or ?expand= nothing changes.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.serializers import BaseSerializer
+
+
+def requested(request, param):
+    """
+    The comma-separated names in a ?fields=/?expand= parameter, or None when it is absent.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    value = request.GET.get(param)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def is_sparse(request):
+    return requested(request, 'fields') is not None or requested(request, 'expand') is not None
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin (goes before ModelSerializer) for ?fields= and ?expand=.
+    Meta.expandable maps a relation field to the serializer that embeds it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        expand = requested(request, 'expand') or ()
+        for name, serializer_class in getattr(self.Meta, 'expandable', {}).items():
+            if name in expand and name in self.fields:
+                self.fields[name] = serializer_class(read_only=True)
+        fields = requested(request, 'fields')
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class QueryPlan:
+    """
+    What a serializer's fields load: select_related paths, prefetch_related
+    paths and columns for only() (columns is None when some field's needs are unknown).
+    """
+
+    def __init__(self):
+        self.select, self.prefetch, self.columns = set(), set(), set()
+
+    def add_serializer(self, serializer, model, prefix=''):
+        self.add_column(prefix + model._meta.pk.name)
+        sources = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            paths = sources.get(name)
+            if paths is None:
+                paths = ['.'.join(field.source_attrs)] if field.source_attrs else [None]
+            for path in paths:
+                self.add_path(path, field, model, prefix)
+
+    def add_column(self, column):
+        if self.columns is not None:
+            self.columns.add(column)
+
+    def add_path(self, path, field, model, prefix):
+        if path is None: # source='*' and no field_sources entry
+            self.columns = None
+            return
+        parts = path.split('.')
+        for i, part in enumerate(parts):
+            lookup = prefix + part
+            try:
+                model_field = model._meta.get_field(part)
+            except FieldDoesNotExist: # A property or method
+                self.columns = None
+                return
+            if not model_field.is_relation:
+                self.add_column(lookup)
+                return
+            if model_field.many_to_many or model_field.one_to_many:
+                self.prefetch.add(lookup) # The related rows are loaded whole
+                return
+            if model_field.concrete:
+                self.add_column(lookup) # The FK column
+            last = i == len(parts) - 1
+            if last and not isinstance(field, BaseSerializer):
+                if not model_field.concrete: # Reverse one-to-one: the related row is the value
+                    self.select.add(lookup)
+                return
+            self.select.add(lookup)
+            model, prefix = model_field.related_model, lookup + '__'
+            if last: # An embedded (expanded) serializer
+                self.add_serializer(field, model, prefix)
+
+
+def sparse_queryset(queryset, serializer):
+    """
+    Cuts `queryset` down to what `serializer` still serializes after ?fields=/?expand=.
+    The view's own Prefetch objects are kept for relations that are still needed.
+    """
+    if not is_sparse(serializer.context.get('request')):
+        return queryset
+    plan = QueryPlan()
+    plan.add_serializer(serializer, queryset.model)
+
+    def prefetch_path(lookup):
+        return lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+
+    kept = [lookup for lookup in queryset._prefetch_related_lookups if prefetch_path(lookup) in plan.prefetch]
+    missing = plan.prefetch - {prefetch_path(lookup) for lookup in kept}
+    queryset = queryset.select_related(None).prefetch_related(None).prefetch_related(*kept, *sorted(missing))
+    if plan.select:
+        queryset = queryset.select_related(*sorted(plan.select))
+    if plan.columns is not None:
+        queryset = queryset.only(*sorted(plan.columns))
+    return queryset
+
+
+class SparseQuerysetMixin:
+    """
+    Generic view mixin: applies sparse_queryset() in filter_queryset(), which
+    list() and get_object() both go through.
+    """
+
+    def filter_queryset(self, queryset):
+        return sparse_queryset(super().filter_queryset(queryset), self.sparse_serializer())
+
+    def sparse_serializer(self):
+        if not hasattr(self, '_sparse_serializer'):
+            self._sparse_serializer = self.get_serializer()
+        return self._sparse_serializer
+
+    def serialized_fields(self):
+        """
+        Names of the fields this request serializes (for views that annotate per field).
+        """
+        return set(self.sparse_serializer().fields)
@@ -0,0 +1,145 @@
+# In api/images.py
+"""
+Profile picture variants.
+
+Uploads are stored as they come: a 1920x1080 wallpaper with its EXIF
+(camera, sometimes GPS) included. Profile lists and search show every avatar
+at a few dozen pixels. So after a new picture is committed, a worker thread
+renders it once per PROFILE_PICTURE_SIZES entry:
+
+- it is rotated by its EXIF orientation, then square-cropped and resized;
+- it is encoded as WebP and as JPEG (for clients without WebP), with no
+  metadata;
+- the files are written next to the original, in profile_pics/variants/.
+
+Their names go in User.profile_picture_variants together with the
+original's name (`source`). The serializers only use variants whose source
+is the current picture (see profile_picture_urls in api/serializers.py).
+Until the variants exist, and for users without a picture, every size is
+the default avatar: the original is never linked, since it still has its
+metadata.
+
+Pillow releases the GIL while decoding, resizing and encoding, so a few
+threads (IMAGE_WORKERS) render in parallel without blocking requests. For
+JPEGs, draft() decodes straight at a reduced scale. Pictures uploaded
+before this existed: `manage.py process_profile_pictures`.
+"""
+import io
+import posixpath
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .caching import invalidate_profiles
+from .models import User
+
+DEFAULT_PICTURE = 'profile_pics/default_avatar.png'
+# Format name in the variants: (Pillow format, file extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def has_picture(user):
+    return bool(user.profile_picture) and user.profile_picture.name != DEFAULT_PICTURE
+
+
+def render(file, sizes, quality):
+    """
+    {size label: {format: encoded bytes}} for an image file.
+    """
+    with Image.open(file) as image:
+        largest = max(sizes.values())
+        image.draft('RGB', (largest, largest)) # JPEG only: decode at 1/2, 1/4 or 1/8 scale when that is still large enough
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white') # JPEG has no transparency
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        variants = {}
+        for label, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            size = min(size, *image.size) # Never upscale
+            image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS) # Largest first: each size is cut from the previous one
+            variants[label] = {}
+            for name, (pil_format, _, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                image.save(buffer, pil_format, quality=quality, **options) # No exif= or icc_profile=: metadata is dropped
+                variants[label][name] = buffer.getvalue()
+        return variants
+
+
+def process_profile_picture(user_pk):
+    """
+    Renders and stores the variants of a user's current picture, and deletes those of the previous one.
+    """
+    user = User.objects.filter(pk=user_pk).only('username', 'profile_picture', 'profile_picture_variants').first()
+    if user is None:
+        return
+    if not has_picture(user): # Removed: drop the old variants
+        if user.profile_picture_variants and User.objects.filter(pk=user_pk, profile_picture=user.profile_picture.name).update(profile_picture_variants={}):
+            delete_variants(user.profile_picture_variants)
+        return
+    if user.profile_picture_variants.get('source') == user.profile_picture.name:
+        return
+    source = user.profile_picture.name
+    try:
+        with default_storage.open(source) as f:
+            rendered = render(f, settings.PROFILE_PICTURE_SIZES, settings.PROFILE_PICTURE_QUALITY)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        print(f"[Images] Could not process {source} of {user.username}: {exc}")
+        return
+
+    stem = posixpath.splitext(posixpath.basename(source))[0]
+    variants = {'source': source}
+    for label, encoded in rendered.items():
+        variants[label] = {
+            name: default_storage.save(f'profile_pics/variants/{stem}-{label}.{FORMATS[name][1]}', ContentFile(data))
+            for name, data in encoded.items()
+        }
+    # Only if the picture did not change meanwhile (a newer upload has its own task)
+    if User.objects.filter(pk=user_pk, profile_picture=source).update(profile_picture_variants=variants):
+        delete_variants(user.profile_picture_variants)
+        invalidate_profiles([user_pk]) # update() sends no post_save
+    else:
+        delete_variants(variants)
+
+
+def delete_variants(variants):
+    for label, files in variants.items():
+        if label != 'source':
+            for name in files.values():
+                default_storage.delete(name)
+
+
+def _run(user_pk):
+    try:
+        process_profile_picture(user_pk)
+    except Exception: # Nobody reads the executor's future, so report it here
+        print(f"[Images] Processing the picture of user {user_pk} failed:\n{traceback.format_exc()}")
+    finally:
+        connections.close_all() # This thread's connections only
+
+
+def schedule(user):
+    """
+    Queues process_profile_picture for after the current transaction commits.
+    """
+    global _executor
+    if settings.IMAGE_WORKERS <= 0:
+        transaction.on_commit(lambda: process_profile_picture(user.pk))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(settings.IMAGE_WORKERS, thread_name_prefix='images')
+    transaction.on_commit(lambda: _executor.submit(_run, user.pk))
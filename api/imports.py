@@ -0,0 +1,87 @@
+# In api/imports.py
+"""
+Bulk project import: POST /api/projects/import/ and `manage.py import_projects`.
+
+The body is CSV (a header row naming the fields), NDJSON (one object per
+line) or a JSON array. Each row is checked exactly like a
+POST /api/projects/ body (one ProjectSerializer validates every row, so
+read-only fields are ignored the same way), and valid rows are inserted
+with bulk_create, IMPORT_BATCH_SIZE at a time, in one transaction.
+
+By default the import is all or nothing: if any row is invalid nothing
+is created and every row's errors are returned. With partial, the valid
+rows are kept. CSV and NDJSON are read line by line as they are
+validated; a JSON array is parsed whole.
+"""
+import codecs
+import csv
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from rest_framework import exceptions, serializers
+
+from .caching import invalidate_profiles
+from .models import Project
+from .serializers import ProjectSerializer
+
+FORMATS = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/json': 'json'}
+
+
+def read_rows(lines, file_format):
+    """
+    Row dicts from an iterable of byte lines.
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+    elif file_format == 'ndjson':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                raise exceptions.ParseError(f"Line {number} is not valid JSON.")
+    else:
+        try:
+            rows = orjson.loads(b''.join(lines))
+        except orjson.JSONDecodeError:
+            raise exceptions.ParseError("The body is not valid JSON.")
+        if not isinstance(rows, list):
+            raise exceptions.ParseError("Expected a JSON array of projects.")
+        yield from rows
+
+
+def import_projects(rows, client, partial=False):
+    """
+    Validates and inserts `rows` as projects of `client`.
+    Returns (number created, [{'row': n, 'errors': {...}}]); rows are numbered from 1.
+    """
+    serializer = ProjectSerializer()
+    batch_size, max_rows = settings.IMPORT_BATCH_SIZE, settings.IMPORT_MAX_ROWS
+    created, errors, batch = 0, [], []
+    with transaction.atomic():
+        for number, row in enumerate(rows, start=1):
+            if number > max_rows:
+                errors.append({'row': number, 'errors': {'non_field_errors': [f"At most {max_rows} rows can be imported at once."]}})
+                break
+            try:
+                if not isinstance(row, dict):
+                    raise serializers.ValidationError({'non_field_errors': ["Expected an object."]})
+                data = serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                errors.append({'row': number, 'errors': exc.detail})
+                continue
+            batch.append(Project(**data, client=client))
+            if len(batch) == batch_size:
+                created += len(Project.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(Project.objects.bulk_create(batch))
+        if errors and not partial:
+            transaction.set_rollback(True)
+            return 0, errors
+
+    if created:
+        invalidate_profiles([client.pk]) # bulk_create sends no post_save
+    return created, errors
@@ -0,0 +1,319 @@
+import hashlib
+import hmac
+import io
+import json
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import urls as api_urls
+from api.benchmarks import (
+    benchmark_database, compare_to_baseline, format_table, load_baseline, percentile, save_baseline, seed_small_dataset,
+)
+from api.fake_stripe import FakeStripeServer
+from api.models import User, Bid, ChatRoom, Project
+from api import uploads
+from api.payments import get_gateway
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'api_baseline.json'
+BASELINE_METRICS = ('p50_ms', 'p95_ms', 'queries', 'alloc_kib')
+WEBHOOK_SECRET = 'whsec_bench'
+
+
+class Scenario:
+    """
+    One benchmarked request. `request(i)` returns (url, client kwargs) for the
+    i-th call, so write flows can use a fresh object every time.
+    """
+
+    def __init__(self, name, route, user, method, request, expect=(200,)):
+        self.name, self.route, self.user, self.method = name, route, user, method
+        self.request, self.expect = request, expect
+
+
+def fixed(url, **kwargs):
+    return lambda i: (url, kwargs)
+
+
+def as_json(data):
+    return {'data': data, 'format': 'json'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs every route in api/urls.py against the benchmark dataset and reports latency percentiles, "
+        "SQL queries and peak allocations per request, compared with a stored baseline (uses a throwaway database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30, help="Timed requests per scenario.")
+        parser.add_argument('--only', help="Only run scenarios whose name contains this text.")
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help="Add the scenarios that have no baseline entry yet.")
+        parser.add_argument(
+            '--rerecord', action='store_true',
+            help="With --save-baseline, also overwrite the entries of the scenarios that ran (pick them with --only).",
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=2.0,
+            help="Fail when p50 latency or allocations exceed the baseline by this factor (timings are noisy on shared machines).",
+        )
+        parser.add_argument(
+            '--query-threshold', type=float, default=1.0,
+            help="Fail when queries per request exceed the baseline by this factor (default: any extra query).",
+        )
+
+    def handle(self, *args, **options):
+        stripe_server = FakeStripeServer().start()
+        media = tempfile.TemporaryDirectory() # Uploads (and their staging files) go here, not into media/
+        bench_settings = override_settings(
+            STRIPE_SECRET_KEY='sk_test_bench', STRIPE_API_BASE=stripe_server.api_base, STRIPE_ENDPOINT_SECRET=WEBHOOK_SECRET,
+            QUERY_DETECTOR='off', METRICS_SQL_SAMPLE_RATE=0, # Measure the views, not the sampling
+            MEDIA_ROOT=f'{media.name}/media', SUBMISSION_STAGING_ROOT=f'{media.name}/staging',
+        )
+        try:
+            with benchmark_database(), bench_settings:
+                get_gateway.cache_clear()
+                scenarios = self.scenarios(options['iterations'] + 3, stripe_server)
+                self.check_coverage(scenarios)
+                if options['only']:
+                    scenarios = [s for s in scenarios if options['only'] in s.name]
+                rows = [self.measure(scenario, options['iterations']) for scenario in scenarios]
+        finally:
+            get_gateway.cache_clear()
+            stripe_server.stop()
+            media.cleanup()
+
+        self.stdout.write(format_table(rows, ['name', 'method', 'status', *BASELINE_METRICS, 'p99_ms']))
+
+        if options['save_baseline']:
+            written = save_baseline(options['baseline'], rows, BASELINE_METRICS, rerecord=options['rerecord'])
+            self.stdout.write(self.style.SUCCESS(f"{len(written)} baseline entries written to {options['baseline']}: {', '.join(written) or 'none'}"))
+            return
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(f"No baseline at {options['baseline']}; run with --save-baseline to record one."))
+            return
+        regressions = compare_to_baseline(rows, baseline, {
+            'p50_ms': options['threshold'], 'alloc_kib': options['threshold'], 'queries': options['query_threshold'],
+        })
+        if regressions:
+            raise CommandError("Performance regressions:\n  " + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def measure(self, scenario, iterations):
+        client = APIClient()
+        if scenario.user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(scenario.user).access_token}')
+        calls = iter(range(iterations + 3))
+        statuses = set()
+
+        def call():
+            url, kwargs = scenario.request(next(calls))
+            with redirect_stdout(io.StringIO()): # The views print() a lot
+                response = getattr(client, scenario.method)(url, **kwargs)
+            if response.status_code not in scenario.expect:
+                raise CommandError(f"{scenario.name}: {scenario.method.upper()} {url} returned {response.status_code}: {response.content[:300]!r}")
+            if response.streaming:
+                for _ in response.streaming_content: # Send the body as a server would, without keeping it
+                    pass
+            statuses.add(response.status_code)
+
+        call() # Warm-up
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+
+        reset_queries() # request_started clears the log too, which would hide queries logged before it
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'name': scenario.name, 'method': scenario.method.upper(), 'status': '/'.join(map(str, sorted(statuses))),
+            'p50_ms': percentile(latencies, 50) * 1000, 'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000, 'queries': len(queries), 'alloc_kib': peak / 1024,
+        }
+
+    def check_coverage(self, scenarios):
+        covered = {scenario.route for scenario in scenarios}
+        missing = [p.name for p in api_urls.urlpatterns if p.name not in covered]
+        if missing:
+            self.stderr.write(self.style.WARNING(f"Routes without a benchmark scenario: {', '.join(missing)}"))
+
+    # --- Fixtures ---
+
+    def scenarios(self, calls, stripe_server):
+        """
+        Builds the scenarios and, for write flows, `calls` fresh objects to act on.
+        """
+        me = seed_small_dataset()
+        dev = (
+            User.objects.filter(role=User.Role.FREELANCER).annotate(bid_count=Count('bids')).order_by('-bid_count', 'pk').first()
+        )
+        User.objects.filter(pk=dev.pk).update(stripe_account_id='acct_bench')
+        dev.stripe_account_id = 'acct_bench'
+        bidders = list(User.objects.filter(role=User.Role.FREELANCER).exclude(pk=dev.pk)[:2])
+        my_project = me.projects_as_client.annotate(bid_count=Count('bids')).order_by('-bid_count', 'pk').first()
+        room = ChatRoom.objects.filter(participants=me).first()
+        password = 'loadtest-pass' # api/datagen.py default
+        staff, _ = User.objects.get_or_create(username='bench-staff', defaults={'password': '!', 'role': User.Role.CLIENT, 'is_staff': True})
+
+        def projects(count, **fields):
+            return Project.objects.bulk_create([
+                Project(
+                    title=f'Benchmark project {k}', description='Created by bench_api.', budget=Decimal('500.00'),
+                    category='webdev', skills_required='Python, Django', client=me, **fields,
+                )
+                for k in range(count)
+            ])
+
+        def bids(projects, freelancers):
+            return Bid.objects.bulk_create([
+                Bid(project=project, freelancer=freelancer, amount=Decimal('450.00'), proposal='Benchmark bid.')
+                for project in projects for freelancer in freelancers
+            ])
+
+        follow_targets = User.objects.bulk_create([
+            User(username=f'bench-follow-{k}', email=f'bench-follow-{k}@example.com', password='!', role=User.Role.FREELANCER)
+            for k in range(calls)
+        ])
+        open_projects = projects(calls)
+        accept_bids = bids(projects(calls), [dev])
+        bulk_projects = projects(calls)
+        bulk_bids = bids(bulk_projects, [dev, *bidders])
+        to_fund = projects(calls, freelancer=dev, status=Project.Status.IN_PROGRESS)
+        to_submit = projects(calls, freelancer=dev, status=Project.Status.IN_PROGRESS, payment_intent_id='pi_bench')
+        to_upload = projects(calls, freelancer=dev, status=Project.Status.IN_PROGRESS, payment_intent_id='pi_bench')
+        chunk = bytes(range(256)) * 4096 # 1 MiB
+        chunk_uploads = [uploads.start(project, dev, filename='cut.mp4', size=len(chunk)) for project in to_upload]
+        finished_uploads = [uploads.start(project, dev, filename='cut.mp4', size=len(chunk)) for project in to_upload]
+        for upload in finished_uploads:
+            uploads.write_chunk(upload, 0, len(chunk), io.BytesIO(chunk))
+        to_release = projects(calls, freelancer=dev, status=Project.Status.PENDING_APPROVAL)
+        gateway = get_gateway()
+        for project in to_release:
+            intent = gateway.create_payment_intent(amount=50000, currency='usd', capture_method='manual')
+            project.payment_intent_id = intent.id
+        Project.objects.bulk_update(to_release, ['payment_intent_id'])
+        for project in to_release:
+            stripe_server.state.payment_intents[project.payment_intent_id]['status'] = 'requires_capture'
+
+        def webhook(i):
+            payload = json.dumps({
+                'id': f'evt_bench_{i}', 'type': 'payment_intent.requires_capture', 'created': 1700000000 + i,
+                'data': {'object': {
+                    'id': to_release[i].payment_intent_id, 'object': 'payment_intent', 'status': 'requires_capture',
+                    'capture_method': 'manual', 'metadata': {'project_id': str(to_release[i].pk)},
+                }},
+            })
+            timestamp = int(time.time())
+            signature = hmac.new(WEBHOOK_SECRET.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+            return reverse('stripe-webhook'), {
+                'data': payload, 'content_type': 'application/json', 'HTTP_STRIPE_SIGNATURE': f"t={timestamp},v1={signature}",
+            }
+
+        bid_url = lambda bid: reverse('bid-update', kwargs={'pk': bid.pk})
+        project_url = lambda name, project, key='project_pk': reverse(name, kwargs={key: project.pk})
+        profile_url = lambda name, user: reverse(name, kwargs={'username': user.username})
+        upload_url = lambda name, upload: reverse(name, kwargs={'pk': upload.project_id, 'upload_id': upload.pk})
+        detail_etag = APIClient().get(project_url('project-detail', my_project, 'pk'))['ETag'] # The same for every reader
+
+        return [
+            # Accounts
+            Scenario('register', 'register', None, 'post', lambda i: (reverse('register'), as_json({
+                'username': f'bench-new-{i}', 'name': f'Bench User {i}', 'email': f'bench-new-{i}@example.com', 'password': password, 'role': User.Role.FREELANCER,
+            })), expect=(201,)),
+            Scenario('user provisioning', 'user-provision', staff, 'post', lambda i: (reverse('user-provision'), {'data': ''.join(
+                ['username,email,name,role,password,skills\n']
+                + [f'bench-prov-{i}-{n},bench-prov-{i}-{n}@example.com,Provisioned {n},FREELANCER,{password},"Django,React"\n' for n in range(3)]
+            ), 'content_type': 'text/csv'}), expect=(201,)),
+            Scenario('token', 'token_obtain_pair', None, 'post', fixed(reverse('token_obtain_pair'), **as_json({'username': me.username, 'password': password}))),
+            Scenario('token refresh', 'token_refresh', None, 'post', fixed(reverse('token_refresh'), **as_json({'refresh': str(RefreshToken.for_user(me))}))),
+            Scenario('own profile', 'user_profile_detail_update', me, 'get', fixed(reverse('user_profile_detail_update'))),
+            Scenario('own profile update', 'user_profile_detail_update', me, 'patch', lambda i: (reverse('user_profile_detail_update'), as_json({'bio': f'Updated bio {i}'}))),
+            # Profiles and follows
+            Scenario('profile list', 'public-profile-list', me, 'get', fixed(reverse('public-profile-list'))),
+            Scenario('profile search', 'public-profile-list', me, 'get', fixed(reverse('public-profile-list'), data={'search': 'django'})),
+            Scenario('profile detail', 'public-profile-detail', me, 'get', fixed(profile_url('public-profile-detail', dev))),
+            Scenario('follow', 'follow-toggle', me, 'post', lambda i: (profile_url('follow-toggle', follow_targets[i]), {}), expect=(201,)),
+            Scenario('unfollow', 'follow-toggle', me, 'delete', lambda i: (profile_url('follow-toggle', follow_targets[i]), {}), expect=(204,)),
+            Scenario('followers', 'follower-list', me, 'get', fixed(profile_url('follower-list', dev))),
+            Scenario('following', 'following-list', me, 'get', fixed(profile_url('following-list', dev))),
+            Scenario('profile projects', 'profile-project-list', me, 'get', fixed(profile_url('profile-project-list', me))),
+            # Projects and bids
+            Scenario('project list', 'project-list-create', me, 'get', fixed(reverse('project-list-create'))),
+            Scenario('project search', 'project-list-create', me, 'get', fixed(reverse('project-list-create'), data={'search': 'website'})),
+            Scenario('project create', 'project-list-create', me, 'post', lambda i: (reverse('project-list-create'), as_json({
+                'title': f'New project {i}', 'description': 'A small API.', 'budget': '800.00', 'category': 'webdev', 'skills_required': 'Django',
+            })), expect=(201,)),
+            Scenario('project import', 'project-import', me, 'post', fixed(reverse('project-import'), data=''.join(
+                ['title,description,budget,category,skills_required\n']
+                + [f'Imported project {n},Bulk imported for the benchmark,{100 + n}.00,webdev,"Django,React"\n' for n in range(100)]
+            ), content_type='text/csv'), expect=(201,)),
+            Scenario('project detail', 'project-detail', me, 'get', fixed(project_url('project-detail', my_project, 'pk'))),
+            Scenario('project detail (304)', 'project-detail', me, 'get', fixed(
+                project_url('project-detail', my_project, 'pk'), HTTP_IF_NONE_MATCH=detail_etag,
+            ), expect=(304,)),
+            Scenario('project match', 'project-match', me, 'get', fixed(project_url('project-match', my_project))),
+            Scenario('bid create', 'bid-create', dev, 'post', lambda i: (project_url('bid-create', open_projects[i]), as_json({
+                'amount': '450.00', 'proposal': 'I can start tomorrow.',
+            })), expect=(201,)),
+            Scenario('project bids', 'project-bid-list', me, 'get', fixed(project_url('project-bid-list', my_project))),
+            # The project page's four calls in one request (compare with the four scenarios above/below)
+            Scenario('batch (project page)', 'batch', me, 'post', fixed(reverse('batch'), **as_json({'concurrent': True, 'requests': [
+                {'path': project_url('project-detail', my_project, 'pk')}, {'path': project_url('project-bid-list', my_project)},
+                {'path': project_url('project-match', my_project)}, {'path': profile_url('public-profile-detail', me)},
+            ]}))),
+            Scenario('bid accept', 'bid-update', me, 'patch', lambda i: (bid_url(accept_bids[i]), as_json({'status': Bid.Status.ACCEPTED}))),
+            Scenario('bids bulk update', 'project-bid-bulk-update', me, 'post', lambda i: (project_url('project-bid-bulk-update', bulk_projects[i]), as_json({
+                'accept': [bulk_bids[i * 3].pk], 'reject': [bulk_bids[i * 3 + 1].pk, bulk_bids[i * 3 + 2].pk],
+            }))),
+            Scenario('dashboard', 'dashboard', me, 'get', fixed(reverse('dashboard'))),
+            Scenario('my projects', 'dashboard-my-projects', me, 'get', fixed(reverse('dashboard-my-projects'))),
+            Scenario('export projects', 'export-my-projects', me, 'get', fixed(reverse('export-my-projects', kwargs={'fmt': 'csv'}))),
+            Scenario('export bids', 'export-project-bids', me, 'get', fixed(reverse('export-project-bids', kwargs={'project_pk': my_project.pk, 'fmt': 'ndjson'}))),
+            Scenario('my bids', 'dashboard-my-bids', dev, 'get', fixed(reverse('dashboard-my-bids'))),
+            Scenario('skills', 'skill-list-create', me, 'get', fixed(reverse('skill-list-create'))),
+            Scenario('skill create', 'skill-list-create', me, 'post', lambda i: (reverse('skill-list-create'), as_json({'name': f'Bench skill {i}'})), expect=(201,)),
+            # Payments (against the fake Stripe server)
+            Scenario('stripe onboard', 'stripe-onboard', me, 'post', fixed(reverse('stripe-onboard'))),
+            Scenario('stripe webhook', 'stripe-webhook', None, 'post', webhook),
+            Scenario('project fund', 'project-fund', me, 'post', lambda i: (project_url('project-fund', to_fund[i]), {}), expect=(201,)),
+            Scenario('work submission', 'work-submission', dev, 'patch', lambda i: (project_url('work-submission', to_submit[i], 'pk'), as_json({
+                'submission_notes': 'Done, see the repository.',
+            }))),
+            Scenario('submission upload start', 'submission-upload-create', dev, 'post', fixed(project_url('submission-upload-create', to_upload[0], 'pk'), **as_json({
+                'filename': 'cut.mp4', 'size': 50 * len(chunk),
+            })), expect=(201,)),
+            Scenario('submission upload chunk (1 MiB)', 'submission-upload', dev, 'put', lambda i: (upload_url('submission-upload', chunk_uploads[i]), {
+                'data': chunk, 'content_type': 'application/octet-stream', 'HTTP_CONTENT_RANGE': f'bytes 0-{len(chunk) - 1}/{len(chunk)}',
+            })),
+            Scenario('submission upload finalize', 'submission-upload-finalize', dev, 'post', lambda i: (upload_url('submission-upload-finalize', finished_uploads[i]), {})),
+            Scenario('payment release', 'project-release', me, 'post', lambda i: (project_url('project-release', to_release[i]), {})),
+            # Chat
+            Scenario('chat rooms', 'chat-room-list', me, 'get', fixed(reverse('chat-room-list'))),
+            Scenario('chat start', 'chat-room-start', me, 'post', fixed(reverse('chat-room-start'), **as_json({'username': dev.username})), expect=(200, 201)),
+            Scenario('messages', 'message-list', me, 'get', fixed(reverse('message-list', kwargs={'room_id': room.pk}))),
+            Scenario('export messages', 'export-messages', me, 'get', fixed(reverse('export-messages', kwargs={'room_id': room.pk, 'fmt': 'ndjson'}))),
+        ]
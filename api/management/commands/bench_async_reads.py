@@ -0,0 +1,51 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmarks import benchmark_database, format_table, run_concurrent, seed_small_dataset, summarize
+from api.models import User, ChatRoom
+
+
+class Command(BaseCommand):
+    help = "Compares requests/sec and p99 of the sync and async read paths under concurrent load (uses a throwaway database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help="Requests per endpoint and mode.")
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            me = seed_small_dataset()
+            token = str(AccessToken.for_user(me))
+            room = ChatRoom.objects.filter(participants=me).first()
+            endpoints = [
+                ('project list', reverse('project-list-create')),
+                ('project detail', reverse('project-detail', kwargs={'pk': me.projects_as_client.first().pk})),
+                ('public profile', reverse('public-profile-detail', kwargs={'username': User.objects.filter(role=User.Role.FREELANCER).first().username})),
+                ('chat rooms', reverse('chat-room-list')),
+                ('messages', reverse('message-list', kwargs={'room_id': room.pk})),
+            ]
+
+            rows = []
+            for name, url in endpoints:
+                for mode, use_async in (('sync', False), ('async', True)):
+                    with override_settings(ASYNC_READ_VIEWS=use_async):
+                        stats = asyncio.run(self.load(url, token, options['requests'], options['concurrency']))
+                    rows.append({'endpoint': name, 'mode': mode, **stats})
+
+        self.stdout.write(format_table(rows, ['endpoint', 'mode', 'requests', 'errors', 'rps', 'p50_ms', 'p99_ms']))
+
+    async def load(self, url, token, total, concurrency):
+        client = AsyncClient()
+        headers = {'Authorization': f'Bearer {token}'}
+
+        async def request():
+            response = await client.get(url, headers=headers)
+            return response.status_code == 200
+
+        await request() # Warm-up (URL resolution, first connection)
+        latencies, elapsed, failures = await run_concurrent(request, total, concurrency)
+        return {**summarize(latencies, elapsed), 'errors': failures}
@@ -0,0 +1,308 @@
+import asyncio
+import base64
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmarks import extra_database, format_table, percentile
+from api.models import User, ChatRoom
+
+MESSAGE_PREFIX = 'bench:' # Message content is "bench:<id>", so receivers can match deliveries to sends
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_usage(pid):
+    """
+    (CPU seconds, RSS bytes) of a process, read from /proc. None where there is no /proc.
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status') as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+    except (OSError, StopIteration):
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK'), rss # utime + stime
+
+
+def own_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class WebSocketClient:
+    """
+    Minimal asyncio WebSocket client: unfragmented text frames, ping and close.
+    (autobahn's asyncio client cannot be used here, daphne has already set
+    txaio up for Twisted by the time management commands run.)
+    """
+
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.open = True
+
+    @classmethod
+    async def connect(cls, host, port, path):
+        reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        if not head.startswith(b'HTTP/1.1 101'):
+            writer.close() # Rejected, e.g. 403 for a bad token or a non-participant
+            raise ConnectionRefusedError(head.split(b'\r\n', 1)[0].decode())
+        return cls(reader, writer)
+
+    def _send_frame(self, opcode, payload):
+        mask = os.urandom(4)
+        length = len(payload)
+        if length < 126:
+            header = bytes([0x80 | opcode, 0x80 | length])
+        elif length < 65536:
+            header = bytes([0x80 | opcode, 0x80 | 126]) + length.to_bytes(2, 'big')
+        else:
+            header = bytes([0x80 | opcode, 0x80 | 127]) + length.to_bytes(8, 'big')
+        masked = (int.from_bytes(payload, 'big') ^ int.from_bytes((mask * (length // 4 + 1))[:length], 'big')).to_bytes(length, 'big')
+        self.writer.write(header + mask + masked)
+
+    def send_text(self, text):
+        self._send_frame(0x1, text.encode())
+
+    async def receive(self):
+        """
+        The next text message, or None once the connection is closed.
+        """
+        try:
+            while True:
+                first, second = await self.reader.readexactly(2)
+                length = second & 0x7F
+                if length >= 126:
+                    length = int.from_bytes(await self.reader.readexactly(2 if length == 126 else 8), 'big')
+                payload = await self.reader.readexactly(length)
+                opcode = first & 0x0F
+                if opcode == 0x1:
+                    return payload.decode()
+                if opcode == 0x9:
+                    self._send_frame(0xA, payload)
+                elif opcode == 0x8:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.open = False
+        return None
+
+    def close(self):
+        if self.open:
+            self._send_frame(0x8, (1000).to_bytes(2, 'big'))
+        self.writer.close()
+
+
+class LoadHarness:
+    """
+    Bookkeeping shared by all sockets: when each message was sent, how many
+    deliveries it should get and how many it got.
+    """
+
+    def __init__(self):
+        self.sent_at = {}
+        self.expected = {}
+        self.delivered = {}
+        self.latencies = []
+        self.next_id = 0
+
+    def send(self, sender, room_sockets):
+        message_id = self.next_id
+        self.next_id += 1
+        self.expected[message_id] = sum(1 for s in room_sockets if s.open)
+        self.delivered[message_id] = 0
+        self.sent_at[message_id] = time.perf_counter()
+        sender.send_text(json.dumps({'message': f'{MESSAGE_PREFIX}{message_id}'}))
+
+    def received(self, message):
+        content = message.get('content', '')
+        if not content.startswith(MESSAGE_PREFIX):
+            return
+        message_id = int(content[len(MESSAGE_PREFIX):])
+        self.latencies.append(time.perf_counter() - self.sent_at[message_id])
+        self.delivered[message_id] += 1
+
+    @property
+    def missing(self):
+        return sum(self.expected.values()) - sum(self.delivered.values())
+
+
+class Command(BaseCommand):
+    help = (
+        "WebSocket load test of ChatConsumer: starts a local Daphne on a throwaway database, opens one authenticated "
+        "socket per room participant, sends messages at a fixed rate and reports delivery latency, dropped messages "
+        "and the server's CPU and memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=250)
+        parser.add_argument('--fanout', type=int, default=4, help="Participants (sockets) per room; every message goes to all of them.")
+        parser.add_argument('--rate', type=float, default=50.0, help="Messages per second, over all rooms.")
+        parser.add_argument('--duration', type=float, default=20.0, help="Seconds of sending.")
+        parser.add_argument('--drain', type=float, default=5.0, help="Seconds to wait for outstanding deliveries.")
+        parser.add_argument('--connect-concurrency', type=int, default=50, help="Handshakes in flight while opening sockets.")
+        parser.add_argument(
+            '--db-profile', default='production', choices=['development', 'production'],
+            help="DB_PROFILE of the server (see backend/settings.py).",
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / 'chat.sqlite3'
+            with extra_database('bench_chat', db_path) as alias:
+                rooms = self.seed(alias, options['rooms'], options['fanout'])
+            port = free_port()
+            server = self.start_server(db_path, port, options['db_profile'], Path(tmp) / 'daphne.log')
+            try:
+                report = asyncio.run(self.load(port, server.pid, rooms, options))
+            finally:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+
+        self.stdout.write(format_table([report], [
+            'sockets', 'failed', 'connect_p99_ms', 'sent', 'delivered', 'dropped', 'deliveries_per_s',
+        ]))
+        self.stdout.write('')
+        self.stdout.write(format_table([report], ['p50_ms', 'p95_ms', 'p99_ms', 'max_ms']))
+        self.stdout.write('')
+        self.stdout.write(format_table([report], [
+            'server_cpu_pct', 'server_rss_mb', 'server_peak_rss_mb', 'client_cpu_pct',
+        ]))
+        if report['client_cpu_pct'] > 90:
+            self.stdout.write(self.style.WARNING("The load generator itself was CPU bound; the latencies include its own delays."))
+
+    def seed(self, alias, rooms, fanout):
+        """
+        `rooms` rooms with `fanout` participants each. Returns [(room id, [access tokens])].
+        """
+        users = User.objects.using(alias).bulk_create([
+            User(username=f'chat{i}', email=f'chat{i}@example.com', password='!', name=f'Chat User {i}', role=User.Role.FREELANCER)
+            for i in range(rooms * fanout)
+        ])
+        chat_rooms = ChatRoom.objects.using(alias).bulk_create([ChatRoom() for _ in range(rooms)])
+        ChatRoom.participants.through.objects.using(alias).bulk_create([
+            ChatRoom.participants.through(chatroom_id=room.pk, user_id=users[i * fanout + k].pk)
+            for i, room in enumerate(chat_rooms) for k in range(fanout)
+        ])
+        return [
+            (room.pk, [str(AccessToken.for_user(users[i * fanout + k])) for k in range(fanout)])
+            for i, room in enumerate(chat_rooms)
+        ]
+
+    def start_server(self, db_path, port, db_profile, log_path):
+        env = {**os.environ, 'DB_NAME': str(db_path), 'DB_PROFILE': db_profile, 'QUERY_DETECTOR': 'off'}
+        log = open(log_path, 'w')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'backend.asgi:application'],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=log, # The consumer print()s every event
+        )
+        log.close()
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Daphne exited with {server.returncode}:\n{log_path.read_text()[-2000:]}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.kill()
+        raise CommandError("Daphne did not start listening within 30 seconds.")
+
+    async def load(self, port, server_pid, rooms, options):
+        harness = LoadHarness()
+        slots = asyncio.Semaphore(options['connect_concurrency'])
+        connect_times = []
+        readers = []
+
+        async def read(ws):
+            while (text := await ws.receive()) is not None:
+                harness.received(json.loads(text))
+
+        async def connect(room_id, token):
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    ws = await asyncio.wait_for(WebSocketClient.connect('127.0.0.1', port, f'/ws/chat/{room_id}/?token={token}'), 30)
+                except (OSError, asyncio.TimeoutError):
+                    return None
+                connect_times.append(time.perf_counter() - started)
+                readers.append(asyncio.create_task(read(ws)))
+                return ws
+
+        opened = await asyncio.gather(*(connect(room_id, token) for room_id, tokens in rooms for token in tokens))
+        fanout = options['fanout']
+        room_sockets = [[s for s in opened[i * fanout:(i + 1) * fanout] if s is not None] for i in range(len(rooms))]
+        live_rooms = [sockets for sockets in room_sockets if sockets]
+        if not live_rooms:
+            raise CommandError("No socket could connect.")
+        idle_usage = process_usage(server_pid)
+
+        # Send at a fixed average rate: every tick, catch up with rate * elapsed
+        peak_rss = idle_usage[1] if idle_usage else 0
+        started, cpu_started = time.perf_counter(), own_cpu_seconds()
+        while (elapsed := time.perf_counter() - started) < options['duration']:
+            while harness.next_id < options['rate'] * elapsed:
+                sockets = random.choice(live_rooms)
+                harness.send(random.choice(sockets), sockets)
+            usage = process_usage(server_pid)
+            if usage:
+                peak_rss = max(peak_rss, usage[1])
+            await asyncio.sleep(0.01)
+
+        drain_deadline = time.perf_counter() + options['drain']
+        while harness.missing and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        client_cpu = own_cpu_seconds() - cpu_started
+        busy_usage = process_usage(server_pid)
+
+        for sockets in live_rooms:
+            for ws in sockets:
+                ws.close()
+        await asyncio.wait(readers, timeout=5)
+
+        delivered = sum(harness.delivered.values())
+        connected = sum(len(sockets) for sockets in live_rooms)
+        report = {
+            'sockets': connected, 'failed': len(opened) - connected,
+            'connect_p99_ms': percentile(connect_times, 99) * 1000,
+            'sent': harness.next_id, 'delivered': delivered, 'dropped': harness.missing,
+            'deliveries_per_s': delivered / elapsed,
+            'p50_ms': percentile(harness.latencies, 50) * 1000, 'p95_ms': percentile(harness.latencies, 95) * 1000,
+            'p99_ms': percentile(harness.latencies, 99) * 1000, 'max_ms': max(harness.latencies, default=0) * 1000,
+            'client_cpu_pct': client_cpu / elapsed * 100,
+            'server_cpu_pct': 'n/a', 'server_rss_mb': 'n/a', 'server_peak_rss_mb': 'n/a',
+        }
+        if idle_usage and busy_usage:
+            report.update({
+                'server_cpu_pct': (busy_usage[0] - idle_usage[0]) / elapsed * 100,
+                'server_rss_mb': idle_usage[1] / 2**20, # With every socket open, before sending
+                'server_peak_rss_mb': max(peak_rss, busy_usage[1]) / 2**20,
+            })
+        return report
@@ -0,0 +1,89 @@
+import io
+import time
+from contextlib import redirect_stdout
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmarks import benchmark_database, format_table, percentile, seed_small_dataset
+from api.compression import brotli, compress
+from api.models import User, ChatRoom
+from api.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures JSON rendering time (DRF's JSONRenderer vs ORJSONRenderer) and bytes on the wire "
+        "(plain, gzip, brotli) for the largest API responses (uses a throwaway database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--messages', type=int, default=5_000, help="Chat messages in the dataset (the largest room is measured).")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            me = seed_small_dataset(messages=options['messages'])
+            dev = User.objects.filter(role=User.Role.FREELANCER).annotate(n=Count('followers')).order_by('-n', 'pk').first()
+            room = ChatRoom.objects.annotate(n=Count('messages')).order_by('-n', 'pk').first()
+            room.participants.add(me)
+            api = APIClient()
+            api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(me)}')
+            endpoints = [
+                ('profile list', reverse('public-profile-list')),
+                ('followers', reverse('follower-list', kwargs={'username': dev.username})),
+                ('project list', reverse('project-list-create')),
+                ('my projects', reverse('dashboard-my-projects')),
+                ('chat rooms', reverse('chat-room-list')),
+                ('messages', reverse('message-list', kwargs={'room_id': room.pk})),
+            ]
+
+            rows = []
+            # Sync views keep response.data (the serialized data before rendering)
+            with override_settings(ASYNC_READ_VIEWS=False, QUERY_DETECTOR='off'), redirect_stdout(io.StringIO()):
+                for name, url in endpoints:
+                    response = api.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(f"{name}: GET {url} returned {response.status_code}")
+                    rows.append({'endpoint': name, **self.measure(response.data, options['iterations'])})
+
+        columns = ['endpoint', 'drf_ms', 'orjson_ms', 'speedup', 'bytes', 'gzip_bytes', 'gzip_ms']
+        if brotli is not None:
+            columns += ['br_bytes', 'br_ms']
+        self.stdout.write(format_table(rows, columns))
+        if brotli is None:
+            self.stdout.write(self.style.WARNING("brotli is not installed: only gzip was measured."))
+        self.stdout.write(f"Responses under COMPRESSION_MIN_SIZE={settings.COMPRESSION_MIN_SIZE} bytes are not compressed.")
+
+    @staticmethod
+    def timed(func, iterations):
+        """
+        p50 milliseconds of `func()` and its last result.
+        """
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return percentile(timings, 50) * 1000, result
+
+    def measure(self, data, iterations):
+        drf_ms, drf_body = self.timed(lambda: JSONRenderer().render(data), iterations)
+        orjson_ms, body = self.timed(lambda: ORJSONRenderer().render(data), iterations)
+        if len(body) != len(drf_body):
+            self.stderr.write(self.style.WARNING(f"Renderers disagree: {len(drf_body)} vs {len(body)} bytes"))
+        gzip_ms, gzipped = self.timed(lambda: compress(body, 'gzip'), iterations)
+        row = {
+            'drf_ms': drf_ms, 'orjson_ms': orjson_ms, 'speedup': f"x{drf_ms / orjson_ms:.1f}" if orjson_ms else '-',
+            'bytes': len(body), 'gzip_bytes': len(gzipped), 'gzip_ms': gzip_ms,
+        }
+        if brotli is not None:
+            br_ms, compressed = self.timed(lambda: compress(body, 'br'), iterations)
+            row.update({'br_bytes': len(compressed), 'br_ms': br_ms})
+        return row
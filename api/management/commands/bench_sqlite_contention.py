@@ -0,0 +1,100 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+
+from api.benchmarks import extra_database, format_table, summarize
+from api.models import User, ChatRoom, Message
+
+PROFILES = {
+    # What DATABASES['default'] looks like without DB_PROFILE
+    'default': {'OPTIONS': {}, 'CONN_MAX_AGE': 0},
+    'production': {'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Chat writes (same queries as ChatConsumer.save_message) against message-list reads on a file-backed "
+        "SQLite database, once with the default settings and once with the production profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per profile.")
+        parser.add_argument('--rooms', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=200, help="Messages seeded per room.")
+
+    def handle(self, *args, **options):
+        rows = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile, overrides in PROFILES.items():
+                with extra_database(f'bench_{profile}', Path(tmp) / f'{profile}.sqlite3', **overrides) as alias:
+                    rooms = self.seed(alias, options['rooms'], options['messages'])
+                    rows.extend(self.run(profile, alias, rooms, options))
+
+        self.stdout.write(format_table(rows, ['profile', 'workload', 'requests', 'locked', 'rps', 'p50_ms', 'p99_ms']))
+
+    def seed(self, alias, rooms, messages_per_room):
+        users = User.objects.using(alias).bulk_create([
+            User(username=f'chat{i}', password='!', email=f'chat{i}@example.com') for i in range(rooms * 2)
+        ])
+        chat_rooms = ChatRoom.objects.using(alias).bulk_create([ChatRoom() for _ in range(rooms)])
+        ChatRoom.participants.through.objects.using(alias).bulk_create([
+            ChatRoom.participants.through(chatroom_id=room.pk, user_id=users[i * 2 + k].pk)
+            for i, room in enumerate(chat_rooms) for k in range(2)
+        ])
+        Message.objects.using(alias).bulk_create([
+            Message(room=room, sender=users[i * 2 + k % 2], content=f'Message {k} about the project.')
+            for i, room in enumerate(chat_rooms) for k in range(messages_per_room)
+        ])
+        return [(room.pk, users[i * 2]) for i, room in enumerate(chat_rooms)]
+
+    def run(self, profile, alias, rooms, options):
+        deadline = time.perf_counter() + options['duration']
+        results = {'write': ([], [0]), 'read': ([], [0])}
+
+        def save_message(room_id, user):
+            room = ChatRoom.objects.using(alias).get(id=room_id)
+            Message.objects.using(alias).create(room=room, sender=user, content='New message')
+            room.save(using=alias)
+
+        def list_messages(room_id, user):
+            list(Message.objects.using(alias).filter(room_id=room_id).order_by('timestamp').select_related('sender'))
+
+        def worker(workload, operation, offset):
+            latencies, locked = results[workload]
+            n = offset
+            while time.perf_counter() < deadline:
+                room_id, user = rooms[n % len(rooms)]
+                n += 1
+                started = time.perf_counter()
+                try:
+                    operation(room_id, user)
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    locked[0] += 1 # "database is locked"
+                # End of a "request": closes the connection unless CONN_MAX_AGE keeps it open
+                close_old_connections()
+            connections[alias].close()
+
+        threads = (
+            [threading.Thread(target=worker, args=('write', save_message, i)) for i in range(options['writers'])]
+            + [threading.Thread(target=worker, args=('read', list_messages, i)) for i in range(options['readers'])]
+        )
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return [
+            {'profile': profile, 'workload': workload, 'locked': locked[0], **summarize(latencies, elapsed)}
+            for workload, (latencies, locked) in results.items()
+        ]
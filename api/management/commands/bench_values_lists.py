@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api.benchmarks import benchmark_database, format_table, percentile, seed_small_dataset
+from api.fastpath import RowFormat
+from api.models import User, Project, Bid, Skill, Message, ChatRoom
+from api.serializers import BidSerializer, SkillSerializer, MessageSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares serializer instances with values() rows (api/fastpath.py) on the lists that use them: "
+        "rows/sec for the whole list, queries included (uses a throwaway database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=5_000, help="Chat messages in the dataset (the largest room is measured).")
+        parser.add_argument('--skills', type=int, default=2_000, help="Extra skills, so the skill list is not trivially small.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_small_dataset(messages=options['messages'])
+            Skill.objects.bulk_create([Skill(name=f'bench-skill-{i}') for i in range(options['skills'])])
+            freelancer = User.objects.filter(role=User.Role.FREELANCER).annotate(n=Count('bids')).order_by('-n', 'pk').first()
+            project = Project.objects.annotate(n=Count('bids')).order_by('-n', 'pk').first()
+            room = ChatRoom.objects.annotate(n=Count('messages')).order_by('-n', 'pk').first()
+            # The views' querysets, unpaginated
+            lists = [
+                ('skills', SkillSerializer, Skill.objects.all().order_by('name')),
+                ('my bids', BidSerializer, Bid.objects.filter(freelancer=freelancer).select_related('freelancer').order_by('-created_at')),
+                ('project bids', BidSerializer, Bid.objects.filter(project=project).select_related('freelancer').order_by('created_at')),
+                ('messages', MessageSerializer, Message.objects.filter(room=room).select_related('sender').order_by('timestamp')),
+            ]
+            rows = [self.measure(name, serializer_class, queryset, options['iterations']) for name, serializer_class, queryset in lists]
+        self.stdout.write(format_table(rows, ['list', 'rows', 'serializer_ms', 'values_ms', 'serializer_rows_s', 'values_rows_s', 'speedup']))
+
+    @staticmethod
+    def timed(func, iterations):
+        timings, result = [], None
+        for _ in range(iterations):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return percentile(timings, 50) * 1000, result
+
+    def measure(self, name, serializer_class, queryset, iterations):
+        fmt = RowFormat.compile(serializer_class())
+        if fmt is None:
+            raise CommandError(f"{name}: {serializer_class.__name__} has no values() row format")
+        serializer_ms, expected = self.timed(lambda: serializer_class(queryset.all(), many=True).data, iterations)
+        values_ms, data = self.timed(lambda: fmt.rows(fmt.values(queryset.all())), iterations)
+        if data != expected:
+            raise CommandError(f"{name}: values() rows differ from the serializer output")
+        count = len(data)
+        return {
+            'list': name, 'rows': count, 'serializer_ms': serializer_ms, 'values_ms': values_ms,
+            'serializer_rows_s': round(count / serializer_ms * 1000) if serializer_ms else '-',
+            'values_rows_s': round(count / values_ms * 1000) if values_ms else '-',
+            'speedup': f"x{serializer_ms / values_ms:.1f}" if values_ms else '-',
+        }
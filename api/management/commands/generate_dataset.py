@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+
+from api.datagen import SCALES, generate_dataset
+from api.models import User, Project, Bid, ChatRoom, Message, Follow
+
+
+class Command(BaseCommand):
+    help = "Fills the database with seeded, realistic synthetic data for load tests (see api/datagen.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(SCALES), default='small', help="Preset sizes; the options below override them.")
+        for name in SCALES['small']:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--password', default='loadtest-pass', help="Password of every generated user.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] if options[name] is not None else default for name, default in SCALES[options['scale']].items()}
+        self.stdout.write(f"Generating {', '.join(f'{v:,} {k}' for k, v in sizes.items())} (seed {options['seed']})")
+        try:
+            generate_dataset(
+                **sizes, seed=options['seed'], batch_size=options['batch_size'],
+                password=options['password'], using=options['database'], log=self.stdout.write,
+            )
+        except IntegrityError as e:
+            raise CommandError(f"Generated rows clash with existing data ({e}). Generate into an empty database.")
+        totals = {model.__name__: model.objects.using(options['database']).count() for model in (User, Project, Bid, Follow, ChatRoom, Message)}
+        self.stdout.write(self.style.SUCCESS("Done: " + ', '.join(f'{count:,} {name}' for name, count in totals.items())))
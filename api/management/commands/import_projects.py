@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ParseError
+
+from api.imports import import_projects, read_rows
+from api.models import User
+
+EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'json'}
+
+
+class Command(BaseCommand):
+    help = "Imports projects for one client from a CSV, NDJSON or JSON file (same rules as POST /api/projects/import/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument('--client', required=True, help="Username of the client who owns the projects.")
+        parser.add_argument('--format', choices=sorted(set(EXTENSIONS.values())), help="Defaults to the file extension.")
+        parser.add_argument('--partial', action='store_true', help="Keep the valid rows when some are invalid.")
+
+    def handle(self, *args, **options):
+        try:
+            client = User.objects.get(username=options['client'], role=User.Role.CLIENT)
+        except User.DoesNotExist:
+            raise CommandError(f"No client named {options['client']!r}.")
+        file_format = options['format'] or EXTENSIONS.get(options['path'].suffix.lower())
+        if file_format is None:
+            raise CommandError("Unknown file type; pass --format.")
+
+        try:
+            with options['path'].open('rb') as f:
+                created, errors = import_projects(read_rows(f, file_format), client, partial=options['partial'])
+        except (OSError, ParseError) as exc:
+            raise CommandError(str(exc))
+
+        for error in errors[:20]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if len(errors) > 20:
+            self.stderr.write(f"... and {len(errors) - 20} more invalid rows.")
+        if errors and not created:
+            raise CommandError(f"Nothing imported: {len(errors)} invalid rows (use --partial to keep the valid ones).")
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} projects for {client.username}."))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api.images import DEFAULT_PICTURE, process_profile_picture
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Renders the resized variants (api/images.py) of profile pictures that do not have them yet, e.g. those uploaded before variants existed."
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture__in=['', DEFAULT_PICTURE]).exclude(profile_picture__isnull=True).order_by('pk')
+        sizes = settings.PROFILE_PICTURE_SIZES
+        smallest = min(sizes, key=sizes.get)
+        processed = original_bytes = small_bytes = 0
+        for user in list(users.only('profile_picture', 'profile_picture_variants')):
+            if user.profile_picture_variants.get('source') == user.profile_picture.name:
+                continue
+            process_profile_picture(user.pk)
+            variants = User.objects.values_list('profile_picture_variants', flat=True).get(pk=user.pk)
+            if variants.get('source') != user.profile_picture.name:
+                continue # Unreadable; already reported
+            processed += 1
+            original_bytes += default_storage.size(user.profile_picture.name)
+            small_bytes += default_storage.size(variants[smallest]['webp'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} profile pictures: {original_bytes / 1024:.0f} KiB of originals, "
+            f"{small_bytes / 1024:.1f} KiB as {smallest} WebP avatars."
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Applies stored Stripe webhook events to projects in batches (runs until stopped unless --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            handled = process_pending_events(batch_size=batch_size)
+            if options['once'] and handled < batch_size:
+                break
+            if handled < batch_size:
+                try:
+                    time.sleep(options['interval'])
+                except KeyboardInterrupt:
+                    break
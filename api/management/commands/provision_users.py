@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ParseError
+
+from api.imports import read_rows
+from api.provisioning import provision_users
+
+EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'json'}
+
+
+class Command(BaseCommand):
+    help = "Creates users from a CSV, NDJSON or JSON file (same rules as POST /api/users/provision/) and reports users per second."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument('--format', choices=sorted(set(EXTENSIONS.values())), help="Defaults to the file extension.")
+        parser.add_argument('--partial', action='store_true', help="Keep the valid rows when some are invalid.")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: PROVISIONING_WORKERS).")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or EXTENSIONS.get(options['path'].suffix.lower())
+        if file_format is None:
+            raise CommandError("Unknown file type; pass --format.")
+
+        try:
+            with options['path'].open('rb') as f:
+                created, errors, seconds = provision_users(read_rows(f, file_format), partial=options['partial'], workers=options['workers'])
+        except (OSError, ParseError) as exc:
+            raise CommandError(str(exc))
+
+        for error in errors[:20]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if len(errors) > 20:
+            self.stderr.write(f"... and {len(errors) - 20} more invalid rows.")
+        if errors and not created:
+            raise CommandError(f"Nothing provisioned: {len(errors)} invalid rows (use --partial to keep the valid ones).")
+        rate = created / seconds if seconds else 0
+        self.stdout.write(self.style.SUCCESS(f"Provisioned {created} users in {seconds:.2f}s ({rate:.0f} users/s)."))
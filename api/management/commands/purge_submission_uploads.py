@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.uploads import purge_stale
+
+
+class Command(BaseCommand):
+    help = "Deletes resumable submission uploads (api/uploads.py) idle for longer than SUBMISSION_UPLOAD_TTL_HOURS, with their staged bytes."
+
+    def handle(self, *args, **options):
+        purged = purge_stale()
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} uploads idle for more than {settings.SUBMISSION_UPLOAD_TTL_HOURS}h."))
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.db_router import replicate_all
+
+
+class Command(BaseCommand):
+    help = "Copies the primary SQLite database into every replica in DATABASE_REPLICAS (runs until stopped unless --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between copies.")
+        parser.add_argument('--once', action='store_true', help="Copy once and exit.")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured, set DB_REPLICAS.")
+        while True:
+            started = time.perf_counter()
+            aliases = replicate_all()
+            self.stdout.write(f"Replicated to {', '.join(aliases)} in {(time.perf_counter() - started) * 1000:.0f} ms")
+            if options['once']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
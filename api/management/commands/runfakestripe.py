@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = "Runs a local fake Stripe API for tests and load tests (set STRIPE_API_BASE to its address)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds of artificial latency per request.")
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(options['host'], options['port'], latency=options['latency'])
+        self.stdout.write(self.style.SUCCESS(f"Fake Stripe listening on {server.api_base} (Ctrl+C to stop)"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
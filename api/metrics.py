@@ -0,0 +1,333 @@
+# In api/metrics.py
+"""
+In-process request metrics, exposed in Prometheus text format at /metrics.
+
+MetricsMiddleware records every HTTP request per route: latency, response
+size, and (for a sample of requests, see METRICS_SQL_SAMPLE_RATE) SQL query
+count and time. MetricsConsumerMixin does the same for every Channels
+consumer event.
+
+Recording is lock-free: each thread writes only to its own shard, and the
+shards are summed when /metrics is scraped. SQL is captured by one execute
+wrapper installed on every new connection (see ApiConfig.ready). It only
+does work while a sampled request or event is running. The active collector is
+held in a ContextVar, so queries made in sync_to_async threads count toward
+the request or event that awaited them.
+
+Numbers are per process; with several workers, scrape each one. Scrapes
+need METRICS_TOKEN (the endpoint is closed without it).
+
+The same capture feeds the N+1 detector (api/nplusone.py).
+"""
+import hmac
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .nplusone import budget_for, check, start_detecting
+
+_collector = ContextVar('metrics_collector', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock() # Only taken the first time a thread records
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def collect(self):
+        """
+        Sums all shards: {metric name: {label values: [values...]}}.
+        """
+        totals = {}
+        for shard in list(self._shards):
+            for (name, labels), values in list(shard.items()):
+                merged = totals.setdefault(name, {}).get(labels)
+                if merged is None:
+                    totals[name][labels] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        merged[i] += value
+        return totals
+
+    def clear(self):
+        for shard in list(self._shards):
+            shard.clear()
+
+    def render(self):
+        totals = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, values in sorted(totals.get(metric.name, {}).items()):
+                lines.extend(metric.render(labels, values))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.registry, self.name, self.help, self.labelnames = registry, name, help, labelnames
+        registry.metrics.append(self)
+
+    def inc(self, *labels, amount=1):
+        shard = self.registry.shard()
+        key = (self.name, labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0]
+        values[0] += amount
+
+    def render(self, labels, values):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(values[0])}"]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.registry, self.name, self.help, self.labelnames = registry, name, help, labelnames
+        self.buckets = tuple(buckets)
+        registry.metrics.append(self)
+
+    def observe(self, value, *labels):
+        # values = [per-bucket counts..., +Inf count, sum]
+        shard = self.registry.shard()
+        key = (self.name, labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def render(self, labels, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), values):
+            cumulative += count
+            le = bound if bound == '+Inf' else _format_value(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+        label_text = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_text} {_format_value(values[-1])}")
+        lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+registry = Registry()
+
+HTTP_REQUESTS = Counter(registry, 'http_requests_total', "HTTP requests by route, method and status.", ('route', 'method', 'status'))
+HTTP_LATENCY = Histogram(registry, 'http_request_duration_seconds', "HTTP request latency.", ('route', 'method'))
+HTTP_RESPONSE_SIZE = Histogram(
+    registry, 'http_response_size_bytes', "HTTP response body size.", ('route', 'method'), buckets=SIZE_BUCKETS,
+)
+HTTP_QUERIES = Histogram(
+    registry, 'http_request_db_queries', "SQL queries per HTTP request (sampled).", ('route', 'method'), buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_DB_TIME = Histogram(registry, 'http_request_db_seconds', "SQL time per HTTP request (sampled).", ('route', 'method'))
+
+WS_EVENTS = Counter(registry, 'websocket_events_total', "Consumer events handled.", ('consumer', 'event'))
+WS_LATENCY = Histogram(registry, 'websocket_event_duration_seconds', "Consumer event handling time.", ('consumer', 'event'))
+WS_QUERIES = Histogram(
+    registry, 'websocket_event_db_queries', "SQL queries per consumer event (sampled).", ('consumer', 'event'), buckets=QUERY_COUNT_BUCKETS,
+)
+WS_DB_TIME = Histogram(registry, 'websocket_event_db_seconds', "SQL time per consumer event (sampled).", ('consumer', 'event'))
+WS_SENT_BYTES = Counter(registry, 'websocket_sent_bytes_total', "Bytes sent to WebSocket clients.", ('consumer',))
+
+
+# --- SQL capture ---
+
+class QueryCollector:
+    """
+    SQL totals of one request or consumer event, plus query patterns when the N+1 detector is on.
+    """
+
+    def __init__(self, patterns=None):
+        self.queries = 0
+        self.duration = 0.0
+        self.patterns = patterns
+
+
+def record_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection; a no-op unless a collector is active.
+    """
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.duration += time.perf_counter() - started
+        collector.queries += 1
+        if collector.patterns is not None:
+            collector.patterns.observe(sql)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    connection_created receiver (wired up in ApiConfig.ready).
+    """
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def start_collecting():
+    """
+    Starts SQL capture for the current request/event if it is sampled
+    (for metrics, the N+1 detector or both).
+    Returns (collector or None, token for stop_collecting).
+    """
+    patterns = start_detecting()
+    if patterns is None and random.random() >= settings.METRICS_SQL_SAMPLE_RATE:
+        return None, None
+    collector = QueryCollector(patterns)
+    return collector, _collector.set(collector)
+
+
+def stop_collecting(token):
+    if token is not None:
+        _collector.reset(token)
+
+
+# --- HTTP ---
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+def view_class_of(request):
+    """
+    The class-based view that handled the request (with_async_reads views pick one per request).
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    if hasattr(func, 'view_for'):
+        func = func.view_for(request)
+    return getattr(func, 'view_class', None)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status, response size and SQL per route. Works for sync and async requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collector, token = start_collecting()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_collecting(token)
+        self.record(request, response, time.perf_counter() - started, collector)
+        return response
+
+    async def __acall__(self, request):
+        collector, token = start_collecting()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_collecting(token)
+        self.record(request, response, time.perf_counter() - started, collector)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, collector):
+        route, method = route_of(request), request.method
+        HTTP_REQUESTS.inc(route, method, str(response.status_code))
+        HTTP_LATENCY.observe(elapsed, route, method)
+        if not response.streaming:
+            HTTP_RESPONSE_SIZE.observe(len(response.content), route, method)
+        if collector is not None:
+            HTTP_QUERIES.observe(collector.queries, route, method)
+            HTTP_DB_TIME.observe(collector.duration, route, method)
+            check(collector.patterns, collector.queries, f"{method} {route}", budget_for(view_class_of(request), method))
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requires `Authorization: Bearer <METRICS_TOKEN>`;
+    without METRICS_TOKEN it is closed (403).
+    """
+    token = settings.METRICS_TOKEN
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Channels ---
+
+class MetricsConsumerMixin:
+    """
+    Mix into a Channels consumer (before the consumer base class) to record
+    every event it handles: websocket.connect/receive/disconnect and group messages.
+    """
+
+    async def dispatch(self, message):
+        consumer, event = type(self).__name__, message.get('type', 'unknown')
+        collector, token = start_collecting()
+        started = time.perf_counter()
+        try:
+            await super().dispatch(message)
+        finally:
+            stop_collecting(token)
+            WS_EVENTS.inc(consumer, event)
+            WS_LATENCY.observe(time.perf_counter() - started, consumer, event)
+            if collector is not None:
+                WS_QUERIES.observe(collector.queries, consumer, event)
+                WS_DB_TIME.observe(collector.duration, consumer, event)
+        if collector is not None:
+            check(collector.patterns, collector.queries, f"{consumer} {event}", budget_for(type(self), event))
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        size = len(text_data.encode('utf-8')) if text_data is not None else len(bytes_data or b'')
+        if size:
+            WS_SENT_BYTES.inc(type(self).__name__, amount=size)
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_project_submission_file_project_submission_notes_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('type', models.CharField(db_index=True, max_length=100)),
+                ('payload', models.JSONField()),
+                ('stripe_created', models.DateTimeField(help_text='When Stripe created the event (used to order processing).')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'ordering': ['stripe_created', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='payment_status',
+            field=models.CharField(blank=True, help_text='Last known Stripe Payment Intent status (kept in sync by webhooks)', max_length=40),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_stripeevent_project_payment_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentIntentRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intent_id', models.CharField(max_length=255, unique=True)),
+                ('status', models.CharField(max_length=40)),
+                ('amount', models.PositiveIntegerField(help_text='Amount in the smallest currency unit (cents).')),
+                ('currency', models.CharField(default='usd', max_length=3)),
+                ('client_secret', models.CharField(blank=True, help_text='Handed back to the client to reopen checkout.', max_length=255)),
+                ('last_synced_at', models.DateTimeField(db_index=True)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_intents', to='api.project')),
+            ],
+        ),
+    ]
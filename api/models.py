@@ -1,5 +1,7 @@
 # In api/models.py
 
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model # Import this
@@ -38,6 +40,8 @@ class User(AbstractUser):
         blank=True,
         default='profile_pics/default_avatar.png' # Make sure this file exists in media/profile_pics/
     )
+    # Resized copies of profile_picture, written by api/images.py: {'source': name, size: {format: name}}
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(blank=True, help_text="Tell us about yourself.")
     skills = models.ManyToManyField(
         Skill,
@@ -68,6 +72,11 @@ class User(AbstractUser):
 
     # Method to handle role changes
     def save(self, *args, **kwargs):
+        self.clear_fields_for_role()
+        super().save(*args, **kwargs)
+
+    def clear_fields_for_role(self):
+        """ Blanks the profile fields of the other role (also used before bulk_create, which skips save). """
         if self.role == self.Role.CLIENT:
             self.availability = None
             self.hourly_rate = None
@@ -77,7 +86,6 @@ class User(AbstractUser):
         elif self.role == self.Role.FREELANCER:
              self.company_name = ''
              self.company_website = ''
-        super().save(*args, **kwargs)
 
 
 # --- Project and Bid Models ---
@@ -126,6 +134,7 @@ class Project(models.Model):
     budget = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
     payment_intent_id = models.CharField(max_length=255, blank=True, null=True, help_text="Stripe Payment Intent ID")
+    payment_status = models.CharField(max_length=40, blank=True, help_text="Last known Stripe Payment Intent status (kept in sync by webhooks)")
     
     # --- NEW FIELDS ---
     category = models.CharField(
@@ -190,6 +199,7 @@ class Bid(models.Model):
         default=Status.PENDING
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True) # Set it explicitly in queryset update()s; bid lists derive their ETag from it
 
     class Meta:
         # Ensure a freelancer can bid only once per project
@@ -294,4 +304,73 @@ class Follow(models.Model):
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
 
-# --- END: Follow Model ---
\ No newline at end of file
+# --- END: Follow Model ---
+
+# --- NEW: Stripe Webhook Event Store ---
+class StripeEvent(models.Model):
+    """
+    Raw Stripe webhook event, stored as soon as the signature is verified.
+    The unique event_id makes redelivered events a no-op; a background worker
+    (`manage.py process_stripe_events`) applies them in batches.
+    """
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100, db_index=True)
+    payload = models.JSONField()
+    stripe_created = models.DateTimeField(help_text="When Stripe created the event (used to order processing).")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['stripe_created', 'id']
+
+    def __str__(self):
+        return f"{self.type} ({self.event_id})"
+
+# --- END: Stripe Webhook Event Store ---
+
+# --- NEW: Local Payment Intent Cache ---
+class PaymentIntentRecord(models.Model):
+    """
+    Local copy of a Stripe PaymentIntent.
+    Webhooks keep it current; reads only go back to Stripe once a non-final
+    record is older than STRIPE_INTENT_CACHE_TTL (see api/payments.py).
+    """
+    intent_id = models.CharField(max_length=255, unique=True)
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payment_intents'
+    )
+    status = models.CharField(max_length=40)
+    amount = models.PositiveIntegerField(help_text="Amount in the smallest currency unit (cents).")
+    currency = models.CharField(max_length=3, default='usd')
+    client_secret = models.CharField(max_length=255, blank=True, help_text="Handed back to the client to reopen checkout.")
+    last_synced_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.intent_id} ({self.status})"
+
+# --- END: Local Payment Intent Cache ---
+
+# --- NEW: Resumable Submission Uploads ---
+class SubmissionUpload(models.Model):
+    """
+    A chunked upload of a work submission in progress (see api/uploads.py).
+    The bytes received so far are in a staging file; `offset` counts them.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='submission_uploads')
+    freelancer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='submission_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Total size in bytes, declared when the upload starts.")
+    offset = models.BigIntegerField(default=0, help_text="Bytes received so far.")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected SHA-256 (hex) of the whole file, if given.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+# --- END: Resumable Submission Uploads ---
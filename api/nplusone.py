@@ -0,0 +1,146 @@
+# In api/nplusone.py
+"""
+N+1 query detection.
+
+Every SELECT run during a request or consumer event is reduced to a
+fingerprint (literals and IN-list lengths removed). When one fingerprint
+repeats QUERY_DETECTOR_THRESHOLD times, a serializer or loop is almost
+certainly loading a relation row by row. The detector then records where
+that query came from (see query_origin).
+
+Views and consumers can also declare a `query_budget`: the most queries one
+request may run, independent of how many rows it returns. It is either an int
+or a dict keyed by HTTP method (views) or event type (consumers).
+
+QUERY_DETECTOR controls what happens on a finding:
+  'raise' - raise NPlusOneError (the test runner below turns this on)
+  'log'   - log a warning with the origin, for QUERY_DETECTOR_SAMPLE_RATE of requests
+  'off'   - do nothing
+
+The queries are captured by the same execute wrapper as api/metrics.py.
+"""
+import logging
+import random
+import re
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+logger = logging.getLogger('api.queries')
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+# Frames that are never the interesting part of a query's origin
+_MACHINERY = ('/django/db/', '/asgiref/', '/concurrent/', '/threading.py', 'api/metrics.py', 'api/nplusone.py', 'api/db_router.py')
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """
+    Normalizes SQL so queries that only differ in parameters compare equal.
+    """
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _NUMBER.sub('N', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _short_path(filename):
+    if 'site-packages/' in filename:
+        return filename.split('site-packages/', 1)[1]
+    if filename.startswith(_PROJECT_ROOT):
+        return str(Path(filename).relative_to(_PROJECT_ROOT))
+    return filename
+
+
+def query_origin(limit=3):
+    """
+    Where the current query comes from: the innermost frames of our own code,
+    plus the library frame that actually triggered it (e.g. a DRF field
+    following `source='client.username'`).
+    """
+    frames = [frame for frame in traceback.extract_stack()[:-1] if not any(m in frame.filename for m in _MACHINERY)]
+    own = [frame for frame in frames if frame.filename.startswith(_PROJECT_ROOT) and 'site-packages' not in frame.filename]
+    origin = own[-limit:]
+    if frames and frames[-1] not in origin:
+        origin.append(frames[-1])
+    return [f"{_short_path(frame.filename)}:{frame.lineno} in {frame.name}" for frame in reversed(origin)]
+
+
+class QueryPatterns:
+    """
+    Fingerprint counts of one request or event.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = {}
+        self.origins = {} # fingerprint -> stack origin, captured once the threshold is hit
+
+    def observe(self, sql):
+        if not sql.lstrip()[:6].upper() == 'SELECT':
+            return
+        key = fingerprint(sql)
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count == self.threshold:
+            self.origins[key] = query_origin()
+
+    def repeated(self):
+        return [(key, self.counts[key], origin) for key, origin in self.origins.items()]
+
+
+def start_detecting():
+    """
+    Returns a QueryPatterns to fill for the current request/event, or None when it is not inspected.
+    """
+    mode = settings.QUERY_DETECTOR
+    if mode == 'off' or (mode != 'raise' and random.random() >= settings.QUERY_DETECTOR_SAMPLE_RATE):
+        return None
+    return QueryPatterns(settings.QUERY_DETECTOR_THRESHOLD)
+
+
+def budget_for(owner, key):
+    """
+    Reads `query_budget` from a view/consumer class: an int, or a dict keyed by method/event.
+    """
+    budget = getattr(owner, 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(key)
+    return budget
+
+
+def check(patterns, total_queries, label, budget=None):
+    """
+    Reports repeated queries and budget overruns for one request/event.
+    """
+    if patterns is None:
+        return
+    problems = []
+    for key, count, origin in patterns.repeated():
+        problems.append(f"{count} similar queries: {key}\n    from " + '\n    from '.join(origin or ['<unknown>']))
+    if budget is not None and total_queries > budget:
+        problems.append(f"{total_queries} queries, budget is {budget}")
+    if not problems:
+        return
+
+    message = f"Query problems in {label}:\n  " + '\n  '.join(problems)
+    if settings.QUERY_DETECTOR == 'raise':
+        raise NPlusOneError(message)
+    logger.warning(message)
+
+
+class QueryDetectorTestRunner(DiscoverRunner):
+    """
+    Test runner that turns query findings into test failures.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_DETECTOR = 'raise'
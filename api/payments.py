@@ -0,0 +1,223 @@
+# In api/payments.py
+"""
+Payment gateway used by the Stripe views.
+
+All Stripe traffic goes through one shared StripeClient so that every request
+reuses pooled HTTP connections, runs with explicit connect/read timeouts and
+is retried with exponential backoff on connection errors, 409s and 5xx.
+Callers pass idempotency keys so a retried (or double-clicked) request can
+never create a second account or PaymentIntent.
+
+Sync methods are for the regular DRF views; the `a`-prefixed coroutines are
+for async views and consumers and never block the event loop.
+
+PaymentIntents are also cached locally in PaymentIntentRecord, so reopening
+checkout or releasing a payment does not need a Stripe round-trip.
+"""
+import asyncio
+import ssl
+import weakref
+from datetime import timedelta
+from functools import lru_cache
+
+import stripe
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PaymentIntentRecord
+
+try:
+    import httpx
+except ImportError: # httpx is optional, fall back to a pooled requests session
+    httpx = None
+
+
+if httpx is not None:
+    class LoopBoundHTTPXClient(stripe.HTTPXClient):
+        """
+        HTTPXClient with one async pool per event loop. httpx connections belong
+        to the loop that opened them, so a pool shared across loops (e.g. several
+        async_to_sync calls) hands out dead connections that Stripe then retries.
+        """
+
+        def __init__(self, **kwargs):
+            self._async_pools = weakref.WeakKeyDictionary()
+            super().__init__(**kwargs)
+            # Unlike the connections, the TLS context can be shared by every loop
+            self._verify = ssl.create_default_context(cafile=stripe.ca_bundle_path) if self._verify_ssl_certs else False
+
+        @property
+        def _client_async(self):
+            loop = asyncio.get_running_loop()
+            pool = self._async_pools.get(loop)
+            if pool is None:
+                pool = self._async_pools[loop] = self.httpx.AsyncClient(verify=self._verify)
+            return pool
+
+        @_client_async.setter
+        def _client_async(self, pool):
+            pass # Built lazily, per loop, by the getter
+
+def build_http_client():
+    """
+    Returns a Stripe HTTP client with connection pooling and explicit timeouts.
+    HTTPX gives us a sync pool and one async pool per event loop; without it we
+    fall back to requests (sync only).
+    """
+    connect_timeout = settings.STRIPE_CONNECT_TIMEOUT
+    read_timeout = settings.STRIPE_TIMEOUT
+    if httpx is not None:
+        return LoopBoundHTTPXClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            allow_sync_methods=True,
+        )
+    return stripe.RequestsClient(timeout=(connect_timeout, read_timeout))
+
+
+class PaymentGateway:
+    """
+    Thin wrapper around StripeClient for the calls the platform makes.
+    Errors are raised as regular `stripe.StripeError` subclasses, so views keep
+    their existing `except StripeError` handling.
+    """
+
+    def __init__(self, api_key, api_base=None, max_network_retries=2, http_client=None):
+        self.client = stripe.StripeClient(
+            api_key,
+            base_addresses={'api': api_base} if api_base else None,
+            max_network_retries=max_network_retries,
+            http_client=http_client or build_http_client(),
+        )
+
+    @staticmethod
+    def _options(idempotency_key):
+        return {'idempotency_key': idempotency_key} if idempotency_key else {}
+
+    # --- Connect accounts ---
+    def create_account(self, idempotency_key=None, **params):
+        return self.client.v1.accounts.create(params=params, options=self._options(idempotency_key))
+
+    def create_account_link(self, **params):
+        return self.client.v1.account_links.create(params=params)
+
+    async def acreate_account(self, idempotency_key=None, **params):
+        return await self.client.v1.accounts.create_async(params=params, options=self._options(idempotency_key))
+
+    async def acreate_account_link(self, **params):
+        return await self.client.v1.account_links.create_async(params=params)
+
+    # --- Payment Intents ---
+    def create_payment_intent(self, idempotency_key=None, **params):
+        return self.client.v1.payment_intents.create(params=params, options=self._options(idempotency_key))
+
+    def retrieve_payment_intent(self, intent_id):
+        return self.client.v1.payment_intents.retrieve(intent_id)
+
+    def capture_payment_intent(self, intent_id, idempotency_key=None):
+        return self.client.v1.payment_intents.capture(intent_id, options=self._options(idempotency_key))
+
+    async def acreate_payment_intent(self, idempotency_key=None, **params):
+        return await self.client.v1.payment_intents.create_async(params=params, options=self._options(idempotency_key))
+
+    async def aretrieve_payment_intent(self, intent_id):
+        return await self.client.v1.payment_intents.retrieve_async(intent_id)
+
+    async def acapture_payment_intent(self, intent_id, idempotency_key=None):
+        return await self.client.v1.payment_intents.capture_async(intent_id, options=self._options(idempotency_key))
+
+
+@lru_cache(maxsize=1)
+def get_gateway():
+    """
+    Returns the process-wide gateway (and with it, the shared connection pool).
+    Call `get_gateway.cache_clear()` after changing Stripe settings, e.g. in tests.
+    """
+    return PaymentGateway(
+        api_key=settings.STRIPE_SECRET_KEY,
+        api_base=settings.STRIPE_API_BASE,
+        max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+    )
+
+
+# --- Local PaymentIntent cache ---
+
+# Final states never change again, so their records never go stale
+TERMINAL_INTENT_STATUSES = {'succeeded', 'canceled'}
+# The client has paid: the money is held for capture, or already captured
+FUNDED_INTENT_STATUSES = ('requires_capture', 'succeeded')
+
+
+def is_stale(record, max_age=None):
+    if record.status in TERMINAL_INTENT_STATUSES:
+        return False
+    max_age = settings.STRIPE_INTENT_CACHE_TTL if max_age is None else max_age
+    return record.last_synced_at < timezone.now() - timedelta(seconds=max_age)
+
+
+def remember_intent(intent, project_id=None):
+    """
+    Stores (or refreshes) the local record for a PaymentIntent returned by Stripe.
+    Accepts either a StripeObject or a plain dict (e.g. from a webhook payload).
+    """
+    if hasattr(intent, 'to_dict'):
+        intent = intent.to_dict()
+    defaults = {
+        'status': intent['status'],
+        'amount': intent.get('amount') or 0,
+        'currency': intent.get('currency') or 'usd',
+        'last_synced_at': timezone.now(),
+    }
+    if intent.get('client_secret'):
+        defaults['client_secret'] = intent['client_secret']
+    record, _ = PaymentIntentRecord.objects.update_or_create(
+        intent_id=intent['id'],
+        defaults=defaults,
+        create_defaults={**defaults, 'project_id': project_id},
+    )
+    return record
+
+
+def remember_intents(intents, project_ids=None):
+    """
+    Bulk version of remember_intent for webhook batches: one read, one upsert.
+    Late events never move a record out of a final state.
+    Returns the intent ids that were written.
+    """
+    project_ids = project_ids or {}
+    intents = {intent['id']: intent for intent in intents}
+    known = dict(PaymentIntentRecord.objects.filter(intent_id__in=list(intents)).values_list('intent_id', 'status'))
+    now = timezone.now()
+    rows = [
+        PaymentIntentRecord(
+            intent_id=intent_id,
+            project_id=project_ids.get(intent_id),
+            status=intent['status'],
+            amount=intent.get('amount') or 0,
+            currency=intent.get('currency') or 'usd',
+            client_secret=intent.get('client_secret') or '',
+            last_synced_at=now,
+        )
+        for intent_id, intent in intents.items()
+        if not (known.get(intent_id) in TERMINAL_INTENT_STATUSES and intent['status'] not in TERMINAL_INTENT_STATUSES)
+    ]
+    if rows:
+        PaymentIntentRecord.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['intent_id'],
+            update_fields=['status', 'amount', 'currency', 'last_synced_at'],
+        )
+    return [row.intent_id for row in rows]
+
+
+def get_payment_intent(intent_id, max_age=None):
+    """
+    Returns the local record for an intent, refreshing it from Stripe only when
+    it is missing or stale. Raises StripeError if that refresh fails.
+    """
+    record = PaymentIntentRecord.objects.filter(intent_id=intent_id).first()
+    if record is not None and not is_stale(record, max_age):
+        return record
+    print(f"[PaymentIntentCache] Refreshing {intent_id} from Stripe.")
+    intent = get_gateway().retrieve_payment_intent(intent_id)
+    return remember_intent(intent, project_id=record.project_id if record else None)
@@ -0,0 +1,177 @@
+# In api/provisioning.py
+"""
+Bulk user provisioning: POST /api/users/provision/ (staff only) and
+`manage.py provision_users`, e.g. to onboard an agency's freelancers.
+
+Rows have the ProvisionedUserSerializer fields, read like the project
+import (CSV, NDJSON or a JSON array, see api/imports.py); `skills` is a
+list of names, or "Django,React" in CSV. Per PROVISIONING_BATCH_SIZE rows:
+
+- rows are validated, and their usernames checked against the database
+  (and each other) in one query;
+- passwords are hashed in a process pool by the management command.
+  make_password is slow on purpose, and it is nearly all of create_user's
+  time. The API hashes in process: forking a multi-threaded server is not
+  safe;
+- skills are matched case-insensitively in one query, and the missing
+  ones created with bulk_create;
+- users and their skill links are inserted with bulk_create.
+
+Everything runs in one transaction. As with the import, any invalid row
+cancels the whole run unless `partial` is set.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+
+from .caching import invalidate
+from .models import User, Skill
+from .serializers import ProvisionedUserSerializer
+
+
+def _setup_worker():
+    django.setup() # A no-op in forked workers; needed where workers are spawned
+
+
+class PasswordHasher:
+    """
+    make_password() over a process pool, started on first use and shut down on exit.
+    With one worker, or fewer than PROVISIONING_POOL_MIN passwords, they are hashed
+    in process: starting workers costs more. Only for single-threaded callers (the
+    command): the workers are forked.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or settings.PROVISIONING_WORKERS or os.cpu_count() or 1
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def hash(self, passwords):
+        if self.workers == 1 or len(passwords) < settings.PROVISIONING_POOL_MIN:
+            return [make_password(password) for password in passwords]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_setup_worker)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self.pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def resolve_skills(names):
+    """
+    {lowercased name: skill id} for `names`, creating the missing skills (named as first given).
+    Returns (that dict, whether any skill was created).
+    """
+    wanted = {}
+    for name in names:
+        wanted.setdefault(name.strip().lower(), name.strip())
+    if not wanted:
+        return {}, False
+
+    def existing():
+        found = dict(Skill.objects.annotate(key=Lower('name')).filter(key__in=list(wanted)).values_list('key', 'pk'))
+        unmatched = [wanted[key] for key in wanted if key not in found]
+        if unmatched: # SQL LOWER() only folds ASCII; match those names exactly instead
+            found.update((name.lower(), pk) for name, pk in Skill.objects.filter(name__in=unmatched).values_list('name', 'pk'))
+        return found
+
+    found = existing()
+    missing = [Skill(name=name) for key, name in wanted.items() if key not in found]
+    if not missing:
+        return found, False
+    Skill.objects.bulk_create(missing, ignore_conflicts=True) # Another request may create the same skill meanwhile
+    return existing(), True
+
+
+def _insert(batch, errors, hasher):
+    """
+    Inserts one batch of (row number, validated data). Returns the users and whether skills were created.
+    """
+    for _, data in batch: # As create_user() does
+        data['username'] = User.normalize_username(data['username'])
+        data['email'] = User.objects.normalize_email(data.get('email', ''))
+    taken = set(User.objects.filter(username__in=[data['username'] for _, data in batch]).values_list('username', flat=True))
+    valid = []
+    for number, data in batch:
+        if data['username'] in taken:
+            errors.append({'row': number, 'errors': {'username': ["A user with that username already exists."]}})
+        else:
+            taken.add(data['username'])
+            valid.append(data)
+    if not valid:
+        return [], False
+
+    hashes = hasher.hash([data.pop('password') for data in valid])
+    skill_names = [data.pop('skills', []) for data in valid]
+    users = []
+    for data, password in zip(valid, hashes):
+        user = User(**data, password=password)
+        user.clear_fields_for_role()
+        users.append(user)
+    User.objects.bulk_create(users)
+    if any(user.pk is None for user in users): # Backends that cannot return ids from a bulk insert
+        ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+        for user in users:
+            user.pk = ids[user.username]
+
+    skills, created_skills = resolve_skills(name for names in skill_names for name in names)
+    Link = User.skills.through
+    Link.objects.bulk_create([
+        Link(user_id=user.pk, skill_id=skills[key])
+        for user, names in zip(users, skill_names)
+        for key in {name.strip().lower() for name in names}
+    ])
+    return users, created_skills
+
+
+def provision_users(rows, partial=False, workers=1):
+    """
+    Validates and creates the users in `rows`. `workers` is the number of password
+    hashing processes (None: PROVISIONING_WORKERS); keep 1 inside a web server.
+    Returns (number created, [{'row': n, 'errors': {...}}], seconds taken); rows are numbered from 1.
+    """
+    started = time.perf_counter()
+    serializer = ProvisionedUserSerializer()
+    batch_size, max_rows = settings.PROVISIONING_BATCH_SIZE, settings.PROVISIONING_MAX_ROWS
+    created, errors, batch, new_skills = 0, [], [], False
+    with PasswordHasher(workers) as hasher, transaction.atomic():
+        def flush():
+            nonlocal created, new_skills
+            users, created_skills = _insert(batch, errors, hasher)
+            created += len(users)
+            new_skills = new_skills or created_skills
+            batch.clear()
+
+        for number, row in enumerate(rows, start=1):
+            if number > max_rows:
+                errors.append({'row': number, 'errors': {'non_field_errors': [f"At most {max_rows} users can be provisioned at once."]}})
+                break
+            try:
+                if not isinstance(row, dict):
+                    raise serializers.ValidationError({'non_field_errors': ["Expected an object."]})
+                batch.append((number, serializer.run_validation(row)))
+            except serializers.ValidationError as exc:
+                errors.append({'row': number, 'errors': exc.detail})
+            if len(batch) == batch_size:
+                flush()
+        if batch:
+            flush()
+        errors.sort(key=lambda error: error['row'])
+        if errors and not partial:
+            transaction.set_rollback(True)
+            return 0, errors, time.perf_counter() - started
+
+    if new_skills:
+        invalidate('skills')
+    return created, errors, time.perf_counter() - started
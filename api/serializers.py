@@ -1,14 +1,58 @@
+import os
+import re
+
 from rest_framework import serializers
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.conf import settings
-from .models import User, Project, Bid, Skill, ChatRoom, Message, Follow
+from .models import User, Project, Bid, Skill, ChatRoom, Message, Follow, SubmissionUpload
 from rest_framework.exceptions import AuthenticationFailed
+from .fieldsets import SparseFieldsMixin
+from .images import DEFAULT_PICTURE, FORMATS as PICTURE_FORMATS, has_picture
+from .payments import FUNDED_INTENT_STATUSES
+from django.core.files.storage import default_storage
+
+
+# --- NEW: Profile Picture URLs ---
+def profile_picture_urls(user, request):
+    """
+    {size: {format: url}} for the user's picture. Sizes not rendered yet (see api/images.py)
+    point to the default avatar (None without a request), never to the upload: it keeps its EXIF.
+    """
+    fallback = f"{settings.MEDIA_URL}{DEFAULT_PICTURE}" if request else None
+    variants = user.profile_picture_variants if has_picture(user) else {}
+    if variants.get('source') != user.profile_picture.name: # From an older picture
+        variants = {}
+    urls = {}
+    for label in settings.PROFILE_PICTURE_SIZES:
+        files = variants.get(label, {})
+        urls[label] = {
+            fmt: default_storage.url(files[fmt]) if fmt in files else fallback
+            for fmt in PICTURE_FORMATS
+        }
+        if request:
+            urls[label] = {fmt: url and request.build_absolute_uri(url) for fmt, url in urls[label].items()}
+    return urls
+
+
+def profile_picture_url(user, request):
+    """ The largest JPEG variant: the picture without its metadata, at a size fit for a profile page. """
+    sizes = settings.PROFILE_PICTURE_SIZES
+    return profile_picture_urls(user, request)[max(sizes, key=sizes.get)]['jpeg']
+# --- END Profile Picture URLs ---
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """ Embedded user for ?expand= (see api/fieldsets.py). """
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'name']
 
 
 # --- NEW: Chat Serializers ---
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for individual chat messages.
     """
@@ -27,8 +71,9 @@ class MessageSerializer(serializers.ModelSerializer):
             'is_read'
         ]
         read_only_fields = ['id', 'room', 'sender', 'sender_username', 'timestamp']
+        expandable = {'sender': UserSummarySerializer}
 
-class ChatRoomSerializer(serializers.ModelSerializer):
+class ChatRoomSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for chat rooms.
     """
@@ -52,12 +97,17 @@ class ChatRoomSerializer(serializers.ModelSerializer):
             'last_message'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'last_message']
+        field_sources = {'last_message': []} # Attached by the views
 
     def get_last_message(self, obj):
         """
         Get the most recent message from the chat room.
+        Views may attach it up front as `latest_message` to skip the query per room.
         """
-        last_msg = obj.messages.order_by('-timestamp').first()
+        if hasattr(obj, 'latest_message'):
+            last_msg = obj.latest_message
+        else:
+            last_msg = obj.messages.order_by('-timestamp').first()
         if last_msg:
             return MessageSerializer(last_msg).data
         return None
@@ -65,7 +115,7 @@ class ChatRoomSerializer(serializers.ModelSerializer):
 # --- END: Chat Serializers ---
 
 # --- NEW: Simplified Serializers for Embedding ---
-class SkillSerializer(serializers.ModelSerializer):
+class SkillSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Skill
         fields = ['id', 'name']
@@ -83,17 +133,21 @@ class SkillSerializer(serializers.ModelSerializer):
         # Return the original value or a normalized one if preferred
         return value
 
-class SimpleProjectSerializer(serializers.ModelSerializer):
+class SimpleProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """ A very basic serializer for listing projects on a profile. """
     class Meta:
         model = Project
         fields = ['id', 'title', 'status', 'category'] # Only essential info
 
-class PublicUserProfileSerializer(serializers.ModelSerializer):
+class PublicUserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     skills = SkillSerializer(many=True, read_only=True)
-    projects_as_client = SimpleProjectSerializer(many=True, read_only=True)
-    projects_as_freelancer = SimpleProjectSerializer(many=True, read_only=True)
+    # The latest PROFILE_EMBEDDED_PROJECTS only; all of them are at /api/profiles/<username>/projects/
+    projects_as_client = serializers.SerializerMethodField()
+    projects_as_freelancer = serializers.SerializerMethodField()
+    projects_as_client_count = serializers.SerializerMethodField()
+    projects_as_freelancer_count = serializers.SerializerMethodField()
     profile_picture_url = serializers.SerializerMethodField()
+    profile_picture_urls = serializers.SerializerMethodField()
     availability_display = serializers.CharField(source='get_availability_display', read_only=True)
     followers_count = serializers.SerializerMethodField()
     following_count = serializers.SerializerMethodField()
@@ -103,35 +157,72 @@ class PublicUserProfileSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'id', 'username', 'name', 'role', 'date_joined',
-            'profile_picture_url', 'bio', 'skills',
+            'profile_picture_url', 'profile_picture_urls', 'bio', 'skills',
             'availability', 'availability_display', 'hourly_rate', # Added
             'company_name', 'company_website', # Added
             'projects_as_client', 'projects_as_freelancer','followers_count', 
             'following_count', 'is_following',
+            'projects_as_client_count', 'projects_as_freelancer_count',
         ]
         read_only_fields = fields
+        field_sources = {
+            'profile_picture_url': ['profile_picture', 'profile_picture_variants'],
+            'profile_picture_urls': ['profile_picture', 'profile_picture_variants'],
+            'availability_display': ['availability'],
+            'followers_count': [], 'following_count': [], 'is_following': [], # Annotated by the views
+            'projects_as_client_count': [], 'projects_as_freelancer_count': [],
+            'projects_as_client': ['projects_as_client'], 'projects_as_freelancer': ['projects_as_freelancer'],
+        }
 
     def get_profile_picture_url(self, user):
-        request = self.context.get('request')
-        if user.profile_picture and hasattr(user.profile_picture, 'url') and user.profile_picture.name != 'profile_pics/default_avatar.png':
-            if request: return request.build_absolute_uri(user.profile_picture.url)
-            return user.profile_picture.url
-        # Return default only if the field is actually the default or empty
-        if request:
-             default_path = f"{settings.MEDIA_URL}profile_pics/default_avatar.png"
-             try: return request.build_absolute_uri(default_path)
-             except Exception: pass
-        return None
+        return profile_picture_url(user, self.context.get('request'))
+
+    def get_profile_picture_urls(self, user):
+        # Size-specific avatars: lists and search should use 'small'
+        return profile_picture_urls(user, self.context.get('request'))
     
+    def get_projects_as_client(self, obj):
+        return self._latest_projects(obj, 'projects_as_client')
+
+    def get_projects_as_freelancer(self, obj):
+        return self._latest_projects(obj, 'projects_as_freelancer')
+
+    def _latest_projects(self, obj, relation):
+        # Views prefetch these as recent_<relation> (see profile_prefetches in api/views.py)
+        projects = getattr(obj, f'recent_{relation}', None)
+        if projects is None:
+            projects = getattr(obj, relation).order_by('-created_at', '-pk')[:settings.PROFILE_EMBEDDED_PROJECTS]
+        if not hasattr(self, '_project_serializer'):
+            self._project_serializer = SimpleProjectSerializer() # Built once, not once per profile and relation
+        return [self._project_serializer.to_representation(project) for project in projects]
+
+    def get_projects_as_client_count(self, obj):
+        if hasattr(obj, 'projects_as_client_count'):
+            return obj.projects_as_client_count
+        return obj.projects_as_client.count()
+
+    def get_projects_as_freelancer_count(self, obj):
+        if hasattr(obj, 'projects_as_freelancer_count'):
+            return obj.projects_as_freelancer_count
+        return obj.projects_as_freelancer.count()
+
+    # The three methods below use values annotated by the view when present
+    # (see annotate_profile_counts in api/views.py) instead of querying per user.
     def get_followers_count(self, obj):
         # obj is the User instance (the person being viewed)
+        if hasattr(obj, 'followers_count'):
+            return obj.followers_count
         return obj.followers.count() # followers is the related_name from Follow model
 
     def get_following_count(self, obj):
         # obj is the User instance (the person being viewed)
+        if hasattr(obj, 'following_count'):
+            return obj.following_count
         return obj.following.count() # following is the related_name from Follow model
 
     def get_is_following(self, obj):
+        if hasattr(obj, 'is_following'):
+            return obj.is_following
         # Get the logged-in user from the request context
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
@@ -192,7 +283,38 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return user
     
-class ProjectSerializer(serializers.ModelSerializer):
+# --- NEW: Bulk Provisioning Serializer ---
+class SkillNamesField(serializers.ListField):
+    """ A list of skill names, or one comma-separated string (CSV cells). """
+    child = serializers.CharField(max_length=100)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [name for name in data.split(',') if name.strip()]
+        return super().to_internal_value(data)
+
+
+class ProvisionedUserSerializer(serializers.ModelSerializer):
+    """
+    One user of a bulk provisioning (api/provisioning.py). Usernames are checked
+    for uniqueness per batch there, not with one query per row.
+    """
+    skills = SkillNamesField(required=False)
+
+    class Meta:
+        model = User
+        fields = [
+            'username', 'email', 'name', 'role', 'password', 'bio', 'skills',
+            'availability', 'hourly_rate', 'company_name', 'company_website',
+        ]
+        extra_kwargs = {
+            'password': {'write_only': True},
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            'role': {'required': True},
+        }
+# --- END Bulk Provisioning Serializer ---
+
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # To display the client's username in the project list (read-only)
     client_username = serializers.ReadOnlyField(source='client.username')
 
@@ -228,6 +350,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             'submission_notes', 
             'submission_file'
         ]
+        expandable = {'client': UserSummarySerializer, 'freelancer': UserSummarySerializer}
         def validate(self, data):
             if data.get('amount') is not None and data['amount'] <= 0:
                 raise serializers.ValidationError("Bid amount must be positive.")
@@ -235,7 +358,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             # e.g., ensure status is one of the allowed choices
             return data
 
-class BidSerializer(serializers.ModelSerializer):
+class BidSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Display freelancer's username (read-only)
     freelancer_username = serializers.ReadOnlyField(source='freelancer.username')
     # Use PrimaryKeyRelatedField for project if submitting via a separate endpoint
@@ -261,6 +384,7 @@ class BidSerializer(serializers.ModelSerializer):
             'created_at',
             'project' # If project ID comes from URL
         ]
+        expandable = {'project': SimpleProjectSerializer, 'freelancer': UserSummarySerializer}
 
     # Add validation specific to bids if needed (beyond model's clean method)
     def validate(self, data):
@@ -269,15 +393,81 @@ class BidSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Bid amount must be positive.")
         # We rely on the model's clean method for freelancer role and project status
         return data
+
+class BidBulkUpdateSerializer(serializers.Serializer):
+    """ Body of POST /api/projects/<project_pk>/bids/bulk/: bid ids, duplicates dropped in request order. """
+    accept = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    reject = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate_accept(self, value):
+        return list(dict.fromkeys(value))
+
+    def validate_reject(self, value):
+        return list(dict.fromkeys(value))
     
+class ProjectExportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """ Flat project row for exports (api/exports.py): no file or nullable-FK fields. """
+    client_username = serializers.ReadOnlyField(source='client.username')
+
+    class Meta:
+        model = Project
+        fields = [
+            'id', 'title', 'status', 'category', 'budget', 'client', 'client_username', 'freelancer',
+            'created_at', 'updated_at', 'payment_intent_id', 'payment_status',
+        ]
+        read_only_fields = fields
+
+# --- NEW: Dashboard Serializers ---
+class DashboardProjectSerializer(serializers.ModelSerializer):
+    """
+    A project on the dashboard. bid_count and pending_bid_count are annotated by DashboardView.
+    """
+    client_username = serializers.ReadOnlyField(source='client.username')
+    bid_count = serializers.IntegerField(read_only=True)
+    pending_bid_count = serializers.IntegerField(read_only=True)
+    funding_state = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Project
+        fields = [
+            'id', 'title', 'status', 'budget', 'category', 'client', 'client_username', 'freelancer',
+            'updated_at', 'bid_count', 'pending_bid_count', 'payment_status', 'funding_state',
+        ]
+        read_only_fields = fields
+
+    def get_funding_state(self, obj):
+        if obj.payment_status not in FUNDED_INTENT_STATUSES: # Same rule as DashboardView
+            return 'unfunded'
+        return 'released' if obj.status == Project.Status.COMPLETED else 'in_escrow'
+
+
+class DashboardBidSerializer(BidSerializer):
+    project_title = serializers.ReadOnlyField(source='project.title')
+    project_status = serializers.ReadOnlyField(source='project.status')
+
+    class Meta(BidSerializer.Meta):
+        fields = BidSerializer.Meta.fields + ['project_title', 'project_status']
+        read_only_fields = fields
+
+
+class DashboardFundingSerializer(serializers.Serializer):
+    """ Funding totals over the user's projects (an aggregate() dict). """
+    awaiting_funding = serializers.IntegerField() # In progress, no payment yet
+    in_escrow = serializers.IntegerField()
+    escrow_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    released = serializers.IntegerField()
+    released_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+# --- END Dashboard Serializers ---
+
 class UserProfileUpdateSerializer(serializers.ModelSerializer):
     skills = serializers.PrimaryKeyRelatedField(queryset=Skill.objects.all(), many=True, required=False)
     profile_picture_url = serializers.SerializerMethodField(read_only=True) # Add this to see URL in response
+    profile_picture_urls = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = User
         fields = [
-            'name', 'bio', 'skills', 'profile_picture', 'profile_picture_url', # Added URL field here too
+            'name', 'bio', 'skills', 'profile_picture', 'profile_picture_url', 'profile_picture_urls', # Added URL field here too
             'availability', 'hourly_rate', 'company_name', 'company_website' # Added new fields
         ]
         extra_kwargs = {
@@ -292,15 +482,10 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
 
     # Use the same method as Public serializer to get URL for response
     def get_profile_picture_url(self, user):
-        request = self.context.get('request')
-        if user.profile_picture and hasattr(user.profile_picture, 'url') and user.profile_picture.name != 'profile_pics/default_avatar.png':
-            if request: return request.build_absolute_uri(user.profile_picture.url)
-            return user.profile_picture.url
-        if request:
-             default_path = f"{settings.MEDIA_URL}profile_pics/default_avatar.png"
-             try: return request.build_absolute_uri(default_path)
-             except Exception: pass
-        return None
+        return profile_picture_url(user, self.context.get('request'))
+
+    def get_profile_picture_urls(self, user):
+        return profile_picture_urls(user, self.context.get('request'))
 
     def validate(self, data):
         user = self.instance
@@ -327,6 +512,30 @@ class FreelancerMatchSerializer(PublicUserProfileSerializer):
         # Get all fields from parent and add the new one
         fields = PublicUserProfileSerializer.Meta.fields + ['match_score']
 
+class SubmissionUploadSerializer(serializers.ModelSerializer):
+    """ A resumable submission upload (see api/uploads.py). """
+    class Meta:
+        model = SubmissionUpload
+        fields = ['id', 'filename', 'size', 'offset', 'sha256', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'offset', 'created_at', 'updated_at']
+
+    def validate_filename(self, value):
+        name = os.path.basename(value.replace('\\', '/')).strip()
+        if not name:
+            raise serializers.ValidationError("A file name is required.")
+        return name
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.SUBMISSION_MAX_SIZE:
+            raise serializers.ValidationError(f"Submissions are 1 to {settings.SUBMISSION_MAX_SIZE} bytes.")
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError("Expected 64 hexadecimal digits.")
+        return value
+
 class WorkSubmissionSerializer(serializers.ModelSerializer):
     """
     Serializer for the freelancer to submit their work.
@@ -1,3 +1,1579 @@
-from django.test import TestCase
+import base64
+import fcntl
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import urllib.request
+import uuid
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from PIL import Image
+
+from .benchmarks import compare_to_baseline, load_baseline, save_baseline
+from .caching import CachePolicy
+from .compression import brotli, choose_encoding
+from .consumers import ChatConsumer
+from .datagen import generate_dataset
+from .exports import ExportMixin
+from .db_router import PrimaryReplicaRouter, ReplicaPinningMiddleware, pin_to_primary, replicate, user_client_key
+from .fake_stripe import FakeStripeServer
+from . import images
+from .images import render
+from .metrics import registry, start_collecting, stop_collecting
+from .nplusone import NPlusOneError, check, fingerprint
+from .models import User, Project, Bid, Skill, ChatRoom, Message, Follow, StripeEvent, PaymentIntentRecord, SubmissionUpload
+from .payments import get_gateway, get_payment_intent, remember_intent
+from .provisioning import PasswordHasher, provision_users
+from .renderers import ORJSONRenderer
+from .serializers import PublicUserProfileSerializer
+from . import uploads
+from .webhooks import process_pending_events
+
+
+def make_user(username, role, **extra):
+    return User.objects.create_user(username=username, password='pass12345', name=username.title(), role=role, **extra)
+
+
+class ProjectBidBulkUpdateTests(TestCase):
+    def setUp(self):
+        self.client_user = make_user('acme', User.Role.CLIENT)
+        self.other_client = make_user('globex', User.Role.CLIENT)
+        self.freelancers = [make_user(f'dev{i}', User.Role.FREELANCER) for i in range(4)]
+        self.project = Project.objects.create(title='Site', description='Build it', budget=500, client=self.client_user)
+        self.bids = [
+            Bid.objects.create(project=self.project, freelancer=f, amount=100 + i, proposal='Hire me')
+            for i, f in enumerate(self.freelancers)
+        ]
+        self.api = APIClient()
+        self.url = reverse('project-bid-bulk-update', kwargs={'project_pk': self.project.pk})
+
+    def test_accept_assigns_freelancer_and_rejects_the_rest(self):
+        self.api.force_authenticate(self.client_user)
+        winner = self.bids[1]
+        response = self.api.post(self.url, {'accept': [winner.pk]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        results = {r['id']: r['result'] for r in response.data['results']}
+        self.assertEqual(results[winner.pk], Bid.Status.ACCEPTED)
+        self.assertEqual(sorted(pk for pk, r in results.items() if r == Bid.Status.REJECTED),
+                         sorted(b.pk for b in self.bids if b.pk != winner.pk))
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.freelancer, winner.freelancer)
+        self.assertEqual(self.project.status, Project.Status.IN_PROGRESS)
+        self.assertEqual(self.project.budget, winner.amount)
+
+    def test_reject_reports_per_id_results(self):
+        self.api.force_authenticate(self.client_user)
+        Bid.objects.filter(pk=self.bids[0].pk).update(status=Bid.Status.REJECTED)
+        response = self.api.post(self.url, {'reject': [self.bids[0].pk, self.bids[2].pk, 999999]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['result'] for r in response.data['results']], ['skipped', Bid.Status.REJECTED, 'not_found'])
+        self.assertEqual(Bid.objects.filter(status=Bid.Status.PENDING).count(), 2)
+
+    def test_malformed_ids_are_rejected(self):
+        self.api.force_authenticate(self.client_user)
+        for body in ({'accept': [True]}, {'accept': [1.9]}, {'reject': 'abc'}, {'reject': [[1]]}, [self.bids[0].pk], 5):
+            response = self.api.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(Bid.objects.exclude(status=Bid.Status.PENDING).exists())
+
+    def test_only_project_owner_can_moderate(self):
+        self.api.force_authenticate(self.other_client)
+        response = self.api.post(self.url, {'reject': [self.bids[0].pk]}, format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Bid.objects.exclude(status=Bid.Status.PENDING).exists())
+
+
+class PaymentGatewayTests(TestCase):
+    """
+    Runs the funding/release flow against the local fake Stripe server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe_server = FakeStripeServer().start()
+        cls.stripe_settings = override_settings(
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_API_BASE=cls.stripe_server.api_base,
+            STRIPE_MAX_NETWORK_RETRIES=2,
+        )
+        cls.stripe_settings.enable()
+        get_gateway.cache_clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stripe_settings.disable()
+        get_gateway.cache_clear()
+        cls.stripe_server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.stripe_server.reset()
+        self.client_user = make_user('acme', User.Role.CLIENT)
+        self.freelancer = make_user('dev', User.Role.FREELANCER, stripe_account_id='acct_dev')
+        self.project = Project.objects.create(
+            title='Site', description='Build it', budget=250, client=self.client_user,
+            freelancer=self.freelancer, status=Project.Status.IN_PROGRESS,
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def test_fund_creates_intent_and_reuses_it(self):
+        url = reverse('project-fund', kwargs={'project_pk': self.project.pk})
+        first = self.api.post(url)
+        self.assertEqual(first.status_code, 201)
+        self.project.refresh_from_db()
+        intent = self.stripe_server.state.payment_intents[self.project.payment_intent_id]
+        self.assertEqual(intent['amount'], 25000)
+        self.assertEqual(intent['transfer_data'], {'destination': 'acct_dev'})
+
+        stripe_calls = self.stripe_server.state.request_count
+        second = self.api.post(url)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['clientSecret'], first.data['clientSecret'])
+        self.assertEqual(self.stripe_server.state.request_count, stripe_calls) # Served from the local cache
+
+    def test_stale_intent_is_refreshed(self):
+        intent = get_gateway().create_payment_intent(amount=100, currency='usd')
+        remember_intent(intent)
+        self.stripe_server.state.payment_intents[intent.id]['status'] = 'requires_capture'
+
+        self.assertEqual(get_payment_intent(intent.id).status, 'requires_payment_method')
+        PaymentIntentRecord.objects.filter(intent_id=intent.id).update(last_synced_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(get_payment_intent(intent.id).status, 'requires_capture')
+
+    def test_transient_errors_are_retried_with_same_idempotency_key(self):
+        self.stripe_server.state.fail_next_requests(1)
+        response = self.api.post(reverse('project-fund', kwargs={'project_pk': self.project.pk}))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.stripe_server.state.payment_intents), 1)
+
+    def test_release_captures_payment(self):
+        intent = get_gateway().create_payment_intent(amount=25000, currency='usd', capture_method='manual')
+        self.stripe_server.state.payment_intents[intent.id]['status'] = 'requires_capture'
+        Project.objects.filter(pk=self.project.pk).update(
+            payment_intent_id=intent.id, status=Project.Status.PENDING_APPROVAL,
+        )
+
+        response = self.api.post(reverse('project-release', kwargs={'project_pk': self.project.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, Project.Status.COMPLETED)
+        self.assertEqual(self.stripe_server.state.payment_intents[intent.id]['status'], 'succeeded')
+
+    def test_release_after_paying_without_webhooks(self):
+        self.assertEqual(self.api.post(reverse('project-fund', kwargs={'project_pk': self.project.pk})).status_code, 201)
+        self.project.refresh_from_db()
+        intent_id = self.project.payment_intent_id
+        # The client pays; no webhook is processed, so the fresh local record still says requires_payment_method
+        urllib.request.urlopen(urllib.request.Request(f'{self.stripe_server.api_base}/v1/payment_intents/{intent_id}/confirm', data=b'', method='POST'))
+        self.assertEqual(PaymentIntentRecord.objects.get(intent_id=intent_id).status, 'requires_payment_method')
+        Project.objects.filter(pk=self.project.pk).update(status=Project.Status.PENDING_APPROVAL)
+
+        response = self.api.post(reverse('project-release', kwargs={'project_pk': self.project.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stripe_server.state.payment_intents[intent_id]['status'], 'succeeded')
+
+    def test_onboarding_awaits_the_gateway(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.client_user)}'}
+        response = async_to_sync(AsyncClient().post)(reverse('stripe-onboard'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('onboarding_url', response.json())
+        self.client_user.refresh_from_db()
+        self.assertIn(self.client_user.stripe_account_id, self.stripe_server.state.accounts)
+
+        requests = self.stripe_server.state.request_count
+        response = async_to_sync(AsyncClient().post)(reverse('stripe-onboard'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stripe_server.state.request_count, requests + 1) # Only a new Account Link
+        self.assertEqual(async_to_sync(AsyncClient().get)(reverse('stripe-onboard'), headers=headers).status_code, 405)
+
+    def test_async_retrieve(self):
+        intent = get_gateway().create_payment_intent(amount=100, currency='usd')
+        fetched = async_to_sync(get_gateway().aretrieve_payment_intent)(intent.id)
+        self.assertEqual(fetched.client_secret, intent.client_secret)
+
+
+@override_settings(STRIPE_ENDPOINT_SECRET='whsec_test')
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.client_user = make_user('acme', User.Role.CLIENT)
+        self.freelancer = make_user('dev', User.Role.FREELANCER)
+        self.project = Project.objects.create(
+            title='Site', description='Build it', budget=250, client=self.client_user,
+            freelancer=self.freelancer, status=Project.Status.PENDING_APPROVAL, payment_intent_id='pi_1',
+        )
+        self.api = APIClient()
+
+    def send(self, event_id, intent_status, created=1700000000, secret='whsec_test', intent_id='pi_1'):
+        payload = json.dumps({
+            'id': event_id,
+            'type': f'payment_intent.{intent_status}',
+            'created': created,
+            'data': {'object': {
+                'id': intent_id, 'object': 'payment_intent', 'status': intent_status,
+                'capture_method': 'manual', 'metadata': {'project_id': str(self.project.pk)},
+            }},
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        return self.api.post(
+            reverse('stripe-webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+        )
+
+    def test_events_are_stored_once_and_applied_in_batches(self):
+        self.assertEqual(self.send('evt_1', 'requires_capture', created=1).status_code, 200)
+        self.assertEqual(self.send('evt_2', 'succeeded', created=2).status_code, 200)
+        self.assertEqual(self.send('evt_2', 'succeeded', created=2).status_code, 200) # Redelivery
+        self.assertEqual(StripeEvent.objects.count(), 2)
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, Project.Status.PENDING_APPROVAL) # Acked, not yet processed
+
+        # savepoint, events, projects, bulk_update, known intents, intent upsert, profile usernames (cache), mark processed, release
+        with self.assertNumQueries(9):
+            self.assertEqual(process_pending_events(batch_size=10), 2)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.payment_status, 'succeeded')
+        self.assertEqual(self.project.status, Project.Status.COMPLETED)
+        self.assertEqual(PaymentIntentRecord.objects.get(intent_id='pi_1').status, 'succeeded')
+
+    def test_bad_signature_is_rejected(self):
+        self.assertEqual(self.send('evt_1', 'succeeded', secret='whsec_wrong').status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_late_events_do_not_regress_terminal_status(self):
+        self.send('evt_2', 'succeeded', created=2)
+        process_pending_events()
+        self.send('evt_1', 'requires_capture', created=1)
+        process_pending_events()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.payment_status, 'succeeded')
+
+    def test_release_uses_local_status(self):
+        PaymentIntentRecord.objects.create(
+            intent_id='pi_1', project=self.project, status='succeeded', amount=25000, last_synced_at=timezone.now(),
+        )
+        self.api.force_authenticate(self.client_user)
+        # No Stripe server is configured, so a live retrieve would fail
+        response = self.api.post(reverse('project-release', kwargs={'project_pk': self.project.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, Project.Status.COMPLETED)
+
+
+class AsyncReadViewTests(TestCase):
+    """
+    The async GET paths must return exactly what the sync DRF views return.
+    """
+
+    def setUp(self):
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER, bio='Django dev')
+        self.carol = make_user('carol', User.Role.FREELANCER)
+        self.bob.skills.add(Skill.objects.create(name='Django'))
+        Follow.objects.create(follower=self.alice, following=self.bob)
+        Follow.objects.create(follower=self.carol, following=self.bob)
+        for i in range(13):
+            Project.objects.create(
+                title=f'Project {i}', description='Needs Django work' if i % 2 else 'Logo design', budget=100 + i,
+                client=self.alice, category='webdev' if i % 2 else 'design',
+            )
+        Project.objects.filter(title='Project 3').update(freelancer=self.bob, status=Project.Status.IN_PROGRESS)
+        self.room = ChatRoom.objects.create()
+        self.room.participants.add(self.alice, self.bob)
+        ChatRoom.objects.create().participants.add(self.alice, self.carol)
+        for i in range(3):
+            Message.objects.create(room=self.room, sender=self.bob if i % 2 else self.alice, content=f'msg {i}')
+        self.api = APIClient()
+        self.api.force_authenticate(self.alice)
+        self.token = str(AccessToken.for_user(self.alice))
+
+    def get_both(self, url, authenticated=True):
+        client = APIClient()
+        if authenticated:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        with override_settings(ASYNC_READ_VIEWS=False):
+            sync_response = client.get(url)
+        with override_settings(ASYNC_READ_VIEWS=True):
+            async_response = client.get(url)
+        self.assertEqual(async_response.status_code, sync_response.status_code, url)
+        self.assertEqual(async_response.json(), sync_response.json(), url)
+        return async_response
+
+    def test_project_list_and_detail_match(self):
+        self.get_both(reverse('project-list-create'), authenticated=False)
+        self.get_both(reverse('project-list-create') + '?page=2&category=webdev')
+        self.get_both(reverse('project-list-create') + '?search=django&ordering=budget')
+        self.get_both(reverse('project-list-create') + '?page=9')
+        project = Project.objects.get(title='Project 3')
+        self.get_both(reverse('project-detail', kwargs={'pk': project.pk}))
+        self.get_both(reverse('project-detail', kwargs={'pk': 999999}))
+
+    def test_profile_matches(self):
+        response = self.get_both(reverse('public-profile-detail', kwargs={'username': 'bob'}))
+        self.assertEqual(response.json()['followers_count'], 2)
+        self.assertTrue(response.json()['is_following'])
+        self.get_both(reverse('public-profile-detail', kwargs={'username': 'bob'}), authenticated=False)
+
+    def test_chat_endpoints_match(self):
+        response = self.get_both(reverse('chat-room-list'))
+        self.assertEqual(response.json()['count'], 2)
+        self.get_both(reverse('message-list', kwargs={'room_id': self.room.pk}))
+        self.get_both(reverse('chat-room-list'), authenticated=False)
+
+    def test_writes_still_use_sync_views(self):
+        response = self.api.post(reverse('project-list-create'), {'title': 'New', 'description': 'x', 'budget': '10.00'})
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_websocket_message_pins_sender_to_primary(self):
+        cache.clear()
+        async def chat():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{self.room.pk}/')
+            communicator.scope['user'] = self.alice
+            communicator.scope['url_route'] = {'kwargs': {'room_id': str(self.room.pk)}}
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.send_json_to({'message': 'hello'})
+            received = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return received
+
+        self.assertEqual(async_to_sync(chat)()['content'], 'hello')
+        self.assertGreater(ChatRoom.objects.get(pk=self.room.pk).updated_at, self.room.updated_at)
+        middleware = ReplicaPinningMiddleware(lambda request: None)
+        for user, pinned in ((self.alice, True), (self.bob, False)):
+            request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+            self.assertEqual(middleware.start(request)[1].pinned, pinned)
+
+    def test_profile_needs_constant_queries(self):
+        url = reverse('public-profile-detail', kwargs={'username': 'bob'})
+        # auth user, profile, skills, projects as client, projects as freelancer
+        with self.assertNumQueries(5):
+            APIClient(HTTP_AUTHORIZATION=f'Bearer {self.token}').get(url)
+
+
+class SQLiteProductionProfileTests(SimpleTestCase):
+    def test_pragmas_and_transaction_mode_apply_to_new_connections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = connections.configure_settings({'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': f'{tmp}/profile.sqlite3',
+                'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS,
+            }})['default']
+            connection = DatabaseWrapper(config, alias='profile_check')
+            try:
+                with connection.cursor() as cursor:
+                    pragmas = {}
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'temp_store'):
+                        cursor.execute(f'PRAGMA {name}')
+                        pragmas[name] = cursor.fetchone()[0]
+                self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+            finally:
+                connection.close()
+
+        self.assertEqual(pragmas['journal_mode'], 'wal')
+        self.assertEqual(pragmas['synchronous'], 1) # NORMAL
+        self.assertEqual(pragmas['busy_timeout'], settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(pragmas['cache_size'], settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(pragmas['temp_store'], 2) # MEMORY
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def call(self, method, user_id=None, write=False):
+        """
+        Runs one request through the middleware and returns where its read went.
+        """
+        seen = {}
+
+        def view(request):
+            seen['read'] = self.router.db_for_read(Project)
+            if write:
+                self.router.db_for_write(Project)
+            return HttpResponse()
+
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(User(pk=user_id))}'} if user_id else {}
+        ReplicaPinningMiddleware(view)(getattr(self.factory, method)('/api/projects/', **headers))
+        return seen['read']
+
+    def test_reads_go_to_replicas_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Project), 'replica1')
+        self.assertEqual(self.router.db_for_write(Project), 'default')
+        self.assertEqual(self.call('get'), 'replica1')
+        self.assertEqual(self.call('post'), 'default')
+
+    def test_client_reads_its_own_writes_from_the_primary(self):
+        self.assertEqual(self.call('get', user_id=1), 'replica1')
+        self.call('post', user_id=1, write=True)
+        self.assertEqual(self.call('get', user_id=1), 'default')
+        self.assertEqual(self.call('get', user_id=2), 'replica1') # Other clients are not pinned
+        self.assertEqual(self.call('get'), 'replica1')
+
+    def test_writes_outside_requests_can_pin(self):
+        pin_to_primary(user_client_key(1))
+        self.assertEqual(self.call('get', user_id=1), 'default')
+        self.assertEqual(self.call('get', user_id=2), 'replica1')
+
+    def test_replicate_copies_a_consistent_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, target = f'{tmp}/primary.sqlite3', f'{tmp}/replica.sqlite3'
+            with sqlite3.connect(source) as conn:
+                conn.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)')
+                conn.executemany('INSERT INTO item (name) VALUES (?)', [('a',), ('b',)])
+            replicate(source, target)
+            with sqlite3.connect(target) as conn:
+                self.assertEqual(conn.execute('SELECT name FROM item ORDER BY id').fetchall(), [('a',), ('b',)])
+
+
+@override_settings(METRICS_SQL_SAMPLE_RATE=1.0, METRICS_TOKEN='scrape-secret')
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.project = Project.objects.create(title='Site', description='Build it', budget=500, client=self.alice)
+        self.room = ChatRoom.objects.create()
+        self.room.participants.add(self.alice, self.bob)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_http_requests_are_recorded_per_route(self):
+        self.client.get(reverse('project-detail', kwargs={'pk': self.project.pk}))
+        self.client.get(reverse('project-detail', kwargs={'pk': 9999}))
+        text = self.scrape()
+
+        labels = 'route="api/projects/<int:pk>/",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', text)
+        self.assertIn(f'http_requests_total{{{labels},status="404"}} 1', text)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f'http_response_size_bytes_count{{{labels}}} 2', text)
+        self.assertIn(f'http_request_db_queries_count{{{labels}}} 2', text)
+        # Two SELECTs per detail request: the ETag validator, then the project joined with its client
+        self.assertIn(f'http_request_db_queries_sum{{{labels}}} 4', text)
+
+    def test_metrics_token_is_required(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_closed_without_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer None').status_code, 403)
+
+    def test_consumer_events_are_recorded(self):
+        async def chat():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{self.room.pk}/')
+            communicator.scope['user'] = self.alice
+            communicator.scope['url_route'] = {'kwargs': {'room_id': str(self.room.pk)}}
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.send_json_to({'message': 'hello'})
+            received = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return received
+
+        self.assertEqual(async_to_sync(chat)()['content'], 'hello')
+        text = self.scrape()
+
+        self.assertIn('websocket_events_total{consumer="ChatConsumer",event="websocket.connect"} 1', text)
+        self.assertIn('websocket_events_total{consumer="ChatConsumer",event="websocket.receive"} 1', text)
+        self.assertIn('websocket_events_total{consumer="ChatConsumer",event="chat_message"} 1', text)
+        self.assertIn('websocket_event_db_queries_count{consumer="ChatConsumer",event="websocket.receive"} 1', text)
+        self.assertRegex(text, r'websocket_sent_bytes_total\{consumer="ChatConsumer"\} [1-9]')
+
+
+class QueryDetectorTests(TestCase):
+    """
+    The test runner sets QUERY_DETECTOR = 'raise', so every request below fails on an N+1 or an exceeded budget.
+    """
+
+    def setUp(self):
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.devs = [make_user(f'dev{i}', User.Role.FREELANCER, bio='Django developer') for i in range(4)]
+        django_skill = Skill.objects.create(name='Django')
+        for dev in self.devs:
+            dev.skills.add(django_skill)
+            Follow.objects.create(follower=dev, following=self.alice)
+            Follow.objects.create(follower=self.alice, following=dev)
+        self.projects = [
+            Project.objects.create(
+                title=f'Project {i}', description='Django API', budget=100, client=self.alice, skills_required='Django',
+            )
+            for i in range(4)
+        ]
+        for dev in self.devs:
+            Bid.objects.create(project=self.projects[0], freelancer=dev, amount=90, proposal='Me')
+            room = ChatRoom.objects.create()
+            room.participants.add(self.alice, dev)
+            for k in range(4):
+                Message.objects.create(room=room, sender=dev if k % 2 else self.alice, content=f'msg {k}')
+        self.room = room
+
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+            fingerprint('SELECT *  FROM t WHERE id IN (%s) LIMIT 1'),
+        )
+
+    def test_lazy_loads_in_a_loop_are_reported_with_their_origin(self):
+        collector, token = start_collecting()
+        try:
+            usernames = [project.client.username for project in Project.objects.all()]
+        finally:
+            stop_collecting(token)
+        self.assertEqual(len(usernames), 4)
+        with self.assertRaisesMessage(NPlusOneError, 'api/tests.py'):
+            check(collector.patterns, collector.queries, 'loop')
+
+    def test_budget_overrun_is_reported(self):
+        collector, token = start_collecting()
+        try:
+            list(Project.objects.all())
+            list(Bid.objects.all())
+        finally:
+            stop_collecting(token)
+        check(collector.patterns, collector.queries, 'two queries', budget=2)
+        with self.assertRaisesMessage(NPlusOneError, '2 queries, budget is 1'):
+            check(collector.patterns, collector.queries, 'two queries', budget=1)
+
+    def test_list_endpoints_have_no_n_plus_one(self):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.alice)}')
+        urls = [
+            reverse('project-list-create'),
+            reverse('project-detail', kwargs={'pk': self.projects[0].pk}),
+            reverse('project-bid-list', kwargs={'project_pk': self.projects[0].pk}),
+            reverse('project-match', kwargs={'project_pk': self.projects[0].pk}),
+            reverse('public-profile-list'),
+            reverse('public-profile-detail', kwargs={'username': 'alice'}),
+            reverse('follower-list', kwargs={'username': 'alice'}),
+            reverse('following-list', kwargs={'username': 'alice'}),
+            reverse('dashboard-my-projects'),
+            reverse('chat-room-list'),
+            reverse('message-list', kwargs={'room_id': self.room.pk}),
+        ]
+        for use_async in (False, True):
+            with override_settings(ASYNC_READ_VIEWS=use_async):
+                for url in urls:
+                    self.assertEqual(api.get(url).status_code, 200, url)
+
+        freelancer_api = APIClient()
+        freelancer_api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.devs[0])}')
+        self.assertEqual(freelancer_api.get(reverse('dashboard-my-bids')).status_code, 200)
+
+
+class DatasetGeneratorTests(TestCase):
+    SIZES = {'clients': 4, 'freelancers': 12, 'projects': 20, 'bids_per_project': 3, 'follows_per_user': 2, 'rooms': 5, 'messages': 60}
+
+    def test_generated_data_is_consistent(self):
+        generate_dataset(**self.SIZES, seed=7)
+
+        self.assertEqual(User.objects.filter(role=User.Role.FREELANCER).count(), 12)
+        self.assertEqual(Project.objects.count(), 20)
+        self.assertEqual(Message.objects.count(), 60)
+        self.assertTrue(User.objects.first().check_password('loadtest-pass'))
+
+        for project in Project.objects.exclude(status=Project.Status.OPEN):
+            accepted = project.bids.get(status=Bid.Status.ACCEPTED)
+            self.assertEqual(accepted.freelancer_id, project.freelancer_id)
+        for room in ChatRoom.objects.all():
+            timestamps = list(room.messages.values_list('timestamp', flat=True))
+            self.assertGreater(min(timestamps), room.created_at)
+            self.assertEqual(max(timestamps), room.updated_at)
+            senders = set(room.messages.values_list('sender', flat=True))
+            self.assertLessEqual(senders, set(room.participants.values_list('pk', flat=True)))
+
+    def test_same_seed_gives_same_data(self):
+        def snapshot():
+            return (
+                list(User.objects.order_by('pk').values_list('username', 'bio')),
+                list(Project.objects.order_by('pk').values_list('title', 'skills_required', 'budget')),
+            )
+
+        generate_dataset(**self.SIZES, seed=7)
+        first = snapshot()
+        for model in (Message, ChatRoom, Follow, Bid, Project, User):
+            model.objects.all().delete()
+        generate_dataset(**self.SIZES, seed=7)
+        self.assertEqual(snapshot(), first)
+
+
+class BenchmarkBaselineTests(SimpleTestCase):
+    def test_regressions_beyond_the_threshold_are_reported(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'baseline.json'
+            save_baseline(path, [{'name': 'project list', 'p50_ms': 8.0, 'queries': 3, 'alloc_kib': 150.0}], ['p50_ms', 'queries', 'alloc_kib'])
+            baseline = load_baseline(path)
+        thresholds = {'p50_ms': 2.0, 'queries': 1.0, 'alloc_kib': 2.0}
+
+        self.assertEqual(compare_to_baseline([{'name': 'project list', 'p50_ms': 12.0, 'queries': 3, 'alloc_kib': 160.0}], baseline, thresholds), [])
+        self.assertEqual(compare_to_baseline([{'name': 'new route', 'p50_ms': 99.0, 'queries': 50, 'alloc_kib': 1.0}], baseline, thresholds), [])
+        regressions = compare_to_baseline([{'name': 'project list', 'p50_ms': 8.0, 'queries': 6, 'alloc_kib': 150.0}], baseline, thresholds)
+        self.assertEqual(regressions, ['project list: queries 3 -> 6 (allowed x1)'])
+
+    def test_missing_baseline(self):
+        self.assertIsNone(load_baseline(Path(tempfile.gettempdir()) / 'no-such-baseline.json'))
+
+    def test_saving_only_adds_new_entries(self):
+        metrics = ['p50_ms', 'queries']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'baseline.json'
+            save_baseline(path, [{'name': 'project list', 'p50_ms': 8.0, 'queries': 3}], metrics)
+            rows = [{'name': 'project list', 'p50_ms': 9.0, 'queries': 4}, {'name': 'skills', 'p50_ms': 2.0, 'queries': 1}]
+            self.assertEqual(save_baseline(path, rows, metrics), ['skills'])
+            self.assertEqual(load_baseline(path)['project list'], {'p50_ms': 8.0, 'queries': 3})
+            self.assertEqual(save_baseline(path, rows[:1], metrics, rerecord=True), ['project list'])
+            self.assertEqual(load_baseline(path), {'project list': {'p50_ms': 9.0, 'queries': 4}, 'skills': {'p50_ms': 2.0, 'queries': 1}})
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.skill = Skill.objects.create(name='Django')
+
+    def auth(self, user):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return api
+
+    def test_skill_list_is_cached_until_a_skill_changes(self):
+        api = APIClient()
+        url = reverse('skill-list-create')
+        self.assertEqual(api.get(url).data['count'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(json.loads(api.get(url).content)['count'], 1)
+
+        self.auth(self.alice).post(url, {'name': 'React'}, format='json')
+        self.assertEqual(json.loads(api.get(url).content)['count'], 2)
+        self.skill.delete()
+        self.assertEqual(json.loads(api.get(url).content)['count'], 1)
+
+    def test_profile_varies_by_user_and_follows_invalidate(self):
+        url = reverse('public-profile-detail', kwargs={'username': 'bob'})
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                cache.clear()
+                anonymous, alice = APIClient(), self.auth(self.alice)
+                self.assertFalse(json.loads(anonymous.get(url).content)['is_following'])
+                self.assertFalse(json.loads(alice.get(url).content)['is_following'])
+                with self.assertNumQueries(1): # Authentication only
+                    alice.get(url)
+
+                alice.post(reverse('follow-toggle', kwargs={'username': 'bob'}))
+                body = json.loads(alice.get(url).content)
+                self.assertTrue(body['is_following'])
+                self.assertEqual(body['followers_count'], 1)
+                self.assertFalse(json.loads(anonymous.get(url).content)['is_following'])
+                self.assertEqual(json.loads(anonymous.get(url).content)['followers_count'], 1)
+                Follow.objects.all().delete()
+
+    def test_profile_edits_and_new_projects_invalidate(self):
+        url = reverse('public-profile-detail', kwargs={'username': 'alice'})
+        api = APIClient()
+        api.get(url)
+        self.auth(self.alice).patch(reverse('user_profile_detail_update'), {'bio': 'New bio'}, format='json')
+        self.assertEqual(json.loads(api.get(url).content)['bio'], 'New bio')
+        Project.objects.create(title='Site', description='Build it', budget=100, client=self.alice)
+        self.assertEqual(len(json.loads(api.get(url).content)['projects_as_client']), 1)
+
+        bob_url = reverse('public-profile-detail', kwargs={'username': 'bob'})
+        self.assertEqual(json.loads(api.get(bob_url).content)['skills'], [])
+        self.bob.skills.add(self.skill)
+        self.assertEqual([s['name'] for s in json.loads(api.get(bob_url).content)['skills']], ['Django'])
+
+    def test_renaming_invalidates_the_old_profile(self):
+        api = APIClient()
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                old, new = self.bob.username, f'bob-{use_async}'
+                self.assertEqual(api.get(reverse('public-profile-detail', kwargs={'username': old})).status_code, 200)
+                self.bob.username = new
+                self.bob.save()
+                self.assertEqual(api.get(reverse('public-profile-detail', kwargs={'username': old})).status_code, 404)
+                self.assertEqual(api.get(reverse('public-profile-detail', kwargs={'username': new})).status_code, 200)
+
+    def test_vary_on_role(self):
+        policy = CachePolicy(timeout=60, vary_on=('role',))
+        request = RequestFactory().get('/')
+        request.user = self.alice
+        client_key = policy.vary_key(request)
+        request.user = make_user('carol', User.Role.CLIENT)
+        self.assertEqual(policy.vary_key(request), client_key)
+        request.user = self.bob
+        self.assertNotEqual(policy.vary_key(request), client_key)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.project = Project.objects.create(title='Site', description='Build it', budget=500, client=self.alice)
+        self.bid = Bid.objects.create(project=self.project, freelancer=self.bob, amount=400, proposal='Hire me')
+
+    def auth(self, user):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return api
+
+    def test_project_detail_answers_304_until_the_project_changes(self):
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                api = APIClient()
+                response = api.get(url)
+                etag = response['ETag']
+                with self.assertNumQueries(1): # The validator row only
+                    self.assertEqual(api.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                self.assertNotIn('Last-Modified', response) # Second precision: If-Modified-Since could hide a change
+
+                Project.objects.filter(pk=self.project.pk).update(updated_at=timezone.now() + timedelta(seconds=5))
+                response = api.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_renaming_the_client_changes_the_project_etag(self):
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        etag = APIClient().get(url)['ETag']
+        User.objects.filter(pk=self.alice.pk).update(username='alice2')
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()['client_username']), (200, 'alice2'))
+
+    def test_renaming_a_bidder_or_sender_changes_the_list_etag(self):
+        carol = make_user('carol', User.Role.FREELANCER)
+        Bid.objects.create(project=self.project, freelancer=carol, amount=450, proposal='Me too')
+        room = ChatRoom.objects.create()
+        room.participants.add(self.alice, self.bob, carol)
+        for sender in (self.alice, self.bob, carol):
+            Message.objects.create(room=room, sender=sender, content='Hi')
+        bids_url = reverse('project-bid-list', kwargs={'project_pk': self.project.pk})
+        messages_url = reverse('message-list', kwargs={'room_id': room.pk})
+        alice = self.auth(self.alice)
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                bids_etag = alice.get(bids_url)['ETag']
+                messages_etag = alice.get(messages_url)['ETag']
+                User.objects.filter(pk=self.bob.pk).update(username=f'bob-{use_async}') # Neither the first nor the last name
+
+                response = alice.get(bids_url, HTTP_IF_NONE_MATCH=bids_etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(f'bob-{use_async}', {bid['freelancer_username'] for bid in response.json()['results']})
+                response = alice.get(messages_url, HTTP_IF_NONE_MATCH=messages_etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(f'bob-{use_async}', {message['sender_username'] for message in response.json()})
+
+    def test_bid_moderation_changes_the_bid_list_etag(self):
+        url = reverse('project-bid-list', kwargs={'project_pk': self.project.pk})
+        alice = self.auth(self.alice)
+        etag = alice.get(url)['ETag']
+        self.assertEqual(alice.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        alice.post(reverse('project-bid-bulk-update', kwargs={'project_pk': self.project.pk}), {'reject': [self.bid.pk]}, format='json')
+        response = alice.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['status'], Bid.Status.REJECTED)
+
+    def test_no_validators_for_other_users(self):
+        url = reverse('project-bid-list', kwargs={'project_pk': self.project.pk})
+        etag = self.auth(self.alice).get(url)['ETag']
+        response = self.auth(self.bob).get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+        room = ChatRoom.objects.create()
+        room.participants.add(self.alice)
+        messages_url = reverse('message-list', kwargs={'room_id': room.pk})
+        etag = self.auth(self.alice).get(messages_url)['ETag']
+        self.assertEqual(self.auth(self.bob).get(messages_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_profile_etag_follows_cache_invalidation(self):
+        url = reverse('public-profile-detail', kwargs={'username': 'bob'})
+        alice = self.auth(self.alice)
+        etag = alice.get(url)['ETag']
+        self.assertEqual(alice.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(APIClient().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200) # Varies by user
+
+        alice.post(reverse('follow-toggle', kwargs={'username': 'bob'}))
+        self.assertEqual(alice.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class RenderingAndCompressionTests(TestCase):
+    def test_orjson_renderer_matches_drf_output(self):
+        data = {
+            'when': timezone.make_aware(datetime(2024, 5, 1, 12, 30, 15, 250000), dt_timezone.utc),
+            'day': date(2024, 5, 1), 'amount': Decimal('12.50'), 'id': uuid.UUID(int=7),
+            'label': gettext_lazy('Open'), 'users': User.objects.none(), 7: 'int key', 'text': 'line\u2028break é',
+        }
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertNotIn(b'\xe2\x80\xa8', ORJSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        self.assertIn(b'\n  "day"', ORJSONRenderer().render(data, 'application/json; indent=4'))
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, identity'))
+        self.assertIsNone(choose_encoding(''))
+        self.assertEqual(choose_encoding('*'), 'br' if brotli is not None else 'gzip')
+
+    @override_settings(COMPRESSION_MIN_SIZE=1024)
+    def test_large_responses_are_compressed_small_ones_not(self):
+        client = make_user('acme', User.Role.CLIENT)
+        for i in range(30):
+            Project.objects.create(title=f'Project {i}', description='Build a large website ' * 20, budget=500, client=client)
+        url = reverse('project-list-create')
+        plain = APIClient().get(url)
+        response = APIClient().get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+
+        small = APIClient().get(reverse('project-detail', kwargs={'pk': 999999}), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.bob.skills.add(Skill.objects.create(name='Django'))
+        self.project = Project.objects.create(title='Site', description='Build it', budget=500, client=self.alice)
+        Bid.objects.create(project=self.project, freelancer=self.bob, amount=400, proposal='Hire me')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.alice)}')
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content), [q['sql'] for q in queries]
+
+    def test_fields_trim_output_and_columns(self):
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                body, queries = self.get(reverse('project-list-create'), fields='id,title')
+                self.assertEqual(body['results'], [{'id': self.project.pk, 'title': 'Site'}])
+                self.assertNotIn('description', queries[-1])
+                self.assertNotIn('JOIN', queries[-1])
+
+                body, queries = self.get(reverse('project-detail', kwargs={'pk': self.project.pk}), fields='id,client_username')
+                self.assertEqual(body, {'id': self.project.pk, 'client_username': 'alice'})
+                self.assertNotIn('description', queries[-1])
+
+    def test_expand_embeds_relations(self):
+        body, queries = self.get(reverse('project-bid-list', kwargs={'project_pk': self.project.pk}), fields='id,project,freelancer', expand='project,freelancer')
+        bid = body['results'][0]
+        self.assertEqual(bid['freelancer'], {'id': self.bob.pk, 'username': 'bob', 'name': 'Bob'})
+        self.assertEqual(bid['project']['title'], 'Site')
+        self.assertIn('JOIN', queries[-1])
+
+        body, _ = self.get(reverse('project-detail', kwargs={'pk': self.project.pk}), expand='freelancer')
+        self.assertIsNone(body['freelancer'])
+        self.assertIn('description', body)
+
+    def test_unrequested_relations_are_not_loaded(self):
+        url = reverse('public-profile-detail', kwargs={'username': 'bob'})
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                cache.clear()
+                body, queries = self.get(url, fields='username,skills')
+                self.assertEqual(body, {'username': 'bob', 'skills': [{'id': self.bob.skills.get().pk, 'name': 'Django'}]})
+                self.assertEqual(len(queries), 3) # auth, profile, skills
+                self.assertNotIn('api_follow', queries[1])
+
+        body, queries = self.get(reverse('chat-room-list'), fields='id')
+        self.assertEqual(len(queries), 3) # auth, count, page: no participants, no last messages
+
+    def test_writes_ignore_fields(self):
+        response = self.api.post(reverse('project-list-create') + '?fields=id', {
+            'title': 'New', 'description': 'Another one', 'budget': '100.00', 'category': 'webdev',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('description', response.data)
+
+
+@override_settings(PROFILE_EMBEDDED_PROJECTS=3)
+class ProfileProjectTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.projects = [
+            Project.objects.create(title=f'Project {i}', description='Build it', budget=100, client=self.alice,
+                                   freelancer=self.bob if i % 2 else None)
+            for i in range(8)
+        ]
+        self.api = APIClient()
+        self.api.force_authenticate(self.alice)
+
+    def test_profiles_embed_the_latest_projects_and_counts(self):
+        url = reverse('public-profile-detail', kwargs={'username': 'alice'})
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                cache.clear()
+                body = json.loads(APIClient().get(url).content)
+                self.assertEqual([p['title'] for p in body['projects_as_client']], ['Project 7', 'Project 6', 'Project 5'])
+                self.assertEqual(body['projects_as_client_count'], 8)
+                self.assertEqual(body['projects_as_freelancer_count'], 0)
+
+        response = self.api.get(reverse('public-profile-list'))
+        bob = next(profile for profile in response.data['results'] if profile['username'] == 'bob')
+        self.assertEqual([p['title'] for p in bob['projects_as_freelancer']], ['Project 7', 'Project 5', 'Project 3'])
+        self.assertEqual(bob['projects_as_freelancer_count'], 4)
+
+    def test_profile_queries_do_not_grow_with_history(self):
+        url = reverse('public-profile-list')
+        with CaptureQueriesContext(connection) as few:
+            self.api.get(url)
+        for i in range(20):
+            Project.objects.create(title=f'Old {i}', description='Build it', budget=100, client=self.alice, freelancer=self.bob)
+        with CaptureQueriesContext(connection) as many:
+            response = self.api.get(url)
+        self.assertEqual(len(many), len(few))
+        self.assertTrue(all(len(profile['projects_as_client']) <= 3 for profile in response.data['results']))
+
+    def test_project_list_endpoint_paginates_all_projects(self):
+        url = reverse('profile-project-list', kwargs={'username': 'bob'})
+        response = self.api.get(url)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][0]['title'], 'Project 7')
+        self.assertEqual(self.api.get(url, {'role': 'client'}).data['count'], 0)
+        self.assertEqual(self.api.get(reverse('profile-project-list', kwargs={'username': 'alice'}), {'role': 'client'}).data['count'], 8)
+        self.assertEqual(self.api.get(url, {'role': 'owner'}).status_code, 400)
+        self.assertEqual(self.api.get(reverse('profile-project-list', kwargs={'username': 'nobody'})).status_code, 404)
+
+
+class ValuesFastPathTests(TestCase):
+    """
+    The values() lists (api/fastpath.py) must render exactly the bytes the serializers render.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.carol = make_user('carol', User.Role.FREELANCER)
+        for name in ('Django', 'React', 'Go'):
+            Skill.objects.create(name=name)
+        self.project = Project.objects.create(title='Site', description='Build it', budget=500, client=self.alice)
+        Bid.objects.create(project=self.project, freelancer=self.bob, amount=Decimal('400.50'), proposal='Hire me')
+        Bid.objects.create(project=self.project, freelancer=self.carol, amount=450, proposal='Me too', status=Bid.Status.REJECTED)
+        self.room = ChatRoom.objects.create()
+        self.room.participants.add(self.alice, self.bob)
+        for i in range(3):
+            Message.objects.create(room=self.room, sender=self.bob if i % 2 else self.alice, content=f'msg {i}  ')
+
+    def get_both(self, user, url, **params):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        bodies = []
+        for fast in (False, True):
+            with override_settings(VALUES_LIST_VIEWS=fast):
+                cache.clear()
+                response = client.get(url, params)
+            self.assertEqual(response.status_code, 200, url)
+            bodies.append(response.content)
+        self.assertEqual(bodies[1], bodies[0], url)
+        return json.loads(bodies[1])
+
+    def test_lists_match_serializers(self):
+        self.assertEqual(len(self.get_both(self.alice, reverse('skill-list-create'))['results']), 3)
+        bids = self.get_both(self.alice, reverse('project-bid-list', kwargs={'project_pk': self.project.pk}))['results']
+        self.assertEqual({bid['amount'] for bid in bids}, {'400.50', '450.00'})
+        self.assertEqual(self.get_both(self.bob, reverse('dashboard-my-bids'))['results'][0]['freelancer_username'], 'bob')
+        url = reverse('message-list', kwargs={'room_id': self.room.pk})
+        for use_async in (False, True):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                body = self.get_both(self.alice, url)
+                messages = body['results'] if isinstance(body, dict) else body
+                self.assertEqual([m['sender_username'] for m in messages], ['alice', 'bob', 'alice'])
+
+    def test_sparse_and_expanded_requests(self):
+        url = reverse('project-bid-list', kwargs={'project_pk': self.project.pk})
+        bids = self.get_both(self.alice, url, fields='id,amount')['results']
+        self.assertEqual(set(bids[0]), {'id', 'amount'})
+        bids = self.get_both(self.alice, url, fields='id,freelancer', expand='freelancer')['results']
+        self.assertIn(bids[0]['freelancer']['username'], ('bob', 'carol'))
+
+    def test_reads_rows_not_instances(self):
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        url = reverse('project-bid-list', kwargs={'project_pk': self.project.pk})
+        for fast in (False, True):
+            with self.subTest(fast=fast), override_settings(VALUES_LIST_VIEWS=fast), CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            self.assertIn('"api_user"."username"', queries[-1]['sql'])
+            # select_related('freelancer') loads the whole user; the row only needs the username
+            self.assertEqual('"api_user"."password"' in queries[-1]['sql'], not fast)
+
+
+@override_settings(DASHBOARD_RECENT_ITEMS=3)
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.carol = make_user('carol', User.Role.FREELANCER)
+        self.open = Project.objects.create(title='Open', description='Build it', budget=100, client=self.alice)
+        self.unfunded = Project.objects.create(title='Started', description='Build it', budget=200, client=self.alice,
+                                               freelancer=self.bob, status=Project.Status.IN_PROGRESS)
+        self.submitted = Project.objects.create(title='Submitted', description='Build it', budget=300, client=self.alice, freelancer=self.bob,
+                                                status=Project.Status.PENDING_APPROVAL, payment_intent_id='pi_1', payment_status='requires_capture')
+        self.done = Project.objects.create(title='Done', description='Build it', budget=400, client=self.alice, freelancer=self.carol,
+                                           status=Project.Status.COMPLETED, payment_intent_id='pi_2', payment_status='succeeded')
+        Bid.objects.create(project=self.open, freelancer=self.bob, amount=90, proposal='Hire me')
+        Bid.objects.create(project=self.open, freelancer=self.carol, amount=95, proposal='Me too')
+        Bid.objects.create(project=self.unfunded, freelancer=self.bob, amount=200, proposal='Hire me', status=Bid.Status.ACCEPTED)
+        Bid.objects.create(project=self.unfunded, freelancer=self.carol, amount=180, proposal='Me too', status=Bid.Status.REJECTED)
+
+    def get(self, user):
+        api = APIClient()
+        api.force_authenticate(user)
+        response = api.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_client_dashboard(self):
+        body = self.get(self.alice)
+        self.assertEqual(body['projects']['counts'], {'total': 4, 'OPEN': 1, 'IN_PROGRESS': 1, 'PENDING_APPROVAL': 1, 'COMPLETED': 1})
+        self.assertEqual(body['projects']['funding'], {
+            'awaiting_funding': 1, 'in_escrow': 1, 'escrow_amount': '300.00', 'released': 1, 'released_amount': '400.00',
+        })
+        self.assertEqual(len(body['projects']['recent']), 3)
+        self.assertEqual([p['title'] for p in body['projects']['recent']], ['Done', 'Submitted', 'Started'])
+        started = body['projects']['recent'][2]
+        self.assertEqual((started['bid_count'], started['pending_bid_count'], started['funding_state']), (2, 0, 'unfunded'))
+        self.assertEqual(body['bids']['counts'], {'total': 4, 'pending': 2, 'accepted': 1, 'rejected': 1})
+        self.assertEqual([p['title'] for p in body['pending_approvals']], ['Submitted'])
+        self.assertEqual(body['pending_approvals'][0]['funding_state'], 'in_escrow')
+
+    def test_opened_checkout_is_not_funding(self):
+        # ProjectFundView stores the intent as soon as checkout opens; the client has not paid yet
+        Project.objects.filter(pk=self.unfunded.pk).update(payment_intent_id='pi_3', payment_status='requires_payment_method')
+        body = self.get(self.alice)
+        self.assertEqual(body['projects']['funding'], {
+            'awaiting_funding': 1, 'in_escrow': 1, 'escrow_amount': '300.00', 'released': 1, 'released_amount': '400.00',
+        })
+        started = next(p for p in body['projects']['recent'] if p['title'] == 'Started')
+        self.assertEqual(started['funding_state'], 'unfunded')
+
+    def test_freelancer_dashboard(self):
+        body = self.get(self.bob)
+        self.assertEqual(body['projects']['counts']['total'], 2)
+        self.assertEqual(body['bids']['counts'], {'total': 2, 'pending': 1, 'accepted': 1, 'rejected': 0})
+        self.assertEqual({bid['project_title'] for bid in body['bids']['recent']}, {'Open', 'Started'})
+        self.assertEqual([p['funding_state'] for p in body['pending_approvals']], ['in_escrow'])
+
+    def test_queries_do_not_grow_with_data(self):
+        api = APIClient()
+        api.force_authenticate(self.alice)
+        with CaptureQueriesContext(connection) as few:
+            api.get(reverse('dashboard'))
+        for i in range(10):
+            project = Project.objects.create(title=f'More {i}', description='Build it', budget=100, client=self.alice)
+            Bid.objects.create(project=project, freelancer=self.bob, amount=90, proposal='Hire me')
+        with CaptureQueriesContext(connection) as many:
+            body = api.get(reverse('dashboard')).json()
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(body['projects']['counts']['total'], 14)
+
+
+class BatchRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.project = Project.objects.create(title='Site', description='Build it', budget=500, client=self.alice)
+        self.api = APIClient()
+
+    def batch(self, user, requests, **extra):
+        if user is not None:
+            self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        response = self.api.post(reverse('batch'), {'requests': requests, **extra}, format='json')
+        return response.status_code, response.json()
+
+    def test_sub_responses_match_single_requests(self):
+        paths = [
+            reverse('project-detail', kwargs={'pk': self.project.pk}),
+            reverse('project-bid-list', kwargs={'project_pk': self.project.pk}),
+            reverse('public-profile-detail', kwargs={'username': 'alice'}),
+            reverse('dashboard'),
+        ]
+        for use_async, concurrent in ((False, False), (True, True)):
+            with self.subTest(async_view=use_async), override_settings(ASYNC_READ_VIEWS=use_async):
+                cache.clear()
+                status, body = self.batch(self.alice, [{'path': path} for path in paths], concurrent=concurrent)
+                self.assertEqual(status, 200)
+                for path, entry in zip(paths, body['responses']):
+                    cache.clear()
+                    single = self.api.get(path)
+                    self.assertEqual((entry['status'], entry['body']), (single.status_code, single.json()), path)
+                self.assertEqual([entry['id'] for entry in body['responses']], [0, 1, 2, 3])
+
+    def test_permissions_apply_per_sub_request(self):
+        bids_url = reverse('project-bid-list', kwargs={'project_pk': self.project.pk})
+        status, body = self.batch(self.bob, [
+            {'id': 'bid', 'method': 'POST', 'path': reverse('bid-create', kwargs={'project_pk': self.project.pk}),
+             'body': {'amount': '90.00', 'proposal': 'Hire me'}},
+            {'id': 'bids', 'path': bids_url}, # Bob does not own the project
+            {'id': 'dashboard', 'path': reverse('dashboard')},
+        ])
+        self.assertEqual(status, 200)
+        bid, bids, dashboard = body['responses']
+        self.assertEqual(bid['status'], 201)
+        self.assertEqual(bids['body']['count'], 0)
+        self.assertEqual(dashboard['body']['bids']['counts']['pending'], 1) # Sees the bid placed before it
+
+        self.api.credentials()
+        _, body = self.batch(None, [{'path': reverse('dashboard')}, {'path': reverse('project-list-create')}])
+        self.assertEqual([entry['status'] for entry in body['responses']], [401, 200])
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.batch(self.alice, [])[0], 400)
+        self.assertEqual(self.batch(self.alice, [{'path': 'projects/'}])[0], 400)
+        with override_settings(BATCH_MAX_REQUESTS=2):
+            self.assertEqual(self.batch(self.alice, [{'path': '/api/skills/'}] * 3)[0], 400)
+        _, body = self.batch(self.alice, [{'path': reverse('batch')}, {'path': '/admin/'}, {'path': '/api/nothing/'}])
+        self.assertEqual([entry['status'] for entry in body['responses']], [400, 400, 404])
+
+    def test_authenticates_once(self):
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.alice)}')
+        with CaptureQueriesContext(connection) as queries:
+            self.api.post(reverse('batch'), {'requests': [
+                {'path': reverse('dashboard')}, {'path': reverse('project-detail', kwargs={'pk': self.project.pk})}, {'path': reverse('skill-list-create')},
+            ]}, format='json')
+        user_lookups = [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "api_user" WHERE "api_user"."id"' in q['sql']]
+        self.assertEqual(len(user_lookups), 1)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.bob = make_user('bob', User.Role.FREELANCER)
+        self.project = Project.objects.create(title='=HYPERLINK("x")', description='Build it', budget=500, client=self.alice)
+        Project.objects.create(title='Logo', description='Draw it', budget=100, client=self.alice)
+        for i in range(5):
+            Bid.objects.create(project=self.project, freelancer=make_user(f'dev{i}', User.Role.FREELANCER), amount=100 + i, proposal='Hire me')
+        self.room = ChatRoom.objects.create()
+        self.room.participants.add(self.alice, self.bob)
+        for i in range(3):
+            Message.objects.create(room=self.room, sender=self.bob, content=f'msg {i}')
+        self.api = APIClient()
+        self.api.force_authenticate(self.alice)
+
+    def export(self, name, fmt, **kwargs):
+        response = self.api.get(reverse(name, kwargs={**kwargs, 'fmt': fmt}))
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_lines_match_the_list_endpoint(self):
+        response, body = self.export('export-project-bids', 'ndjson', project_pk=self.project.pk)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('attachment; filename="bids-', response['Content-Disposition'])
+        listed = self.api.get(reverse('project-bid-list', kwargs={'project_pk': self.project.pk}), {'page_size': 100}).json()['results']
+        self.assertEqual([json.loads(line) for line in body.splitlines()], listed)
+
+        _, body = self.export('export-messages', 'ndjson', room_id=self.room.pk)
+        self.assertEqual([json.loads(line)['content'] for line in body.splitlines()], ['msg 0', 'msg 1', 'msg 2'])
+
+    def test_expand_is_refused(self):
+        response = self.api.get(reverse('export-project-bids', kwargs={'project_pk': self.project.pk, 'fmt': 'ndjson'}), {'expand': 'freelancer'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.json())
+
+    def test_views_need_flat_serializers(self):
+        with self.assertRaises(ImproperlyConfigured):
+            type('ProfileExportView', (ExportMixin,), {'serializer_class': PublicUserProfileSerializer})
+
+    def test_csv(self):
+        _, body = self.export('export-my-projects', 'csv')
+        lines = body.splitlines()
+        self.assertTrue(lines[0].startswith('id,title,status,category,budget,client,client_username'))
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"\'=HYPERLINK(""x"")"', body) # Not a formula once opened in a spreadsheet
+        self.assertIn(',500.00,', body)
+
+    def test_permissions_and_formats(self):
+        self.api.force_authenticate(self.bob)
+        _, body = self.export('export-project-bids', 'ndjson', project_pk=self.project.pk)
+        self.assertEqual(body, '') # Not his project
+        self.assertEqual(self.api.get(reverse('export-my-projects', kwargs={'fmt': 'xlsx'})).status_code, 404)
+        self.api.force_authenticate(None)
+        self.assertEqual(self.api.get(reverse('export-my-projects', kwargs={'fmt': 'csv'})).status_code, 401)
+
+    def test_asgi_streams_from_an_async_generator(self):
+        token = AccessToken.for_user(self.alice)
+
+        async def export():
+            response = await AsyncClient().get(
+                reverse('export-messages', kwargs={'room_id': self.room.pk, 'fmt': 'csv'}), headers={'Authorization': f'Bearer {token}'},
+            )
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(async_to_sync(export)().splitlines()[1:], [
+            f'{message.pk},{self.room.pk},{self.bob.pk},bob,{message.content},{message.timestamp.isoformat().replace("+00:00", "Z")},False'
+            for message in Message.objects.order_by('timestamp')
+        ])
+
+
+@override_settings(IMPORT_BATCH_SIZE=2)
+class ProjectImportTests(TestCase):
+    CSV = (
+        'title,description,budget,category,skills_required,status\n'
+        'Site,Build it,500,webdev,"Django,React",COMPLETED\n'
+        'Logo,Draw it,120.50,design,,\n'
+        'Copy,Write it,80,writing,,\n'
+    )
+
+    def setUp(self):
+        self.alice = make_user('alice', User.Role.CLIENT)
+        self.api = APIClient()
+        self.api.force_authenticate(self.alice)
+
+    def post(self, body, content_type, **params):
+        url = reverse('project-import') + ('?' + '&'.join(f'{k}={v}' for k, v in params.items()) if params else '')
+        return self.api.post(url, body, content_type=content_type)
+
+    def test_csv_import(self):
+        response = self.post(self.CSV, 'text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'created': 3, 'errors': []})
+        site = Project.objects.get(title='Site')
+        self.assertEqual((site.client, site.status, site.skills_required), (self.alice, Project.Status.OPEN, 'Django,React')) # status is read-only
+        self.assertEqual(Project.objects.get(title='Logo').budget, Decimal('120.50'))
+
+    def test_invalid_rows_are_reported_and_nothing_is_created(self):
+        body = self.CSV + 'Bad,,-,space,,\n'
+        response = self.post(body, 'text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual([error['row'] for error in response.data['errors']], [4])
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'description', 'budget', 'category'})
+        self.assertFalse(Project.objects.exists())
+
+        response = self.post(body, 'text/csv', partial='true')
+        self.assertEqual((response.status_code, response.data['created']), (201, 3))
+        self.assertEqual(Project.objects.count(), 3)
+
+    def test_json_formats(self):
+        rows = [{'title': f'P{i}', 'description': 'Build it', 'budget': '10.00'} for i in range(3)]
+        self.assertEqual(self.post(json.dumps(rows), 'application/json').data['created'], 3)
+        ndjson = '\n'.join(json.dumps(row) for row in rows) + '\n\n[1]\n'
+        response = self.post(ndjson, 'application/x-ndjson')
+        self.assertEqual(response.data['errors'], [{'row': 4, 'errors': {'non_field_errors': ['Expected an object.']}}])
+        self.assertEqual(self.post('{"title": "x"', 'application/x-ndjson').status_code, 400)
+        self.assertEqual(self.post('<xml/>', 'application/xml').status_code, 415)
+        with override_settings(IMPORT_MAX_ROWS=2):
+            self.assertEqual(self.post(json.dumps(rows), 'application/json').status_code, 400)
+        self.assertEqual(Project.objects.count(), 3)
+
+    def test_only_clients_can_import(self):
+        self.api.force_authenticate(make_user('bob', User.Role.FREELANCER))
+        self.assertEqual(self.post(self.CSV, 'text/csv').status_code, 403)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write(self.CSV)
+            f.flush()
+            call_command('import_projects', f.name, client='alice', stdout=io.StringIO())
+        self.assertEqual(Project.objects.filter(client=self.alice).count(), 3)
+
+
+class ProvisioningTests(TestCase):
+    CSV = (
+        'username,email,name,role,password,skills,hourly_rate,company_name\n'
+        'dev1,dev1@example.com,Dev One,FREELANCER,s3cret-pass,"django, React",40,Acme\n'
+        'dev2,dev2@example.com,Dev Two,FREELANCER,s3cret-pass,Go,,\n'
+        'boss,boss@example.com,Boss,CLIENT,s3cret-pass,,90,Acme\n'
+    )
+
+    def setUp(self):
+        Skill.objects.create(name='Django')
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_superuser('root', 'root@example.com', 'pass12345', name='Root'))
+
+    def post(self, body, content_type='text/csv', **params):
+        url = reverse('user-provision') + ('?' + '&'.join(f'{k}={v}' for k, v in params.items()) if params else '')
+        return self.api.post(url, body, content_type=content_type)
+
+    def test_csv_provisioning(self):
+        response = self.post(self.CSV)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['errors']), (3, []))
+        dev1 = User.objects.get(username='dev1')
+        self.assertTrue(dev1.check_password('s3cret-pass'))
+        self.assertEqual(sorted(dev1.skills.values_list('name', flat=True)), ['Django', 'React']) # Existing skill matched case-insensitively
+        self.assertEqual((dev1.hourly_rate, dev1.company_name), (Decimal('40'), '')) # Fields of the other role are cleared, as by save()
+        self.assertEqual(User.objects.get(username='boss').hourly_rate, None)
+        self.assertEqual(Skill.objects.filter(name__iexact='django').count(), 1)
+
+    def test_invalid_and_duplicate_usernames(self):
+        body = self.CSV + 'dev1,x@example.com,Again,FREELANCER,s3cret-pass,,,\nroot,,Root,CLIENT,pw,,,\nnobody,,,ADMIN,,,,\n'
+        response = self.post(body)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5, 6])
+        self.assertIn('username', response.data['errors'][0]['errors'])
+        self.assertEqual(set(response.data['errors'][2]['errors']), {'name', 'role', 'password'})
+        self.assertFalse(User.objects.filter(username='dev1').exists())
+
+        response = self.post(body, partial='true')
+        self.assertEqual((response.status_code, response.data['created']), (201, 3))
+
+    def test_only_staff_can_provision(self):
+        self.api.force_authenticate(make_user('alice', User.Role.CLIENT))
+        self.assertEqual(self.post(self.CSV).status_code, 403)
+
+    def test_passwords_hashed_in_process_pool(self):
+        rows = [{'username': f'u{i}', 'name': 'U', 'role': 'FREELANCER', 'password': f'pw-{i}', 'skills': ['Go']} for i in range(6)]
+        with override_settings(PROVISIONING_POOL_MIN=2, PROVISIONING_BATCH_SIZE=4):
+            created, errors, _ = provision_users(rows, workers=2)
+        self.assertEqual((created, errors), (6, []))
+        self.assertTrue(all(user.check_password(f'pw-{user.username[1:]}') for user in User.objects.filter(username__startswith='u')))
+        self.assertEqual(User.skills.through.objects.filter(skill__name='Go').count(), 6)
+
+    @override_settings(PROVISIONING_POOL_MIN=1, PROVISIONING_WORKERS=2)
+    def test_single_worker_hashes_in_process(self):
+        with PasswordHasher(1) as hasher:
+            self.assertTrue(check_password('pw', hasher.hash(['pw'])[0]))
+        self.assertIsNone(hasher.pool)
+        self.assertEqual(self.post(self.CSV).status_code, 201) # The API always passes workers=1
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write(self.CSV)
+            f.flush()
+            out = io.StringIO()
+            call_command('provision_users', f.name, stdout=out)
+        self.assertIn('Provisioned 3 users', out.getvalue())
+        self.assertEqual(User.objects.filter(username__startswith='dev').count(), 2)
+
+
+def jpeg_upload(size=(1920, 1080), name='wallpaper.jpg'):
+    exif = Image.Exif()
+    exif[0x0110] = 'Camera X' # Model
+    exif[0x0112] = 6 # Orientation: rotate 90 degrees when displayed
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProfilePictureVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, IMAGE_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.alice = make_user('alice', User.Role.FREELANCER)
+        self.api = APIClient()
+        self.api.force_authenticate(self.alice)
+
+    def upload(self, file):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.patch(reverse('user_profile_detail_update'), {'profile_picture': file}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.alice.refresh_from_db()
+        return response
+
+    def test_render_strips_metadata_and_resizes(self):
+        variants = render(jpeg_upload(size=(300, 200)).file, {'small': 64, 'large': 512}, 80)
+        small = Image.open(io.BytesIO(variants['small']['webp']))
+        self.assertEqual((small.format, small.size), ('WEBP', (64, 64)))
+        large = Image.open(io.BytesIO(variants['large']['jpeg']))
+        self.assertEqual((large.format, large.size), ('JPEG', (200, 200))) # Cropped square, never upscaled
+        self.assertEqual(dict(large.getexif()), {})
+
+    def test_upload_serves_size_specific_urls(self):
+        response = self.upload(jpeg_upload())
+        original = self.alice.profile_picture.name
+        # Variants are rendered after the response; until then the default avatar, not the upload with its EXIF
+        self.assertTrue(response.data['profile_picture_url'].endswith('profile_pics/default_avatar.png'))
+        variants = self.alice.profile_picture_variants
+        self.assertEqual(variants['source'], original)
+        self.assertEqual(set(variants), {'source', *settings.PROFILE_PICTURE_SIZES})
+
+        data = self.api.get(reverse('public-profile-detail', kwargs={'username': 'alice'})).json()
+        small = data['profile_picture_urls']['small']
+        self.assertTrue(small['webp'].endswith('-small.webp') and small['jpeg'].endswith('-small.jpg'))
+        self.assertTrue(data['profile_picture_url'].endswith('-large.jpg'))
+        with default_storage.open(variants['small']['webp']) as f:
+            small_bytes = len(f.read())
+        self.assertLess(small_bytes * 20, default_storage.size(original))
+        listed = self.api.get(reverse('public-profile-list')).json()['results'][0]
+        self.assertEqual(listed['profile_picture_urls']['small'], small)
+
+    def test_new_picture_replaces_variants(self):
+        self.upload(jpeg_upload())
+        old = self.alice.profile_picture_variants
+        self.upload(jpeg_upload(name='other.jpg'))
+        self.assertNotEqual(self.alice.profile_picture_variants['source'], old['source'])
+        self.assertFalse(default_storage.exists(old['small']['webp']))
+
+    def test_worker_failures_are_reported(self):
+        self.upload(jpeg_upload())
+        User.objects.filter(pk=self.alice.pk).update(profile_picture_variants={})
+        out = io.StringIO()
+        with override_settings(PROFILE_PICTURE_SIZES={'small': 'x'}), redirect_stdout(out): # A TypeError inside render()
+            images._run(self.alice.pk)
+        self.assertIn(f'Processing the picture of user {self.alice.pk} failed', out.getvalue())
+        self.assertIn('TypeError', out.getvalue())
+
+    def test_without_picture(self):
+        urls = self.api.get(reverse('user_profile_detail_update')).data['profile_picture_urls']
+        self.assertTrue(urls['small']['webp'].endswith('profile_pics/default_avatar.png'))
+
+
+class ChunkedSubmissionUploadTests(TestCase):
+    DATA = bytes(range(256)) * 1200 # 307200 bytes
+
+    def setUp(self):
+        media, staging = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(staging.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, SUBMISSION_STAGING_ROOT=staging.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.dev = make_user('dev', User.Role.FREELANCER)
+        self.project = Project.objects.create(
+            title='Video', description='Edit it', budget=Decimal('900.00'), client=make_user('acme', User.Role.CLIENT),
+            freelancer=self.dev, status=Project.Status.IN_PROGRESS, payment_intent_id='pi_1',
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.dev)
+
+    def start(self, **fields):
+        body = {'filename': 'cut.mp4', 'size': len(self.DATA), 'sha256': hashlib.sha256(self.DATA).hexdigest(), **fields}
+        return self.api.post(reverse('submission-upload-create', kwargs={'pk': self.project.pk}), body, format='json')
+
+    def url(self, upload_id, name='submission-upload'):
+        return reverse(name, kwargs={'pk': self.project.pk, 'upload_id': upload_id})
+
+    def put(self, upload_id, first, last, **headers):
+        return self.api.put(
+            self.url(upload_id), self.DATA[first:last + 1], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {first}-{last}/{len(self.DATA)}', **headers,
+        )
+
+    def test_chunked_upload_and_finalize(self):
+        upload_id = self.start().data['id']
+        self.assertEqual(self.put(upload_id, 0, 99_999).data['offset'], 100_000)
+        digest = base64.b64encode(hashlib.sha256(self.DATA[100_000:200_000]).digest()).decode()
+        self.assertEqual(self.put(upload_id, 100_000, 199_999, HTTP_CONTENT_DIGEST=f'sha-256=:{digest}:').status_code, 200)
+        response = self.api.get(self.url(upload_id))
+        self.assertEqual((response.data['offset'], response['Upload-Offset']), (200_000, '200000'))
+        self.put(upload_id, 200_000, len(self.DATA) - 1)
+
+        response = self.api.post(self.url(upload_id, 'submission-upload-finalize'), {'submission_notes': 'Final cut'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.status, self.project.submission_notes), (Project.Status.PENDING_APPROVAL, 'Final cut'))
+        with self.project.submission_file.open('rb') as f:
+            self.assertEqual(f.read(), self.DATA)
+        self.assertFalse(SubmissionUpload.objects.exists())
+        self.assertEqual(os.listdir(settings.SUBMISSION_STAGING_ROOT), [])
+
+    def test_resuming_after_failed_chunks(self):
+        upload_id = self.start().data['id']
+        self.put(upload_id, 0, 99_999)
+        response = self.put(upload_id, 150_000, 199_999)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 100_000))
+        bad = base64.b64encode(b'x' * 32).decode()
+        self.assertEqual(self.put(upload_id, 100_000, 199_999, HTTP_CONTENT_DIGEST=f'sha-256=:{bad}:').status_code, 400)
+        response = self.api.post(self.url(upload_id, 'submission-upload-finalize'), {}, format='json')
+        self.assertEqual(response.status_code, 400) # Incomplete
+
+        uploads._hashes.clear() # As if the remaining chunks went to another process
+        self.put(upload_id, 100_000, len(self.DATA) - 1)
+        self.assertEqual(self.api.post(self.url(upload_id, 'submission-upload-finalize'), {}, format='json').status_code, 200)
+
+    def test_chunk_is_claimed_before_writing(self):
+        upload_id = self.start().data['id']
+        staged = Path(settings.SUBMISSION_STAGING_ROOT) / f'{upload_id}.part'
+        self.assertEqual(os.listdir(settings.MEDIA_ROOT), []) # Partial uploads are not under MEDIA_ROOT
+        with open(staged, 'r+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX) # Another request is writing
+            response = self.put(upload_id, 0, 99_999)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 0))
+        self.assertEqual(staged.stat().st_size, 0)
+        self.assertEqual(self.put(upload_id, 0, 99_999).status_code, 200)
+
+    def test_sha256_mismatch_discards_the_upload(self):
+        upload_id = self.start(sha256='0' * 64).data['id']
+        self.put(upload_id, 0, len(self.DATA) - 1)
+        response = self.api.post(self.url(upload_id, 'submission-upload-finalize'), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SubmissionUpload.objects.exists())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, Project.Status.IN_PROGRESS)
+
+    def test_limits_and_permissions(self):
+        with override_settings(SUBMISSION_MAX_SIZE=1000):
+            self.assertEqual(self.start().status_code, 400)
+        upload_id = self.start().data['id']
+        with override_settings(SUBMISSION_CHUNK_MAX_SIZE=1000):
+            self.assertEqual(self.put(upload_id, 0, 1999).status_code, 413)
+        self.assertEqual(self.put(upload_id, 0, len(self.DATA)).status_code, 400) # Past the declared size
+
+        self.api.force_authenticate(make_user('other', User.Role.FREELANCER))
+        self.assertEqual(self.start().status_code, 403)
+        self.assertEqual(self.api.get(self.url(upload_id)).status_code, 403)
+        self.api.force_authenticate(self.dev)
+        Project.objects.filter(pk=self.project.pk).update(payment_intent_id='')
+        self.assertEqual(self.start().status_code, 400)
+
+    def test_abandoned_uploads(self):
+        first, second = self.start().data['id'], self.start().data['id']
+        self.assertEqual(self.api.delete(self.url(first)).status_code, 204)
+        SubmissionUpload.objects.filter(pk=second).update(updated_at=timezone.now() - timedelta(hours=settings.SUBMISSION_UPLOAD_TTL_HOURS + 1))
+        call_command('purge_submission_uploads', stdout=io.StringIO())
+        self.assertFalse(SubmissionUpload.objects.exists())
+        self.assertEqual(os.listdir(settings.SUBMISSION_STAGING_ROOT), [])
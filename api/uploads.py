@@ -0,0 +1,260 @@
+# In api/uploads.py
+"""
+Resumable, chunked uploads of work submissions.
+
+PATCH /api/projects/<pk>/submit/ takes the file as one multipart body,
+which Django buffers whole before the view runs. A large deliverable can
+time out, and any failure means starting over. Instead:
+
+    POST   /api/projects/<pk>/submit/uploads/                {"filename", "size", "sha256"?}
+           -> 201 {"id", "offset": 0, ...}
+    PUT    /api/projects/<pk>/submit/uploads/<id>/           raw bytes, Content-Range: bytes 0-8388607/<size>
+           -> 200 {"offset": 8388608, ...}   (409 with the current offset if it is not where the chunk starts)
+    GET    /api/projects/<pk>/submit/uploads/<id>/           where to resume (also the Upload-Offset header)
+    POST   /api/projects/<pk>/submit/uploads/<id>/finalize/  {"submission_notes"?}
+    DELETE /api/projects/<pk>/submit/uploads/<id>/           abandon it
+
+Each chunk is copied from the request stream into a staging file in
+SUBMISSION_STAGING_ROOT, a block at a time. That directory is outside
+MEDIA_ROOT, so partial uploads are never served. A request holds an
+exclusive lock on the staging file while it writes; a second request for
+the same upload gets a 409 instead of writing over it. It is hashed while it is copied,
+and checked against a Content-Digest header (sha-256, RFC 9530) when the
+client sends one. Chunks are at most SUBMISSION_CHUNK_MAX_SIZE and uploads
+at most SUBMISSION_MAX_SIZE. The SHA-256 of the whole file is carried from
+chunk to chunk in this process, so finalize only reads the file again when
+the chunks came through another process.
+
+Finalize checks the size and the declared sha256. It then moves the file
+into Project.submission_file (a rename on the filesystem storage) and sets
+the project to PENDING_APPROVAL in one transaction, with the same checks as
+the single-request submission. The move needs a storage with local paths
+(FileSystemStorage). `manage.py purge_submission_uploads` removes uploads
+left idle for SUBMISSION_UPLOAD_TTL_HOURS.
+"""
+import base64
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions, status
+
+from .models import Project, SubmissionUpload
+
+BLOCK_SIZE = 1024 * 1024
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+_CONTENT_DIGEST = re.compile(r'sha-256=:([A-Za-z0-9+/=]+):')
+
+# Whole-file SHA-256 of recent uploads, valid at an offset: {upload id: (offset, hash)}
+_hashes = OrderedDict()
+_hashes_lock = threading.Lock()
+_MAX_HASHES = 256
+
+
+class UploadConflict(exceptions.APIException):
+    """ `offset` is where the client should resume. """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The chunk does not start at the upload's offset."
+    default_code = 'conflict'
+
+    def __init__(self, offset, detail=None):
+        super().__init__(detail)
+        self.offset = offset
+
+
+class ChunkTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Chunk too large."
+    default_code = 'too_large'
+
+
+def submission_error(project):
+    """
+    Why work cannot be submitted for `project` now, or None.
+    """
+    if project.status != Project.Status.IN_PROGRESS:
+        return f"Work can only be submitted for 'IN PROGRESS' projects (current: {project.status})."
+    if not project.payment_intent_id:
+        return "Cannot submit work. Project has not been funded by the client yet."
+    return None
+
+
+def staging_path(upload):
+    return os.path.join(settings.SUBMISSION_STAGING_ROOT, f'{upload.pk}.part')
+
+
+def _take_hash(upload_id, offset):
+    with _hashes_lock:
+        entry = _hashes.pop(upload_id, None)
+    return entry[1] if entry is not None and entry[0] == offset else None
+
+
+def _keep_hash(upload_id, offset, whole):
+    with _hashes_lock:
+        _hashes[upload_id] = (offset, whole)
+        while len(_hashes) > _MAX_HASHES:
+            _hashes.popitem(last=False)
+
+
+def start(project, freelancer, **fields):
+    """
+    A new SubmissionUpload (fields as validated by SubmissionUploadSerializer) with an empty staging file.
+    """
+    upload = SubmissionUpload.objects.create(project=project, freelancer=freelancer, **fields)
+    path = staging_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def parse_content_range(header, upload):
+    """
+    (start, length) from a Content-Range header.
+    """
+    match = _CONTENT_RANGE.fullmatch(header or '')
+    if match is None:
+        raise exceptions.ValidationError({'Content-Range': ["Expected 'bytes <first>-<last>/<size>'."]})
+    first, last, total = match.groups()
+    first, last = int(first), int(last)
+    if last < first or (total != '*' and int(total) != upload.size):
+        raise exceptions.ValidationError({'Content-Range': [f"Not a range of this upload's {upload.size} bytes."]})
+    return first, last - first + 1
+
+
+def write_chunk(upload, offset, length, stream, digest_header=None):
+    """
+    Copies `length` bytes of `stream` into the staging file at `offset`, which must be
+    upload.offset. Returns the new offset.
+    """
+    if offset != upload.offset:
+        raise UploadConflict(upload.offset)
+    if length > settings.SUBMISSION_CHUNK_MAX_SIZE:
+        raise ChunkTooLarge(f"Chunks are at most {settings.SUBMISSION_CHUNK_MAX_SIZE} bytes.")
+    if offset + length > upload.size:
+        raise exceptions.ValidationError({'Content-Range': [f"The upload is {upload.size} bytes."]})
+    expected = None
+    if digest_header:
+        match = _CONTENT_DIGEST.search(digest_header)
+        try:
+            expected = base64.b64decode(match.group(1), validate=True)
+        except (AttributeError, ValueError):
+            raise exceptions.ValidationError({'Content-Digest': ["Expected 'sha-256=:<base64>:'."]})
+
+    with open(staging_path(upload), 'r+b') as f:
+        # Claim the upload before writing: one request at a time, at the offset the last one reached
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict(upload.offset, "Another request is writing this upload.")
+        upload.refresh_from_db(fields=['offset'])
+        if offset != upload.offset:
+            raise UploadConflict(upload.offset)
+
+        whole = hashlib.sha256() if offset == 0 else _take_hash(upload.pk, offset)
+        chunk = hashlib.sha256()
+        received = 0
+        f.seek(offset)
+        f.truncate() # Whatever an interrupted chunk left past the offset
+        while received < length:
+            block = stream.read(min(BLOCK_SIZE, length - received))
+            if not block:
+                break
+            f.write(block)
+            chunk.update(block)
+            if whole is not None:
+                whole.update(block)
+            received += len(block)
+
+        if received != length:
+            raise exceptions.ValidationError({'Content-Range': [f"Expected {length} bytes, received {received}."]})
+        if expected is not None and chunk.digest() != expected:
+            raise exceptions.ValidationError({'Content-Digest': ["The chunk does not match its digest."]})
+        # Still under the lock, so the next chunk cannot start before the offset moves
+        if not SubmissionUpload.objects.filter(pk=upload.pk, offset=offset).update(offset=offset + length, updated_at=timezone.now()):
+            upload.refresh_from_db(fields=['offset'])
+            raise UploadConflict(upload.offset, "Another request wrote this chunk.")
+    upload.offset = offset + length
+    if whole is not None:
+        _keep_hash(upload.pk, upload.offset, whole)
+    return upload.offset
+
+
+def _file_hash(path):
+    whole = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(BLOCK_SIZE):
+            whole.update(block)
+    return whole
+
+
+class _StagedFile(File):
+    """ Lets FileSystemStorage move the staging file into place instead of copying it. """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def finalize(upload, notes=None):
+    """
+    Attaches the completed upload to its project and submits the work. Returns the project.
+    """
+    if upload.offset != upload.size:
+        raise exceptions.ValidationError({'offset': [f"{upload.size - upload.offset} of {upload.size} bytes are missing."]})
+    path = staging_path(upload)
+    whole = _take_hash(upload.pk, upload.size) or _file_hash(path)
+    if upload.sha256 and whole.hexdigest() != upload.sha256:
+        discard(upload)
+        raise exceptions.ValidationError({'sha256': ["The file does not match its SHA-256; upload it again."]})
+
+    field = Project._meta.get_field('submission_file')
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=upload.project_id)
+        error = submission_error(project)
+        if error:
+            raise exceptions.ValidationError({'error': error})
+        with open(path, 'rb') as f:
+            name = default_storage.save(field.generate_filename(project, upload.filename), _StagedFile(f))
+        try:
+            project.submission_file.name = name
+            if notes is not None:
+                project.submission_notes = notes
+            project.status = Project.Status.PENDING_APPROVAL
+            project.save(update_fields=['submission_file', 'submission_notes', 'status', 'updated_at'])
+            upload.delete()
+        except Exception:
+            shutil.move(default_storage.path(name), path) # Back to staging, so finalize can be retried
+            raise
+    return project
+
+
+def _forget(upload_id):
+    with _hashes_lock:
+        _hashes.pop(upload_id, None)
+
+
+def discard(upload):
+    path = staging_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    _forget(upload.pk)
+    upload.delete()
+
+
+def purge_stale():
+    """
+    Discards uploads idle for longer than SUBMISSION_UPLOAD_TTL_HOURS. Returns how many.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.SUBMISSION_UPLOAD_TTL_HOURS)
+    stale = list(SubmissionUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in stale:
+        discard(upload)
+    return len(stale)
@@ -1,31 +1,46 @@
 from django.urls import path
-from .views import RegisterView, ProjectListCreateView, ProjectDetailView, BidCreateView, MyTokenObtainPairView, ProjectBidListView, BidUpdateView, MyBidsListView, MyProjectsListView, PublicUserProfileView, UserProfileUpdateView, SkillListCreateView, StripeOnboardingView, ProjectFundView, ProjectReleasePaymentView,UserSearchListView , ChatRoomListView, MessageListView, FollowerListView, FollowToggleView, FollowingListView, ChatRoomCreateView, ProjectMatchView, WorkSubmissionView
+from .views import RegisterView, ProjectListCreateView, ProjectDetailView, BidCreateView, MyTokenObtainPairView, ProjectBidListView, BidUpdateView, MyBidsListView, MyProjectsListView, PublicUserProfileView, UserProfileUpdateView, SkillListCreateView, ProjectFundView, ProjectReleasePaymentView,UserSearchListView , ChatRoomListView, MessageListView, FollowerListView, FollowToggleView, FollowingListView, ProfileProjectListView, ChatRoomCreateView, ProjectMatchView, WorkSubmissionView, ProjectBidBulkUpdateView, StripeWebhookView, DashboardView, MyProjectsExportView, ProjectBidExportView, MessageExportView, ProjectImportView, UserProvisionView, SubmissionUploadCreateView, SubmissionUploadView, SubmissionUploadFinalizeView
 
+from .async_views import with_async_reads, AsyncStripeOnboardingView, AsyncProjectListView, AsyncProjectDetailView, AsyncPublicUserProfileView, AsyncChatRoomListView, AsyncMessageListView
+
+from .batch import BatchView
+
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('users/provision/', UserProvisionView.as_view(), name='user-provision'),
     path('token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     path('profile/', UserProfileUpdateView.as_view(), name='user_profile_detail_update'),
     path('profiles/', UserSearchListView.as_view(), name='public-profile-list'),
-    path('profiles/<str:username>/', PublicUserProfileView.as_view(), name='public-profile-detail'),
+    # GET on the hottest read endpoints is served by async views (see api/async_views.py)
+    path('profiles/<str:username>/', with_async_reads(AsyncPublicUserProfileView.as_view(), PublicUserProfileView.as_view()), name='public-profile-detail'),
 
     # --- NEW: Follow URLs (nested under profiles) ---
     path('profiles/<str:username>/follow/', FollowToggleView.as_view(), name='follow-toggle'),
     path('profiles/<str:username>/followers/', FollowerListView.as_view(), name='follower-list'),
     path('profiles/<str:username>/following/', FollowingListView.as_view(), name='following-list'),
     # --- END: Follow URLs ---
+    path('profiles/<str:username>/projects/', ProfileProjectListView.as_view(), name='profile-project-list'),
 
-    path('projects/', ProjectListCreateView.as_view(), name='project-list-create'),
-    path('projects/<int:pk>/', ProjectDetailView.as_view(), name='project-detail'),
+    path('projects/', with_async_reads(AsyncProjectListView.as_view(), ProjectListCreateView.as_view()), name='project-list-create'),
+    path('projects/import/', ProjectImportView.as_view(), name='project-import'),
+    path('projects/<int:pk>/', with_async_reads(AsyncProjectDetailView.as_view(), ProjectDetailView.as_view()), name='project-detail'),
     path('projects/<int:project_pk>/bid/', BidCreateView.as_view(), name='bid-create'),
     path('projects/<int:project_pk>/bids/', ProjectBidListView.as_view(), name='project-bid-list'),
+    path('projects/<int:project_pk>/bids/export.<str:fmt>', ProjectBidExportView.as_view(), name='export-project-bids'),
+    path('projects/<int:project_pk>/bids/bulk/', ProjectBidBulkUpdateView.as_view(), name='project-bid-bulk-update'),
     path('bids/<int:pk>/', BidUpdateView.as_view(), name='bid-update'),
 
     # --- NEW: Dashboard URLs ---
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    # Several API calls in one request (see api/batch.py); JWT-authenticated, so no CSRF
+    path('batch/', csrf_exempt(BatchView.as_view()), name='batch'),
     path('dashboard/my-projects/', MyProjectsListView.as_view(), name='dashboard-my-projects'),
+    path('dashboard/my-projects/export.<str:fmt>', MyProjectsExportView.as_view(), name='export-my-projects'),
     path('dashboard/my-bids/', MyBidsListView.as_view(), name='dashboard-my-bids'),
     # --- END: Dashboard URLs ---
 
@@ -33,17 +48,23 @@ urlpatterns = [
     path('skills/', SkillListCreateView.as_view(), name='skill-list-create'),
     # --- END: Skills URL ---
 
-    path('stripe/onboard/', StripeOnboardingView.as_view(), name='stripe-onboard'),
+    # Async for every method (see api/async_views.py); JWT-authenticated, so no CSRF
+    path('stripe/onboard/', csrf_exempt(AsyncStripeOnboardingView.as_view()), name='stripe-onboard'),
+    path('stripe/webhook/', StripeWebhookView.as_view(), name='stripe-webhook'),
     path('projects/<int:project_pk>/fund/', ProjectFundView.as_view(), name='project-fund'),
     path('projects/<int:project_pk>/release/', ProjectReleasePaymentView.as_view(), name='project-release'),
     path('projects/<int:project_pk>/match/', ProjectMatchView.as_view(), name='project-match'),
     
     # --- NEW: Chat API URLs ---
-    path('chats/', ChatRoomListView.as_view(), name='chat-room-list'),
+    path('chats/', with_async_reads(AsyncChatRoomListView.as_view(), ChatRoomListView.as_view()), name='chat-room-list'),
     path('chats/start/', ChatRoomCreateView.as_view(), name='chat-room-start'),
-    path('chats/<int:room_id>/messages/', MessageListView.as_view(), name='message-list'),
+    path('chats/<int:room_id>/messages/', with_async_reads(AsyncMessageListView.as_view(), MessageListView.as_view()), name='message-list'),
+    path('chats/<int:room_id>/messages/export.<str:fmt>', MessageExportView.as_view(), name='export-messages'),
     # --- END: Chat API URLs ---
 
     # --- NEW: Work Submission URL ---
     path('projects/<int:pk>/submit/', WorkSubmissionView.as_view(), name='work-submission'),
+    path('projects/<int:pk>/submit/uploads/', SubmissionUploadCreateView.as_view(), name='submission-upload-create'),
+    path('projects/<int:pk>/submit/uploads/<uuid:upload_id>/', SubmissionUploadView.as_view(), name='submission-upload'),
+    path('projects/<int:pk>/submit/uploads/<uuid:upload_id>/finalize/', SubmissionUploadFinalizeView.as_view(), name='submission-upload-finalize'),
 ]
\ No newline at end of file
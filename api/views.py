@@ -1,16 +1,31 @@
-import stripe
-from stripe import StripeError
+from stripe import StripeError, SignatureVerificationError
 from rest_framework import generics, permissions, serializers
 from rest_framework.response import Response
 from rest_framework import status
-from .models import User, Project, Bid, Skill, ChatRoom, Message, Follow
-from django.db.models import Q, Count
-from .serializers import UserSerializer, ProjectSerializer, BidSerializer, MyTokenObtainPairSerializer, PublicUserProfileSerializer, UserProfileUpdateSerializer, SkillSerializer, ChatRoomSerializer, MessageSerializer, FreelancerMatchSerializer, WorkSubmissionSerializer
+from .models import User, Project, Bid, Skill, ChatRoom, Message, Follow, SubmissionUpload
+from django.conf import settings
+from django.db.models import Q, Count, Exists, IntegerField, Max, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db import transaction
+from django.utils import timezone
+from .serializers import UserSerializer, ProjectSerializer, BidSerializer, BidBulkUpdateSerializer, MyTokenObtainPairSerializer, PublicUserProfileSerializer, SimpleProjectSerializer, UserProfileUpdateSerializer, SkillSerializer, ChatRoomSerializer, MessageSerializer, FreelancerMatchSerializer, WorkSubmissionSerializer, DashboardProjectSerializer, DashboardBidSerializer, DashboardFundingSerializer, ProjectExportSerializer, SubmissionUploadSerializer
 from rest_framework.views import APIView
+from rest_framework.exceptions import UnsupportedMediaType
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from .permissions import IsClient, IsFreelancer, IsAssignedFreelancer
+from .payments import FUNDED_INTENT_STATUSES, get_gateway, get_payment_intent, remember_intent
+from .webhooks import verify_and_parse, store_event
+from .caching import CachePolicy, CachedResponseMixin, invalidate_profiles
+from .conditional import ConditionalGetMixin, GroupConcat
+from .fieldsets import SparseQuerysetMixin
+from .fastpath import ValuesListMixin
+from .exports import ExportMixin
+from .imports import FORMATS as IMPORT_FORMATS, import_projects, read_rows
+from .provisioning import provision_users
+from .images import schedule as schedule_profile_picture
+from .uploads import discard as discard_upload, finalize as finalize_upload, parse_content_range, start as start_upload, submission_error, write_chunk, UploadConflict
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.shortcuts import get_object_or_404 
@@ -20,39 +35,76 @@ from sklearn.metrics.pairwise import cosine_similarity
 
 # Create your views here.
 
+def _count_subquery(queryset, field):
+    """
+    Correlated COUNT(*) for one relation, so several counts never multiply rows like JOIN + COUNT would.
+    """
+    counts = queryset.filter(**{field: OuterRef('pk')}).values(field).annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def annotate_profile_counts(queryset, user, fields=None):
+    """
+    Precomputes what PublicUserProfileSerializer would otherwise query per profile.
+    `fields` limits it to the serialized fields (see api/fieldsets.py).
+    """
+    if user.is_authenticated:
+        is_following = Exists(Follow.objects.filter(follower=user.pk, following=OuterRef('pk')))
+    else:
+        is_following = Value(False)
+    annotations = {
+        'followers_count': _count_subquery(Follow.objects.all(), 'following'),
+        'following_count': _count_subquery(Follow.objects.all(), 'follower'),
+        'is_following': is_following,
+        'projects_as_client_count': _count_subquery(Project.objects.all(), 'client'),
+        'projects_as_freelancer_count': _count_subquery(Project.objects.all(), 'freelancer'),
+    }
+    return queryset.annotate(**{name: value for name, value in annotations.items() if fields is None or name in fields})
+
+
+def profile_prefetches():
+    """
+    What PublicUserProfileSerializer embeds: skills, and the latest PROFILE_EMBEDDED_PROJECTS
+    projects per relation. Sliced prefetches run as one windowed query (ROW_NUMBER() per user),
+    so a profile costs the same however many projects the user has.
+    """
+    latest = Project.objects.only('title', 'status', 'category', 'client', 'freelancer').order_by('-created_at', '-pk')
+    limit = settings.PROFILE_EMBEDDED_PROJECTS
+    return [
+        'skills',
+        Prefetch('projects_as_client', queryset=latest[:limit], to_attr='recent_projects_as_client'),
+        Prefetch('projects_as_freelancer', queryset=latest[:limit], to_attr='recent_projects_as_freelancer'),
+    ]
+
 # --- UPDATED: Public User Profile View ---
-class PublicUserProfileView(generics.RetrieveAPIView):
+class PublicUserProfileView(ConditionalGetMixin, CachedResponseMixin, SparseQuerysetMixin, generics.RetrieveAPIView):
     serializer_class = PublicUserProfileSerializer
+    query_budget = {'GET': 5} # auth, profile, 3 prefetches
+    # Per user because of is_following; anonymous visitors share one copy
+    cache_policy = CachePolicy(timeout=300, vary_on=('user',), depends_on=('profile:{username}', 'skills'))
     permission_classes = [permissions.AllowAny]
     lookup_field = 'username'
     lookup_url_kwarg = 'username'
 
     # Optimize database query
     def get_queryset(self):
-        # Prefetch related skills and projects to reduce database hits
-        return User.objects.prefetch_related(
-            'skills',
-            'projects_as_client', # Use related_name from Project.client ForeignKey
-            'projects_as_freelancer' # Use related_name from Project.freelancer ForeignKey
-        ).all()
+        # Prefetch skills and the latest projects to reduce database hits
+        queryset = User.objects.prefetch_related(*profile_prefetches())
+        return annotate_profile_counts(queryset, self.request.user, self.serialized_fields())
 
 # --- END: Public User Profile View ---
 
-class UserSearchListView(generics.ListAPIView):
+class UserSearchListView(SparseQuerysetMixin, generics.ListAPIView):
     """
     API view to list and search public user profiles.
     Supports searching by username, name, and skills.
     Supports filtering by role.
     Accessible via /api/profiles/
     """
-    # Use the same optimized queryset from PublicUserProfileView
-    queryset = User.objects.prefetch_related(
-        'skills',
-        'projects_as_client',
-        'projects_as_freelancer'
-    ).all().order_by('username') # Default ordering
+    queryset = User.objects.order_by('username') # Default ordering; prefetches are added in get_queryset
 
     serializer_class = PublicUserProfileSerializer
+    query_budget = {'GET': 6} # auth, count, page, 3 prefetches
     permission_classes = [permissions.IsAuthenticated] # Only logged-in users can search
     
     # --- Enable Filtering and Searching ---
@@ -68,14 +120,22 @@ class UserSearchListView(generics.ListAPIView):
     # Optional: Allow ordering
     ordering_fields = ['username', 'date_joined', 'name']
 
+    def get_queryset(self):
+        # Follower counts and is_following come from subqueries, not one query per profile
+        # Same prefetches as PublicUserProfileView
+        queryset = super().get_queryset().prefetch_related(*profile_prefetches())
+        return annotate_profile_counts(queryset, self.request.user, self.serialized_fields())
+
 # --- NEW: Project Owner Permission ---
 class IsProjectOwner(permissions.BasePermission):
     """
     Object-level permission to only allow owners of a project to access bids.
     """
     def has_object_permission(self, request, view, obj):
-        # obj here is a Bid instance. Check if the request.user is the client of the bid's project.
-        return obj.project.client == request.user
+        # obj is usually a Bid instance; bulk endpoints pass the Project itself.
+        # Either way, check if the request.user is the client of the project.
+        project = obj if isinstance(obj, Project) else obj.project
+        return project.client_id == request.user.pk
     
 
 class BidUpdateView(generics.UpdateAPIView):
@@ -132,7 +192,7 @@ class BidUpdateView(generics.UpdateAPIView):
             print("[BidUpdateView] Project saved.")
 
             # Reject other pending bids
-            updated_count = Bid.objects.filter(project=project, status=Bid.Status.PENDING).exclude(pk=instance.pk).update(status=Bid.Status.REJECTED)
+            updated_count = Bid.objects.filter(project=project, status=Bid.Status.PENDING).exclude(pk=instance.pk).update(status=Bid.Status.REJECTED, updated_at=timezone.now())
             print(f"[BidUpdateView] Rejected {updated_count} other pending bids.")
 
         # --- THIS LINE SAVES THE BID STATUS ---
@@ -150,28 +210,119 @@ class BidUpdateView(generics.UpdateAPIView):
 
     
 # --- NEW: Bid List View ---
-class ProjectBidListView(generics.ListAPIView):
+class ProjectBidListView(ConditionalGetMixin, ValuesListMixin, SparseQuerysetMixin, generics.ListAPIView):
     """
     API view for the client to list all bids placed on one of their projects.
     Accessible via /api/projects/<project_pk>/bids/
     """
     serializer_class = BidSerializer
+    query_budget = {'GET': 5} # auth, validators, project, count, page
     # Permission: Must be authenticated, AND must be the client who owns the project
     # We check project ownership within get_queryset for simplicity here
     permission_classes = [permissions.IsAuthenticated]
 
+    def validator_query(self, request, project_pk):
+        # Newest bid change plus the count (a deleted bid changes nothing else), and the
+        # freelancer_usernames the body shows, since renaming a bidder touches no bid; owners only
+        return (
+            Project.objects.filter(pk=project_pk, client=request.user.pk)
+            .annotate(latest=Max('bids__updated_at'), bids_count=Count('bids'),
+                      freelancers=GroupConcat('bids__freelancer__username', distinct=True))
+            .values_list('latest', 'bids_count', 'freelancers')
+        )
+
     def get_queryset(self):
         project_pk = self.kwargs.get('project_pk')
         project = get_object_or_404(Project, pk=project_pk)
 
         # Permission check: Ensure the request user is the client for this project
-        if project.client != self.request.user:
+        if project.client_id != self.request.user.pk:
             # Raise PermissionDenied or return an empty queryset
             # Returning empty is often simpler for ListViews
             return Bid.objects.none()
 
         # Return bids only for this specific project
-        return Bid.objects.filter(project=project).order_by('created_at') # Show oldest first maybe? Or by amount?
+        return Bid.objects.filter(project=project).select_related('freelancer').order_by('created_at') # Show oldest first maybe? Or by amount?
+
+# --- NEW: Bulk Bid Moderation View ---
+class ProjectBidBulkUpdateView(APIView):
+    """
+    API view for the client to accept or reject many bids on one of their projects.
+    Expects {"accept": [bid_ids], "reject": [bid_ids]} in the POST body.
+    Accessible via POST /api/projects/<project_pk>/bids/bulk/
+    Returns a per-id result so the client can see which bids changed.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsProjectOwner]
+
+    def post(self, request, *args, **kwargs):
+        project = get_object_or_404(Project, pk=self.kwargs.get('project_pk'))
+        self.check_object_permissions(request, project) # Same ownership rule as BidUpdateView
+
+        serializer = BidBulkUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        accept_ids, reject_ids = serializer.validated_data['accept'], serializer.validated_data['reject']
+
+        if not accept_ids and not reject_ids:
+            return Response({"detail": "Provide at least one bid id in 'accept' or 'reject'."}, status=status.HTTP_400_BAD_REQUEST)
+        if set(accept_ids) & set(reject_ids):
+            return Response({"detail": "A bid cannot be both accepted and rejected."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(accept_ids) > 1:
+            return Response({"detail": "Only one bid can be accepted per project."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = {}
+        with transaction.atomic():
+            # One query to learn the current status of every requested bid on this project
+            current = dict(
+                Bid.objects.filter(project=project, pk__in=accept_ids + reject_ids).values_list('pk', 'status')
+            )
+            for bid_id in accept_ids + reject_ids:
+                if bid_id not in current:
+                    results[bid_id] = {"id": bid_id, "result": "not_found"}
+                elif current[bid_id] != Bid.Status.PENDING:
+                    results[bid_id] = {"id": bid_id, "result": "skipped", "detail": f"Bid is already {current[bid_id]}."}
+
+            to_accept = [pk for pk in accept_ids if pk not in results]
+            to_reject = [pk for pk in reject_ids if pk not in results]
+
+            if to_accept:
+                bid_id = to_accept[0]
+                # Conditional UPDATE so two concurrent accepts cannot both assign a freelancer
+                bid = Bid.objects.only('freelancer_id', 'amount').get(pk=bid_id)
+                assigned = Project.objects.filter(
+                    pk=project.pk, status=Project.Status.OPEN, freelancer__isnull=True
+                ).update(
+                    freelancer_id=bid.freelancer_id,
+                    status=Project.Status.IN_PROGRESS,
+                    budget=bid.amount,
+                    updated_at=timezone.now(),
+                )
+                if assigned:
+                    invalidate_profiles([project.client_id, bid.freelancer_id]) # update() sends no signals (see api/caching.py)
+                    Bid.objects.filter(pk=bid_id).update(status=Bid.Status.ACCEPTED, updated_at=timezone.now())
+                    results[bid_id] = {"id": bid_id, "result": Bid.Status.ACCEPTED}
+                    # Every other pending bid is rejected, exactly like BidUpdateView does
+                    auto_rejected = list(
+                        Bid.objects.filter(project=project, status=Bid.Status.PENDING).exclude(pk=bid_id).values_list('pk', flat=True)
+                    )
+                    Bid.objects.filter(pk__in=auto_rejected).update(status=Bid.Status.REJECTED, updated_at=timezone.now())
+                    to_reject = [pk for pk in to_reject if pk not in auto_rejected]
+                    for pk in auto_rejected:
+                        results[pk] = {"id": pk, "result": Bid.Status.REJECTED}
+                else:
+                    results[bid_id] = {"id": bid_id, "result": "skipped", "detail": "Project is no longer open for bidding."}
+
+            if to_reject:
+                Bid.objects.filter(pk__in=to_reject, status=Bid.Status.PENDING).update(status=Bid.Status.REJECTED, updated_at=timezone.now())
+                for pk in to_reject:
+                    results[pk] = {"id": pk, "result": Bid.Status.REJECTED}
+
+        ordered = [results[pk] for pk in accept_ids + reject_ids]
+        # Include bids that were rejected as a side effect of the accept
+        ordered += [r for pk, r in results.items() if pk not in accept_ids and pk not in reject_ids]
+        return Response({"results": ordered}, status=status.HTTP_200_OK)
+
+# --- END: Bulk Bid Moderation View ---
 
 class MyTokenObtainPairView(TokenObtainPairView):
     """
@@ -196,7 +347,33 @@ class RegisterView(generics.CreateAPIView):
         else:
             # Customize error response
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
+
+# --- NEW: Bulk User Provisioning View ---
+class UserProvisionView(APIView):
+    """
+    API view for staff to create many users in one request (see api/provisioning.py).
+    The body is CSV, NDJSON or a JSON array, as for POST /api/projects/import/.
+    ?partial=true keeps the valid rows when some are invalid.
+    Accessible via POST /api/users/provision/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        file_format = IMPORT_FORMATS.get(request.content_type.split(';')[0].strip())
+        if file_format is None:
+            raise UnsupportedMediaType(request.content_type)
+        stream = request.stream
+        lines = iter(stream.readline, b'') if stream is not None else iter(())
+        partial = request.query_params.get('partial', '').lower() == 'true'
+
+        # Hashed in this process: a pool would fork the (multi-threaded) server
+        created, errors, seconds = provision_users(read_rows(lines, file_format), partial=partial, workers=1)
+        rate = round(created / seconds, 1) if seconds else 0
+        print(f"[UserProvision] {request.user.username}: {created} created ({rate} users/s), {len(errors)} invalid rows")
+        code = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors, 'seconds': round(seconds, 3), 'users_per_second': rate}, status=code)
+# --- END Bulk User Provisioning View ---
+
 # class UserProfileView(APIView):
 #     # This is the security guard. It ensures the user is logged in.
 #     permission_classes = [IsAuthenticated]
@@ -219,6 +396,11 @@ class UserProfileUpdateView(generics.RetrieveUpdateAPIView):
     def get_queryset(self):
         return User.objects.filter(pk=self.request.user.pk)
 
+    def perform_update(self, serializer):
+        user = serializer.save()
+        if 'profile_picture' in serializer.validated_data:
+            schedule_profile_picture(user) # Resized variants, rendered off the request (api/images.py)
+
 
 class ProjectListCreateView(generics.ListCreateAPIView):
     queryset = Project.objects.all().order_by('-created_at') # Show newest projects first
@@ -241,9 +423,10 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         """
         serializer.save(client=self.request.user)
 
-class ProjectListCreateView(generics.ListCreateAPIView):
-    queryset = Project.objects.filter(status=Project.Status.OPEN).order_by('-created_at') # Only show OPEN projects
+class ProjectListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
+    queryset = Project.objects.filter(status=Project.Status.OPEN).select_related('client').order_by('-created_at') # Only show OPEN projects
     serializer_class = ProjectSerializer
+    query_budget = {'GET': 3} # auth, count, page
 
     # --- ADD THESE FILTERING/SEARCHING/SORTING SETTINGS ---
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -261,12 +444,41 @@ class ProjectListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(client=self.request.user)
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Project.objects.all()
+# --- NEW: Bulk Project Import View ---
+class ProjectImportView(APIView):
+    """
+    API view for a client to create many projects in one request (see api/imports.py).
+    The body is CSV (text/csv), NDJSON (application/x-ndjson) or a JSON array (application/json).
+    ?partial=true keeps the valid rows when some are invalid.
+    Accessible via POST /api/projects/import/
+    """
+    permission_classes = [permissions.IsAuthenticated, IsClient]
+
+    def post(self, request, *args, **kwargs):
+        file_format = IMPORT_FORMATS.get(request.content_type.split(';')[0].strip())
+        if file_format is None:
+            raise UnsupportedMediaType(request.content_type)
+        stream = request.stream
+        lines = iter(stream.readline, b'') if stream is not None else iter(())
+        partial = request.query_params.get('partial', '').lower() == 'true'
+
+        created, errors = import_projects(read_rows(lines, file_format), request.user, partial=partial)
+        print(f"[ProjectImport] {request.user.username}: {created} created, {len(errors)} invalid rows")
+        code = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=code)
+# --- END Bulk Project Import View ---
+
+class ProjectDetailView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Project.objects.select_related('client')
     serializer_class = ProjectSerializer
+    query_budget = {'GET': 3} # auth, validators, project
     permission_classes = [IsAuthenticatedOrReadOnly]
     lookup_field = 'pk'
 
+    def validator_query(self, request, pk):
+        # client_username is in the body too, and renaming the client does not touch the project
+        return Project.objects.filter(pk=pk).values_list('updated_at', 'client__username')
+
 class BidCreateView(generics.CreateAPIView):
     """
     API view for freelancers to create a bid on a specific project.
@@ -306,7 +518,7 @@ class BidCreateView(generics.CreateAPIView):
 
 # --- Dashboard Views ---
 
-class MyProjectsListView(generics.ListAPIView):
+class MyProjectsListView(SparseQuerysetMixin, generics.ListAPIView):
     """
     API view for a logged-in user to see projects relevant to them.
     - Clients see projects they posted (any status).
@@ -314,6 +526,7 @@ class MyProjectsListView(generics.ListAPIView):
     Accessible via /api/dashboard/my-projects/
     """
     serializer_class = ProjectSerializer
+    query_budget = {'GET': 3} # auth, count, page
     permission_classes = [permissions.IsAuthenticated] # Must be logged in
 
     def get_queryset(self):
@@ -321,13 +534,13 @@ class MyProjectsListView(generics.ListAPIView):
 
         if user.role == User.Role.CLIENT:
             # Clients see all projects they posted, newest first
-            return Project.objects.filter(client=user).order_by('-created_at')
+            return Project.objects.filter(client=user).select_related('client').order_by('-created_at')
         elif user.role == User.Role.FREELANCER:
             # Freelancers see projects assigned to them that are in progress or completed
             return Project.objects.filter(
                 freelancer=user,
                 status__in=[Project.Status.IN_PROGRESS, Project.Status.COMPLETED]
-            ).order_by('-updated_at') # Show recently updated ones first
+            ).select_related('client').order_by('-updated_at') # Show recently updated ones first
         else:
             # Should not happen for valid roles, but return empty for safety
             return Project.objects.none()
@@ -335,86 +548,126 @@ class MyProjectsListView(generics.ListAPIView):
 # --- END Dashboard Views ---
 
 # --- Add My Bids List View ---
-class MyBidsListView(generics.ListAPIView):
+class MyBidsListView(ValuesListMixin, SparseQuerysetMixin, generics.ListAPIView):
     """
     API view for a logged-in freelancer to see all bids they have placed.
     Accessible via /api/dashboard/my-bids/
     """
     serializer_class = BidSerializer
+    query_budget = {'GET': 3} # auth, count, page
     permission_classes = [permissions.IsAuthenticated, IsFreelancer] # Must be logged-in Freelancer
 
     def get_queryset(self):
         user = self.request.user
         # Return all bids made by this freelancer, newest first
-        return Bid.objects.filter(freelancer=user).order_by('-created_at')
+        return Bid.objects.filter(freelancer=user).select_related('freelancer').order_by('-created_at')
 
 # --- END Add My Bids List View ---
-class SkillListCreateView(generics.ListCreateAPIView):
+
+# --- NEW: Export Views (see api/exports.py; MessageExportView is with the chat views) ---
+class MyProjectsExportView(ExportMixin, MyProjectsListView):
     """
-    API view to retrieve list of all skills or create a new skill.
-    Accessible via /api/skills/
+    Every project of /api/dashboard/my-projects/, streamed.
+    Accessible via /api/dashboard/my-projects/export.<ndjson|csv>
     """
-    queryset = Skill.objects.all().order_by('name') # List skills alphabetically
-    serializer_class = SkillSerializer
-    # Permission: Anyone can view, only authenticated users can create
-    # You might want to change POST permission to IsAdminUser later
-    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    serializer_class = ProjectExportSerializer
+    export_name = 'projects'
+    query_budget = {'GET': 1} # auth (rows are read while streaming)
+
 
-class StripeOnboardingView(APIView):
+class ProjectBidExportView(ExportMixin, ProjectBidListView):
     """
-    Creates a Stripe Account and Account Link for user onboarding.
-    Accessible via /api/stripe/onboard/
-    Returns an onboarding URL for the frontend to redirect the user to.
+    Every bid on one of the client's projects, streamed.
+    Accessible via /api/projects/<project_pk>/bids/export.<ndjson|csv>
+    """
+    export_name = 'bids'
+    query_budget = {'GET': 2} # auth, project
+
+# --- END Export Views ---
+
+# --- NEW: Aggregated Dashboard View ---
+def status_counts(queryset, statuses, **aggregates):
+    """
+    One query: the number of rows per status (and in total), plus any extra aggregates.
+    """
+    return queryset.aggregate(
+        total=Count('pk'),
+        **{value: Count('pk', filter=Q(status=value)) for value in statuses},
+        **aggregates,
+    )
+
+
+class DashboardView(APIView):
+    """
+    Everything the dashboard shows, in one request and a fixed number of queries:
+    - projects: counts per status, funding totals and the latest projects with their bid counts
+    - bids: counts per status and the latest bids (the freelancer's own, or those on the client's projects)
+    - pending_approvals: submitted work waiting for the client to release payment
+    Lists hold at most DASHBOARD_RECENT_ITEMS; the full lists are the my-projects/my-bids endpoints.
+    Accessible via GET /api/dashboard/
     """
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'GET': 6} # auth, project counts, projects, pending approvals, bid counts, bids
 
-    def post(self, request, *args, **kwargs):
+    def get(self, request, *args, **kwargs):
         user = request.user
-        return_url_base = "http://localhost:3000" # Your frontend URL
+        if user.role == User.Role.CLIENT:
+            projects = Project.objects.filter(client=user)
+            bids = Bid.objects.filter(project__client=user)
+        elif user.role == User.Role.FREELANCER:
+            projects = Project.objects.filter(freelancer=user)
+            bids = Bid.objects.filter(freelancer=user)
+        else:
+            projects, bids = Project.objects.none(), Bid.objects.none()
+
+        funded = Q(payment_status__in=FUNDED_INTENT_STATUSES) # Paid, not just a checkout opened
+        completed = Q(status=Project.Status.COMPLETED)
+        project_counts = status_counts(
+            projects, Project.Status.values,
+            awaiting_funding=Count('pk', filter=Q(status=Project.Status.IN_PROGRESS) & ~funded),
+            in_escrow=Count('pk', filter=funded & ~completed),
+            escrow_amount=Sum('budget', filter=funded & ~completed, default=0),
+            released=Count('pk', filter=funded & completed),
+            released_amount=Sum('budget', filter=funded & completed, default=0),
+        )
+        funding = DashboardFundingSerializer({key: project_counts.pop(key) for key in DashboardFundingSerializer().fields}).data
+        bid_counts = status_counts(bids, Bid.Status.values)
 
-        try:
-            # 1. Create/Retrieve Stripe Account
-            if not user.stripe_account_id:
-                print(f"Creating Stripe account for user {user.username}...")
-                account = stripe.Account.create(type='express', email=user.email)
-                user.stripe_account_id = account.id
-                user.save()
-                print(f"Stripe account created: {account.id}")
-            else:
-                print(f"User {user.username} already has Stripe account: {user.stripe_account_id}")
-                # Optional: Retrieve existing account if needed
-                # account = stripe.Account.retrieve(user.stripe_account_id)
-
-            # 2. Create an Account Link
-            print(f"Creating Account Link for {user.stripe_account_id}...")
-            account_link = stripe.AccountLink.create(
-                account=user.stripe_account_id,
-                refresh_url=f"{return_url_base}/stripe/reauth",
-                return_url=f"{return_url_base}/stripe/return?account_id={user.stripe_account_id}",
-                type='account_onboarding',
-            )
-            print(f"Account Link created: {account_link.url}")
-
-            # 3. Return the URL to the frontend
-            return Response({'onboarding_url': account_link.url}, status=status.HTTP_200_OK)
-
-        # --- UPDATED EXCEPTION HANDLING ---
-        except StripeError as e: # Catch StripeError directly
-            print(f"Stripe Error creating onboarding link: {e}")
-            # Try accessing user_message or default to str(e)
-            error_message = getattr(e, 'user_message', str(e)) 
-            return Response(
-                {"error": f"Stripe Error: {error_message or 'Could not initiate onboarding.'}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        # --- END UPDATE ---
-        except Exception as e:
-            print(f"Error creating onboarding link: {e}")
-            return Response(
-                {"error": "An unexpected error occurred. Could not initiate onboarding."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        limit = settings.DASHBOARD_RECENT_ITEMS
+        projects = projects.select_related('client').annotate(
+            bid_count=Count('bids'),
+            pending_bid_count=Count('bids', filter=Q(bids__status=Bid.Status.PENDING)),
+        )
+        recent_projects = projects.order_by('-updated_at', '-pk')[:limit]
+        pending_approvals = projects.filter(status=Project.Status.PENDING_APPROVAL).order_by('updated_at', 'pk')[:limit] # Oldest first
+        recent_bids = bids.select_related('project', 'freelancer').order_by('-created_at', '-pk')[:limit]
+
+        return Response({
+            'projects': {
+                'counts': project_counts,
+                'funding': funding,
+                'recent': DashboardProjectSerializer(recent_projects, many=True).data,
+            },
+            'bids': {
+                'counts': bid_counts,
+                'recent': DashboardBidSerializer(recent_bids, many=True).data,
+            },
+            'pending_approvals': DashboardProjectSerializer(pending_approvals, many=True).data,
+        })
+# --- END Aggregated Dashboard View ---
+class SkillListCreateView(CachedResponseMixin, ValuesListMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
+    """
+    API view to retrieve list of all skills or create a new skill.
+    Accessible via /api/skills/
+    """
+    queryset = Skill.objects.all().order_by('name') # List skills alphabetically
+    serializer_class = SkillSerializer
+    cache_policy = CachePolicy(timeout=3600, depends_on=('skills',))
+    # Permission: Anyone can view, only authenticated users can create
+    # You might want to change POST permission to IsAdminUser later
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+# Stripe onboarding is served by AsyncStripeOnboardingView (api/async_views.py)
 # --- END Stripe Onboarding View ---
 # --- NEW: Project Funding View ---
 class ProjectFundView(APIView):
@@ -451,10 +704,10 @@ class ProjectFundView(APIView):
                  return Response({"error": "The assigned freelancer has not completed Stripe onboarding yet."}, status=status.HTTP_400_BAD_REQUEST)
             # --- END UPDATED CHECK ---
             if project.payment_intent_id:
-                # Optionally retrieve existing intent to return its client_secret
+                # Return the existing client_secret from the local cache (Stripe is only asked if it is stale)
                 try:
-                    existing_intent = stripe.PaymentIntent.retrieve(project.payment_intent_id)
-                    print(f"Project {project.pk} already funded. Returning existing Intent ID: {existing_intent.id}")
+                    existing_intent = get_payment_intent(project.payment_intent_id)
+                    print(f"Project {project.pk} already funded. Returning existing Intent ID: {existing_intent.intent_id}")
                     return Response({'clientSecret': existing_intent.client_secret}, status=status.HTTP_200_OK)
                 except StripeError as e:
                      print(f"Error retrieving existing Payment Intent {project.payment_intent_id}: {e}")
@@ -472,7 +725,10 @@ class ProjectFundView(APIView):
             # We use 'capture_method': 'manual' to authorize funds now and capture later.
             # Or omit capture_method to capture immediately (funds go to platform balance).
             # We'll use 'manual' for a basic escrow flow.
-            intent = stripe.PaymentIntent.create(
+            intent = get_gateway().create_payment_intent(
+                # Same project state -> same key, so a duplicate request never double-charges.
+                # updated_at moves on once a canceled intent is cleared, allowing a fresh one.
+                idempotency_key=f"fund-project-{project.pk}-{project.freelancer_id}-{amount_in_cents}-{project.updated_at.timestamp()}",
                 amount=amount_in_cents,
                 currency='usd', # Or your desired currency
                 # capture_method='manual', # Authorize now, capture later upon release
@@ -490,7 +746,9 @@ class ProjectFundView(APIView):
                 }
             )
             project.payment_intent_id = intent.id
-            project.save(update_fields=['payment_intent_id']) # Only update this field
+            project.payment_status = intent.status
+            project.save(update_fields=['payment_intent_id', 'payment_status', 'updated_at']) # Only update these fields
+            remember_intent(intent, project_id=project.pk)
             print(f"Saved Payment Intent ID {intent.id} to Project {project.pk}")
 
             # Return the client_secret to the frontend
@@ -511,6 +769,7 @@ class ProjectFundView(APIView):
 
 # --- END Project Funding View ---
 
+
 class ProjectReleasePaymentView(APIView):
     """
     Captures the Payment Intent associated with a project, releasing funds.
@@ -541,33 +800,42 @@ class ProjectReleasePaymentView(APIView):
             # --- Capture Payment Intent ---
             print(f"Attempting to capture Payment Intent {project.payment_intent_id} for Project {project.pk}")
             
-            # Retrieve the intent first to check status (optional but good practice)
-            intent = stripe.PaymentIntent.retrieve(project.payment_intent_id)
+            # Read the status from the local cache kept fresh by webhooks; Stripe is only asked if it is stale
+            intent_status = get_payment_intent(project.payment_intent_id).status
+            if intent_status not in FUNDED_INTENT_STATUSES: # Acted on without asking Stripe again
+                # The client may have paid since the cache last heard from Stripe (webhooks not processed yet): ask before refusing
+                intent_status = get_payment_intent(project.payment_intent_id, max_age=0).status
 
-            if intent.status == 'succeeded':
+            if intent_status == 'succeeded':
                  print("Payment Intent already succeeded.")
                  # Update project status if it wasn't already
                  if project.status != Project.Status.COMPLETED:
                      project.status = Project.Status.COMPLETED
-                     project.save(update_fields=['status'])
+                     project.payment_status = intent_status
+                     project.save(update_fields=['status', 'payment_status', 'updated_at'])
                  return Response({"message": "Payment already captured and released."}, status=status.HTTP_200_OK)
 
-            if intent.status != 'requires_capture': # Should be requires_capture if using manual capture
+            if intent_status != 'requires_capture': # Should be requires_capture if using manual capture
                  # Handle cases where immediate capture was used or intent failed/cancelled
                  # If using immediate capture, the transfer happens automatically or needs a separate Transfer API call
-                 print(f"Payment Intent status is '{intent.status}', cannot capture manually.")
+                 print(f"Payment Intent status is '{intent_status}', cannot capture manually.")
                  # For now, return an error - adjust logic based on your capture strategy
-                 return Response({"error": f"Cannot release payment. Payment status: {intent.status}."}, status=status.HTTP_400_BAD_REQUEST)
+                 return Response({"error": f"Cannot release payment. Payment status: {intent_status}."}, status=status.HTTP_400_BAD_REQUEST)
 
 
             # Capture the payment (if using manual capture method)
             # This triggers the charge and the transfer defined in transfer_data
-            captured_intent = stripe.PaymentIntent.capture(project.payment_intent_id)
+            captured_intent = get_gateway().capture_payment_intent(
+                project.payment_intent_id,
+                idempotency_key=f"capture-{project.payment_intent_id}",
+            )
             print(f"Payment Intent {captured_intent.id} captured successfully.")
+            remember_intent(captured_intent, project_id=project.pk)
 
             # --- Update Project Status ---
             project.status = Project.Status.COMPLETED
-            project.save(update_fields=['status'])
+            project.payment_status = captured_intent.status
+            project.save(update_fields=['status', 'payment_status', 'updated_at'])
             print(f"Project {project.pk} status updated to COMPLETED.")
 
             return Response({"message": "Payment released successfully."}, status=status.HTTP_200_OK)
@@ -585,6 +853,35 @@ class ProjectReleasePaymentView(APIView):
 
 # --- END Release Payment View ---
 
+# --- NEW: Stripe Webhook View ---
+class StripeWebhookView(APIView):
+    """
+    Receives Stripe webhook events.
+    Verifies the signature, stores the raw event and acknowledges immediately;
+    `manage.py process_stripe_events` applies stored events in batches.
+    Accessible via POST /api/stripe/webhook/
+    """
+    authentication_classes = [] # Stripe authenticates with the signature header, not a JWT
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            event = verify_and_parse(request.body, request.META.get('HTTP_STRIPE_SIGNATURE'))
+        except SignatureVerificationError as e:
+            print(f"[StripeWebhook] Rejected event with bad signature: {e}")
+            return Response({"error": "Invalid signature."}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            print(f"[StripeWebhook] Rejected event: {e}")
+            return Response({"error": "Invalid payload."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not event.get('id'):
+            return Response({"error": "Invalid payload."}, status=status.HTTP_400_BAD_REQUEST)
+
+        store_event(event)
+        return Response({"received": True}, status=status.HTTP_200_OK)
+
+# --- END Stripe Webhook View ---
+
 class WorkSubmissionView(generics.UpdateAPIView):
     """
     API view for the assigned freelancer to submit work.
@@ -599,19 +896,10 @@ class WorkSubmissionView(generics.UpdateAPIView):
     def update(self, request, *args, **kwargs):
         project = self.get_object() # Get the project
         
-        # Check project status
-        if project.status != Project.Status.IN_PROGRESS:
-            return Response(
-                {"error": f"Work can only be submitted for 'IN PROGRESS' projects (current: {project.status})."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Check if project is funded (optional but good)
-        if not project.payment_intent_id:
-             return Response(
-                {"error": "Cannot submit work. Project has not been funded by the client yet."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # Check project status, and that the project is funded
+        error = submission_error(project)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
         # Use the serializer to validate and update submission_notes/submission_file
         serializer = self.get_serializer(project, data=request.data, partial=True)
@@ -620,7 +908,7 @@ class WorkSubmissionView(generics.UpdateAPIView):
 
         # Manually update the status
         project.status = Project.Status.PENDING_APPROVAL
-        project.save(update_fields=['status'])
+        project.save(update_fields=['status', 'updated_at'])
         
         print(f"Work submitted for project {project.pk}, status changed to PENDING_APPROVAL.")
 
@@ -628,20 +916,106 @@ class WorkSubmissionView(generics.UpdateAPIView):
         full_serializer = ProjectSerializer(project, context={'request': request})
         return Response(full_serializer.data, status=status.HTTP_200_OK)
 
+# --- NEW: Resumable Submission Upload Views ---
+class SubmissionUploadMixin:
+    """
+    For the assigned freelancer of /api/projects/<pk>/ only; see api/uploads.py.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAssignedFreelancer]
+
+    def get_project(self):
+        project = get_object_or_404(Project, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, project)
+        return project
+
+    def get_upload(self):
+        project = self.get_project()
+        return get_object_or_404(SubmissionUpload, pk=self.kwargs['upload_id'], project=project, freelancer=self.request.user)
+
+    def upload_response(self, upload, code=status.HTTP_200_OK):
+        return Response(SubmissionUploadSerializer(upload).data, status=code, headers={'Upload-Offset': str(upload.offset)})
+
+
+class SubmissionUploadCreateView(SubmissionUploadMixin, APIView):
+    """
+    Starts a resumable upload of the work submission.
+    Accessible via POST /api/projects/<pk>/submit/uploads/
+    """
+    def post(self, request, *args, **kwargs):
+        project = self.get_project()
+        error = submission_error(project)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = SubmissionUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = start_upload(project, request.user, **serializer.validated_data)
+        return self.upload_response(upload, status.HTTP_201_CREATED)
+
+
+class SubmissionUploadView(SubmissionUploadMixin, APIView):
+    """
+    GET: where to resume. PUT: one chunk (raw body, Content-Range). DELETE: abandon the upload.
+    Accessible via /api/projects/<pk>/submit/uploads/<upload_id>/
+    """
+    def get(self, request, *args, **kwargs):
+        return self.upload_response(self.get_upload())
+
+    def put(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        offset, length = parse_content_range(request.headers.get('Content-Range'), upload)
+        if request.META.get('CONTENT_LENGTH') not in (None, '', str(length)):
+            raise serializers.ValidationError({'Content-Range': ["Does not match Content-Length."]})
+        try:
+            write_chunk(upload, offset, length, request.stream, request.headers.get('Content-Digest'))
+        except UploadConflict as exc: # Tell the client where to resume
+            return Response({'detail': exc.detail, 'offset': exc.offset}, status=exc.status_code, headers={'Upload-Offset': str(exc.offset)})
+        return self.upload_response(upload)
+
+    def delete(self, request, *args, **kwargs):
+        discard_upload(self.get_upload())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SubmissionUploadFinalizeView(SubmissionUploadMixin, APIView):
+    """
+    Attaches the completed upload as the submission file and moves the project to PENDING_APPROVAL.
+    Accessible via POST /api/projects/<pk>/submit/uploads/<upload_id>/finalize/
+    """
+    def post(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        project = finalize_upload(upload, notes=request.data.get('submission_notes'))
+        print(f"Work submitted for project {project.pk} ({upload.size} bytes in chunks), status changed to PENDING_APPROVAL.")
+        return Response(ProjectSerializer(project, context={'request': request}).data, status=status.HTTP_200_OK)
+# --- END Resumable Submission Upload Views ---
+
 # --- NEW: Chat API Views ---
 
-class ChatRoomListView(generics.ListCreateAPIView):
+class ChatRoomListView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API view to list chat rooms for the logged-in user or create a new one.
     GET: Returns a list of chat rooms the user is a participant in.
     POST: Creates a new chat room (e.g., to start a chat).
     """
     serializer_class = ChatRoomSerializer
+    query_budget = {'GET': 5} # auth, count, page, participants, last messages
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Return all chat rooms where the logged-in user is a participant
-        return self.request.user.chat_rooms.all().order_by('-updated_at')
+        last_message_id = Message.objects.filter(room=OuterRef('pk')).order_by('-timestamp').values('pk')[:1]
+        queryset = self.request.user.chat_rooms.all().order_by('-updated_at').prefetch_related('participants')
+        if 'last_message' in self.serialized_fields():
+            queryset = queryset.annotate(last_message_id=Subquery(last_message_id))
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        # Load the last message of every room on the page in one query (see ChatRoomSerializer.get_last_message)
+        rooms = super().paginate_queryset(queryset)
+        if rooms is not None and 'last_message' in self.serialized_fields():
+            messages = Message.objects.select_related('sender').in_bulk([r.last_message_id for r in rooms if r.last_message_id])
+            for room in rooms:
+                room.latest_message = messages.get(room.last_message_id)
+        return rooms
 
     def perform_create(self, serializer):
         # When creating a room, automatically add the creator as a participant
@@ -651,23 +1025,41 @@ class ChatRoomListView(generics.ListCreateAPIView):
         # You might add logic here to prevent duplicate rooms between the same users
         serializer.save(participants=participants)
 
-class MessageListView(generics.ListAPIView):
+class MessageListView(ConditionalGetMixin, ValuesListMixin, SparseQuerysetMixin, generics.ListAPIView):
     """
     API view to list all messages for a specific chat room.
     Accessible via /api/chats/<room_id>/messages/
     """
     serializer_class = MessageSerializer
+    query_budget = {'GET': 4} # auth, validators, membership check, messages
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = None # Optional: Remove pagination for chat history
 
+    def validator_query(self, request, room_id):
+        # ChatConsumer.save_message bumps the room's updated_at with every message; the
+        # sender_usernames come along because renaming a sender touches neither row
+        return (
+            ChatRoom.objects.filter(pk=room_id, participants=request.user.pk)
+            .annotate(senders=GroupConcat('messages__sender__username', distinct=True))
+            .values_list('updated_at', 'senders')
+        )
+
     def get_queryset(self):
         room_id = self.kwargs.get('room_id')
         # Ensure the user is a participant in the room they are trying to access
         if ChatRoom.objects.filter(id=room_id, participants=self.request.user).exists():
-            return Message.objects.filter(room_id=room_id).order_by('timestamp')
+            return Message.objects.filter(room_id=room_id).select_related('sender').order_by('timestamp')
         # If not a participant, return an empty list
         return Message.objects.none()
 
+class MessageExportView(ExportMixin, MessageListView):
+    """
+    A chat room's transcript, streamed (participants only).
+    Accessible via /api/chats/<room_id>/messages/export.<ndjson|csv>
+    """
+    export_name = 'messages'
+    query_budget = {'GET': 2} # auth, membership check
+
 class ChatRoomCreateView(generics.CreateAPIView):
     """
     API view to find an existing 1-on-1 chat room or create a new one.
@@ -770,12 +1162,13 @@ class FollowToggleView(APIView):
         return Response({"message": f"Successfully unfollowed {username_to_unfollow}."}, status=status.HTTP_204_NO_CONTENT)
 
 
-class FollowerListView(generics.ListAPIView):
+class FollowerListView(SparseQuerysetMixin, generics.ListAPIView):
     """
     API view to list the followers of a specific user.
     Accessible via /api/profiles/<username>/followers/
     """
     serializer_class = PublicUserProfileSerializer
+    query_budget = {'GET': 7} # auth, user, count, page, 3 prefetches
     permission_classes = [permissions.AllowAny] # Anyone can see followers
 
     def get_queryset(self):
@@ -783,15 +1176,17 @@ class FollowerListView(generics.ListAPIView):
         user = get_object_or_404(User, username=username)
         # Find all Users who are listed as 'follower' in a Follow
         # object where the 'following' field is our target user.
-        return User.objects.filter(following__following=user)
+        followers = User.objects.filter(following__following=user).prefetch_related(*profile_prefetches())
+        return annotate_profile_counts(followers, self.request.user, self.serialized_fields())
 
 
-class FollowingListView(generics.ListAPIView):
+class FollowingListView(SparseQuerysetMixin, generics.ListAPIView):
     """
     API view to list the users a specific user is following.
     Accessible via /api/profiles/<username>/following/
     """
     serializer_class = PublicUserProfileSerializer
+    query_budget = {'GET': 7} # auth, user, count, page, 3 prefetches
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
@@ -799,9 +1194,33 @@ class FollowingListView(generics.ListAPIView):
         user = get_object_or_404(User, username=username)
         # Find all Users who are listed as 'following' in a Follow
         # object where the 'follower' field is our target user.
-        return User.objects.filter(followers__follower=user)
+        following = User.objects.filter(followers__follower=user).prefetch_related(*profile_prefetches())
+        return annotate_profile_counts(following, self.request.user, self.serialized_fields())
 
 # --- END: Follow/Unfollow Views ---
+
+class ProfileProjectListView(SparseQuerysetMixin, generics.ListAPIView):
+    """
+    All projects of one user, newest first (profiles only embed the latest few).
+    Accessible via /api/profiles/<username>/projects/?role=client|freelancer
+    """
+    serializer_class = SimpleProjectSerializer
+    query_budget = {'GET': 4} # auth, user, count, page
+    permission_classes = [permissions.AllowAny] # Profiles are public
+
+    def get_queryset(self):
+        user = get_object_or_404(User, username=self.kwargs.get('username'))
+        role = self.request.query_params.get('role')
+        if role == 'client':
+            condition = Q(client=user)
+        elif role == 'freelancer':
+            condition = Q(freelancer=user)
+        elif role is None:
+            condition = Q(client=user) | Q(freelancer=user)
+        else:
+            raise serializers.ValidationError({'role': "Must be 'client' or 'freelancer'."})
+        return Project.objects.filter(condition).order_by('-created_at', '-pk')
+
 class ProjectMatchView(generics.ListAPIView):
     """
     API view to find and rank the best-suited freelancers for a specific project.
@@ -858,7 +1277,8 @@ class ProjectMatchView(generics.ListAPIView):
             role=User.Role.FREELANCER,
             availability=User.Availability.AVAILABLE,
             skills__in=matching_skills # Use the queryset of matching skills
-        ).distinct().prefetch_related('skills')
+        ).distinct().prefetch_related(*profile_prefetches())
+        candidate_freelancers = annotate_profile_counts(candidate_freelancers, self.request.user)
         
         if not candidate_freelancers.exists():
             print("[MatchView] No candidates found. (Check Freelancer Availability?)")
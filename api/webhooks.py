@@ -0,0 +1,136 @@
+# In api/webhooks.py
+"""
+Stripe webhook ingestion.
+
+The webhook view only verifies the signature and stores the raw event (see
+`store_event`), so Stripe gets its 2xx immediately. `process_pending_events`
+then applies stored events in batches: one query to load the affected
+projects, one bulk_update, one upsert into the local PaymentIntent cache and
+one UPDATE to mark the events processed.
+"""
+import json
+from datetime import datetime, timezone as dt_timezone
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import invalidate_profiles
+from .models import Project, StripeEvent
+from .payments import TERMINAL_INTENT_STATUSES, remember_intents
+
+
+def verify_and_parse(payload, sig_header):
+    """
+    Checks the Stripe-Signature header and returns the decoded event dict.
+    Raises stripe.SignatureVerificationError or ValueError on bad input.
+    """
+    if not settings.STRIPE_ENDPOINT_SECRET:
+        raise ValueError("STRIPE_ENDPOINT_SECRET is not configured.")
+    payload = payload.decode('utf-8') if isinstance(payload, bytes) else payload
+    stripe.WebhookSignature.verify_header(payload, sig_header, settings.STRIPE_ENDPOINT_SECRET)
+    return json.loads(payload)
+
+
+def store_event(event):
+    """
+    Persists a verified event. Redeliveries hit the unique event_id and are ignored.
+    """
+    StripeEvent.objects.bulk_create(
+        [StripeEvent(
+            event_id=event['id'],
+            type=event.get('type', ''),
+            payload=event,
+            stripe_created=datetime.fromtimestamp(event.get('created') or 0, tz=dt_timezone.utc),
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def _intent_from_event(event):
+    obj = event.get('data', {}).get('object', {})
+    return obj if obj.get('object') == 'payment_intent' else None
+
+
+def _project_id_from_intent(intent):
+    try:
+        return int((intent.get('metadata') or {}).get('project_id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _apply_intent(project, intent):
+    """
+    Updates one project from the latest known state of its PaymentIntent.
+    Returns True if anything changed.
+    """
+    before = (project.status, project.payment_intent_id, project.payment_status)
+
+    if project.payment_intent_id and project.payment_intent_id != intent['id']:
+        return False # Event for an older, replaced intent
+    if project.payment_status in TERMINAL_INTENT_STATUSES and intent['status'] not in TERMINAL_INTENT_STATUSES:
+        return False # Out-of-order delivery, keep the terminal state
+
+    if intent['status'] == 'canceled':
+        # Let the client fund the project again with a fresh intent
+        if project.status != Project.Status.COMPLETED:
+            project.payment_intent_id = None
+        project.payment_status = intent['status']
+    else:
+        project.payment_intent_id = intent['id'] # Recovers intents the fund view failed to save
+        project.payment_status = intent['status']
+        if (
+            intent['status'] == 'succeeded'
+            and intent.get('capture_method') == 'manual'
+            and project.status == Project.Status.PENDING_APPROVAL
+        ):
+            # Funds were captured (e.g. from the Stripe dashboard), so the work is paid out
+            project.status = Project.Status.COMPLETED
+
+    return before != (project.status, project.payment_intent_id, project.payment_status)
+
+
+def process_pending_events(batch_size=100):
+    """
+    Applies up to `batch_size` unprocessed events. Returns the number handled.
+    """
+    with transaction.atomic():
+        events = list(StripeEvent.objects.filter(processed_at__isnull=True).order_by('stripe_created', 'id')[:batch_size])
+        if not events:
+            return 0
+
+        # Collapse the batch to the latest state of every PaymentIntent it mentions
+        latest_intents = {}
+        for event in events:
+            intent = _intent_from_event(event.payload)
+            if intent and intent.get('id'):
+                latest_intents[intent['id']] = intent
+
+        project_ids = {pid for pid in map(_project_id_from_intent, latest_intents.values()) if pid}
+        projects = list(Project.objects.filter(Q(pk__in=project_ids) | Q(payment_intent_id__in=list(latest_intents))))
+        by_intent = {p.payment_intent_id: p for p in projects if p.payment_intent_id}
+        by_pk = {p.pk: p for p in projects}
+
+        changed = {}
+        project_ids = {}
+        for intent in latest_intents.values():
+            project = by_intent.get(intent['id']) or by_pk.get(_project_id_from_intent(intent))
+            if project is None:
+                continue
+            project_ids[intent['id']] = project.pk
+            if _apply_intent(project, intent):
+                project.updated_at = timezone.now()
+                changed[project.pk] = project
+
+        # Keep the local PaymentIntent cache in step, so reads skip Stripe entirely
+        remember_intents(latest_intents.values(), project_ids=project_ids)
+
+        if changed:
+            Project.objects.bulk_update(changed.values(), ['status', 'payment_intent_id', 'payment_status', 'updated_at'])
+            invalidate_profiles({user_id for p in changed.values() for user_id in (p.client_id, p.freelancer_id)}) # Profiles show project status
+        StripeEvent.objects.filter(pk__in=[e.pk for e in events]).update(processed_at=timezone.now())
+
+    print(f"[StripeWebhooks] Processed {len(events)} events, updated {len(changed)} projects.")
+    return len(events)
@@ -1,15 +1,17 @@
 # In backend/asgi.py
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-# REMOVED: from channels.auth import AuthMiddlewareStack
-from api.auth_middleware import TokenAuthMiddleware # Import our custom middleware
-import api.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
+# Set up Django before importing anything that touches models (the auth middleware, consumers)
 django_asgi_app = get_asgi_application()
 
+from channels.routing import ProtocolTypeRouter, URLRouter
+# REMOVED: from channels.auth import AuthMiddlewareStack
+from api.auth_middleware import TokenAuthMiddleware # Import our custom middleware
+import api.routing
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": TokenAuthMiddleware( 
@@ -17,4 +19,4 @@ application = ProtocolTypeRouter({
             api.routing.websocket_urlpatterns
         )
     ),
-})
\ No newline at end of file
+})
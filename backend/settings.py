@@ -23,6 +23,14 @@ load_dotenv(BASE_DIR / '.env')
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY')
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
 STRIPE_ENDPOINT_SECRET = os.getenv('STRIPE_ENDPOINT_SECRET')
+# Payment gateway tuning (see api/payments.py). STRIPE_API_BASE can point at
+# the local fake server (`python manage.py runfakestripe`) for tests/load tests.
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE') or None
+STRIPE_CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', '3'))
+STRIPE_TIMEOUT = float(os.getenv('STRIPE_TIMEOUT', '15'))
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', '2'))
+# Seconds before a non-final local PaymentIntent record is re-fetched from Stripe
+STRIPE_INTENT_CACHE_TTL = int(os.getenv('STRIPE_INTENT_CACHE_TTL', '300'))
 
 # Add checks to ensure keys are loaded (optional but recommended)
 # if STRIPE_SECRET_KEY:
@@ -64,8 +72,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware', # First, so it times everything below it
+    'api.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.db_router.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -93,6 +104,59 @@ TEMPLATES = [
 
 ASGI_APPLICATION = 'backend.asgi.application'
 
+# Request metrics (see api/metrics.py), scraped from /metrics
+METRICS_SQL_SAMPLE_RATE = float(os.getenv('METRICS_SQL_SAMPLE_RATE', '0.1')) # Share of requests/events whose SQL is counted
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') # /metrics requires "Authorization: Bearer <token>"; unset, it answers 403 to everyone
+
+# N+1 query detection (see api/nplusone.py): 'log', 'raise' or 'off'. Tests always raise.
+QUERY_DETECTOR = os.getenv('QUERY_DETECTOR', 'log')
+QUERY_DETECTOR_SAMPLE_RATE = float(os.getenv('QUERY_DETECTOR_SAMPLE_RATE', '0.01'))
+QUERY_DETECTOR_THRESHOLD = int(os.getenv('QUERY_DETECTOR_THRESHOLD', '3')) # Same query this many times = N+1
+TEST_RUNNER = 'api.nplusone.QueryDetectorTestRunner'
+
+# Serve GET on the hottest read endpoints from the async views in api/async_views.py
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'true').lower() == 'true'
+
+# Latest projects/bids listed by /api/dashboard/ (the counts cover all of them)
+DASHBOARD_RECENT_ITEMS = int(os.getenv('DASHBOARD_RECENT_ITEMS', '10'))
+
+# Bulk project import (api/imports.py): rows per INSERT, and rows per import
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '10000'))
+
+# Bulk user provisioning (api/provisioning.py): users per batch, users per run, password
+# hashing processes for `manage.py provision_users` (0 = one per CPU; the API hashes in
+# process), and the smallest batch worth hashing in the pool
+PROVISIONING_BATCH_SIZE = int(os.getenv('PROVISIONING_BATCH_SIZE', '1000'))
+PROVISIONING_MAX_ROWS = int(os.getenv('PROVISIONING_MAX_ROWS', '50000'))
+PROVISIONING_WORKERS = int(os.getenv('PROVISIONING_WORKERS', '0'))
+PROVISIONING_POOL_MIN = int(os.getenv('PROVISIONING_POOL_MIN', '32'))
+
+# Rows fetched (and encoded) at a time by the streaming exports (api/exports.py)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# Most sub-requests one POST /api/batch/ may carry
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+
+# Serve flat read-only lists from values() rows instead of serializer instances (see api/fastpath.py)
+VALUES_LIST_VIEWS = os.getenv('VALUES_LIST_VIEWS', 'true').lower() == 'true'
+
+# Latest projects embedded per relation in profiles; the rest are at /api/profiles/<username>/projects/
+PROFILE_EMBEDDED_PROJECTS = int(os.getenv('PROFILE_EMBEDDED_PROJECTS', '5'))
+
+# Cache (see api/caching.py for per-view response caching). CACHE_BACKEND is
+# 'locmem' (per process), 'file' (shared by the processes of one host) or
+# 'redis' (shared by all hosts; needs the redis package and CACHE_URL).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api', 'OPTIONS': {'MAX_ENTRIES': 10_000}},
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / '.cache'))},
+    'redis': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.getenv('CACHE_URL', 'redis://127.0.0.1:6379/0')},
+}
+CACHES = {
+    'default': {**CACHE_BACKENDS[CACHE_BACKEND], 'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')), 'KEY_PREFIX': 'api'},
+}
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
@@ -106,10 +170,49 @@ CHANNEL_LAYERS = {
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DB_NAME') or BASE_DIR / 'db.sqlite3', # DB_NAME: another SQLite file, e.g. for bench_chat's server
     }
 }
 
+# Production SQLite profile (DB_PROFILE=production).
+# WAL lets readers and the single writer run concurrently, synchronous=NORMAL
+# is still crash-safe in WAL mode, busy_timeout makes writers wait for the lock
+# instead of failing with "database is locked", and mmap/cache_size keep hot
+# pages in memory. The pragmas run on every new connection via init_command.
+# IMMEDIATE transactions take the write lock up front, so atomic() blocks
+# wait in busy_timeout instead of failing when they upgrade from read to write.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000')),
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024, # Negative = KiB, i.e. 64 MiB per connection
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRODUCTION_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+}
+DB_PROFILE = os.getenv('DB_PROFILE', 'development')
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+        # Reuse connections across requests (WSGI, management commands, the
+        # webhook worker) instead of reconnecting and re-running the pragmas
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+# Read replicas (see api/db_router.py). DB_REPLICAS=2 adds 'replica1' and
+# 'replica2', local SQLite copies refreshed by `python manage.py replicate_db`.
+# Tests mirror them onto the test database.
+DATABASE_REPLICAS = [f'replica{n}' for n in range(1, int(os.getenv('DB_REPLICAS', '0')) + 1)]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': BASE_DIR / f'db.{alias}.sqlite3', 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+# How long a client reads from the primary after writing; keep above the replicate_db interval
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '15'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,6 +263,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     # --- ADD THESE LINES ---
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -171,6 +278,23 @@ REST_FRAMEWORK = {
     # --- END ADDED LINES ---
 }
 
+# Response compression (api/compression.py): smaller bodies go out as they are
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5')) # 0-11; above ~6 is too slow per request
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resumable submission uploads (api/uploads.py): staging directory (outside MEDIA_ROOT, so
+# partial uploads are never served), size limits in bytes, and how long an idle upload is kept
+SUBMISSION_STAGING_ROOT = os.getenv('SUBMISSION_STAGING_ROOT', str(BASE_DIR / 'upload_staging'))
+SUBMISSION_MAX_SIZE = int(os.getenv('SUBMISSION_MAX_SIZE', str(2 * 1024 ** 3)))
+SUBMISSION_CHUNK_MAX_SIZE = int(os.getenv('SUBMISSION_CHUNK_MAX_SIZE', str(64 * 1024 ** 2)))
+SUBMISSION_UPLOAD_TTL_HOURS = int(os.getenv('SUBMISSION_UPLOAD_TTL_HOURS', '48'))
+
+# Profile picture variants (api/images.py): square sizes in pixels, encoder quality,
+# and the threads that render them (0 = during the request, e.g. in tests)
+PROFILE_PICTURE_SIZES = {'small': 64, 'medium': 160, 'large': 512}
+PROFILE_PICTURE_QUALITY = int(os.getenv('PROFILE_PICTURE_QUALITY', '80'))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+